@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+asset_hash.py - SHA-256 of repo files, remembered across runs.
+
+ASSET_HASH_CACHE_20261019. Four scripts hash static assets, each from scratch
+and each on its own: version_static_refs (the ?v= tag of every referenced
+asset, plus a read of every HTML/JS/CSS source to find the references),
+build_ds_assets (the hashed filename of every tmr-ds* asset), build_home_critical
+(the homepage JS twins) and repoint_ds_assets (a read of every page to find old
+hashed URLs). A pre-commit --check with nothing edited re-read and re-hashed
+the whole tree to learn that nothing had moved.
+
+HASHES keeps, per repo-relative path, the (size, mtime_ns) it last saw and the
+SHA-256 of the bytes behind them, in CACHE_FILE. A lookup stats the file; if
+size and mtime_ns match, the recorded digest is the answer and the file is not
+opened. If they do not, the file is read and hashed again - and when the
+content turns out to be the same (a checkout, a `touch`, a no-op rewrite) the
+entry is refreshed in place instead of discarded.
+
+An mtime is only as fine as the filesystem's clock, so a file written twice in
+the same tick keeps its mtime and its size can match too. As git does with its
+index, an entry is trusted on stat alone only if the file's mtime is at least
+RACY_NS older than the moment the cache was saved; anything newer is verified
+against its content.
+
+memo() attaches something a script derived from a file's bytes (the refs it
+contains, whether it needs a rewrite) to the same entry, under a version the
+script chooses, so that answer also survives until the file changes.
+
+    from asset_hash import HASHES
+    tag = HASHES.tag("static/js/config.js")        # first 12 hex of the digest
+    refs = HASHES.memo(rel, "refs", version, lambda data: [...])
+    HASHES.save()                                  # once, at the end of main()
+
+The cache is a local file (gitignored): mtimes do not survive a clone, so a
+fresh checkout simply starts cold. Deleting it is always safe.
+"""
+import hashlib
+import json
+import os
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_FILE = os.path.join(ROOT, ".asset-hash-cache.json")
+FORMAT = 1
+RACY_NS = 2 * 10 ** 9
+
+
+def _rel(path):
+    path = os.fspath(path)
+    if os.path.isabs(path):
+        path = os.path.relpath(path, ROOT)
+    return path.replace("\\", "/")
+
+
+class HashCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self.saved_ns = 0
+        self.loaded = False
+        self.touched = set()
+        self.stat_hits = self.reads = 0
+
+    def load(self):
+        """Read CACHE_FILE. Missing, unreadable or another format is an empty
+        cache, never an error."""
+        self.loaded = True
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("format") != FORMAT:
+                return
+            self.saved_ns = int(data.get("saved_ns") or 0)
+            self.entries = dict(data.get("files") or {})
+        except (OSError, ValueError, TypeError, AttributeError):
+            self.entries, self.saved_ns = {}, 0
+
+    def _entry(self, path, data=None):
+        """The entry for `path`, current with the file on disk. `data` is the
+        file's bytes when the caller already has them."""
+        if not self.loaded:
+            self.load()
+        rel = _rel(path)
+        st = os.stat(os.path.join(ROOT, rel))
+        key = [st.st_size, st.st_mtime_ns]
+        entry = self.entries.get(rel)
+        self.touched.add(rel)
+        if data is None and entry and entry.get("stat") == key \
+                and ("_data" in entry or st.st_mtime_ns + RACY_NS < self.saved_ns):
+            self.stat_hits += 1                        # (or already read this run)
+            return entry
+        if data is None:
+            with open(os.path.join(ROOT, rel), "rb") as fh:
+                data = fh.read()
+        self.reads += 1
+        digest = hashlib.sha256(data).hexdigest()
+        if not entry or entry.get("sha256") != digest:
+            entry = self.entries[rel] = {"sha256": digest}
+        entry["stat"] = key
+        entry["_data"] = data
+        return entry
+
+    def digest(self, path):
+        """Full hex SHA-256 of the file's bytes."""
+        return self._entry(path)["sha256"]
+
+    def tag(self, path):
+        """The 12-hex version tag every asset URL here uses."""
+        return self.digest(path)[:12]
+
+    def read(self, path):
+        """The file's bytes, recording their digest on the way."""
+        entry = self._entry(path)
+        data = entry.get("_data")
+        if data is None:
+            with open(os.path.join(ROOT, _rel(path)), "rb") as fh:
+                data = fh.read()
+            entry = self._entry(path, data)
+        return data
+
+    def memo(self, path, name, version, compute):
+        """compute(bytes) for this file, remembered with its entry until the
+        file's content or `version` changes. The result must be JSON."""
+        entry = self._entry(path)
+        memos = entry.setdefault("memo", {})
+        slot = memos.get(name)
+        if slot is None or slot[0] != version:
+            slot = memos[name] = [version, compute(self.read(path))]
+        return slot[1]
+
+    def stats(self):
+        return "asset hashes: %d from stat, %d read" % (self.stat_hits, self.reads)
+
+    def save(self):
+        """Write the cache back. Entries for files that no longer exist are
+        dropped; file bytes held for this run are not saved."""
+        if not self.loaded:
+            return
+        files = {}
+        for rel, entry in sorted(self.entries.items()):
+            if rel not in self.touched and not os.path.isfile(os.path.join(ROOT, rel)):
+                continue
+            files[rel] = {k: v for k, v in entry.items() if k != "_data"}
+        body = json.dumps({"format": FORMAT, "saved_ns": time.time_ns(), "files": files},
+                          separators=(",", ":"))
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                fh.write(body)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+HASHES = HashCache()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+asset_pipeline.py - hash, repoint and restamp every static asset reference in
+one pass over the tree.
+
+ASSET_PIPELINE_20261019. Four scripts each own one kind of asset URL:
+
+  build_ds_assets.py      publishes tmr-ds* (and EXTRA_SOURCES) under
+                          <name>.<sha256[:12]>.<ext> and records them in
+                          static/ds-assets.json
+  repoint_ds_assets.py    points every page and JS loader at those names
+  version_static_refs.py  pins every other /static/ ref to ?v=<sha256[:12]>
+  build_home_critical.py  inlines the homepage CSS and pins its JS twins
+
+Each walked the tree and rewrote pages on its own, and each one's output moves
+another's hashes: re-pinning a ?v= ref inside tmr-ds-nav.js changes the bytes
+its hashed copy must hold; repointing a loader changes the ?v= tag every page
+gives it; stamping ?v= refs inside a homepage script changes the twin
+index.html names. So the order mattered, the static-asset-versions workflow ran
+three of them in sequence with a second version_static_refs pass to mop up, and
+a run that died between two of them left the site half repointed.
+
+Here every one of those references is an edge in one graph over every page and
+mutable asset, built from one walk. Components come out leaves first, so when
+a file is rewritten every asset it names already has its final bytes, and the
+file gets all its rewrites - hashed names, ?v= tags, the homepage stamp and
+inline - in memory before anything is written. Nothing touches the disk until
+the whole tree is computed; then new immutable files land first, the manifests
+next, and the pages that name them last, one write each through
+output_writer. The asset hash cache (asset_hash.py) means a file nothing moved
+is neither read nor re-hashed.
+
+PIPELINE_MANIFEST records the outcome in one place: the hashed name of every
+content-hashed asset, the homepage twins, and the ?v= tag of every asset a page
+pins. static/ds-assets.json is still written, from the same mapping, for the
+scripts and checks that read it.
+
+The four scripts still run on their own. This is the entry point for a deploy:
+
+    python scripts/asset_pipeline.py              # rewrite everything
+    python scripts/asset_pipeline.py --check      # exit 1 if anything is stale
+    python scripts/asset_pipeline.py --publish    # only new immutable files + ds-assets.json
+    python scripts/asset_pipeline.py --no-home    # leave the homepage build alone
+
+--publish is phase 1 of the two-deploy sequence in static-asset-versions.yml:
+it ships the new hashed files while nothing references them yet, so no request
+for them can be cached as a 404 before they are live.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import build_ds_assets as ds  # noqa: E402
+import build_home_critical as home  # noqa: E402
+import repoint_ds_assets as repoint  # noqa: E402
+import version_static_refs as refs  # noqa: E402
+from asset_hash import HASHES  # noqa: E402
+from output_writer import write_output  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE_MANIFEST = os.path.join(ROOT, "static", ".asset-manifest.json")
+SKIP_DIRS = refs.SKIP_DIRS | repoint.SKIP_DIRS
+INDEX = "index.html"
+
+
+def rel_of(path):
+    return os.path.relpath(str(path), ROOT).replace("\\", "/")
+
+
+def walk():
+    """The one tree walk: every HTML page and every mutable static JS/CSS
+    file (hashed builds are frozen, never sources)."""
+    pages, assets = [], []
+    for dirpath, dirnames, filenames in os.walk(ROOT):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        rel_dir = os.path.relpath(dirpath, ROOT).replace("\\", "/")
+        for fn in sorted(filenames):
+            rel = fn if rel_dir == "." else rel_dir + "/" + fn
+            if fn.endswith(".html"):
+                pages.append(rel)
+            elif rel.startswith(("static/js/", "static/css/")) \
+                    and fn.endswith((".js", ".css")) and not refs.is_hashed(fn):
+                assets.append(rel)
+    return pages, assets
+
+
+def hashed_name(rel, tag):
+    stem, ext = os.path.splitext(rel)
+    return "%s.%s%s" % (stem, tag, ext)
+
+
+def ds_refs(data, table):
+    """[source, matched text] for every reference to a content-hashed asset."""
+    return [[src, text.decode()] for src, text in table.finditer(data)]
+
+
+def plan(no_home=False):
+    """Compute the whole tree's final state. Reads only what has to change.
+
+    Returns (files, immutables, mapping, record, notes): the pages and sources
+    to rewrite {rel: bytes}, the new hashed files {rel: bytes}, the
+    ds-assets.json mapping, PIPELINE_MANIFEST's content, and warnings."""
+    pages, assets = walk()
+    known = set(pages) | set(assets)
+    notes = []
+
+    old_map = json.loads(ds.MANIFEST.read_text(encoding="utf-8")) if ds.MANIFEST.exists() else {}
+    ds_keys = [rel_of(p) for p in ds.sources()]
+    mapping = dict(old_map)
+    for key in ds_keys:
+        mapping.setdefault(key, "")
+    # What the table finds in a page depends only on WHICH assets are hashed,
+    # not on their current names, so it can be remembered across runs.
+    table = repoint.Table(mapping)
+    rules_version = table.version(urls=False)
+    ds_set = set(ds_keys)
+    scope = set(pages) | {r for r in repoint.JS_LOADERS if r in known}
+    home_js = [] if no_home else [r for r in home.HASHED_JS if r in known]
+    home_css = rel_of(home.CRITICAL_CSS)
+
+    stamps = {rel: HASHES.memo(rel, "static-refs", refs.REF_VERSION,
+                               lambda data, rel=rel: refs.found(rel, data)) for rel in known}
+    hashed = {rel: HASHES.memo(rel, "ds-refs", rules_version,
+                               lambda data: ds_refs(data, table)) for rel in scope}
+
+    graph, missing = {}, set()
+    for rel in known:
+        out = set()
+        for target, _ in stamps[rel]:
+            if target in known or os.path.isfile(os.path.join(ROOT, target)):
+                out.add(target)
+            else:
+                missing.add(target)
+        out |= {src for src, _ in hashed.get(rel, ()) if src in ds_set and src != rel}
+        if rel == INDEX and not no_home:
+            out |= set(home_js) | ({home_css} & known)
+        graph[rel] = out
+    for m in sorted(missing):
+        notes.append("WARN: referenced file missing on disk, ref left as-is: " + m)
+
+    files, immutables, tags, twins = {}, {}, {}, {}
+
+    def current(rel):
+        return files[rel] if rel in files else HASHES.read(rel)
+
+    def tag_for(rel):
+        if rel not in tags:
+            tags[rel] = hashlib.sha256(files[rel]).hexdigest()[:12] if rel in files \
+                else HASHES.tag(rel)
+        return tags[rel]
+
+    def publish(rel, name):
+        """Queue the immutable copy `name` of `rel`'s final bytes unless it
+        already holds them."""
+        want = hashlib.sha256(files[rel]).hexdigest() if rel in files else HASHES.digest(rel)
+        if not (os.path.isfile(os.path.join(ROOT, name)) and HASHES.digest(name) == want):
+            immutables[name] = current(rel)
+
+    for comp in refs.components(graph):
+        inside = set(comp) if len(comp) > 1 else set()
+        if inside:
+            notes.append("WARN: reference cycle, refs between these left as-is: " + ", ".join(comp))
+        for rel in comp:
+            if rel not in known:
+                continue
+            pins = {t: "?v=" + tag_for(t) for t, _ in stamps[rel]
+                    if t in graph[rel] and t not in inside}
+            urls = {src: mapping[src] for src, _ in hashed.get(rel, ())
+                    if src != rel and src not in inside and mapping.get(src)}
+            info = HASHES.memo(rel, "home-twin", home.TWIN_VERSION, home.twin) \
+                if rel in home_js else None
+            if info is not None:
+                home.require_crlf(rel, info)
+            stale = any(q != pins[t] for t, q in stamps[rel] if t in pins) \
+                or any(text != urls[src] for src, text in hashed.get(rel, ()) if src in urls) \
+                or (info is not None and not info["stamped"]) \
+                or (rel == INDEX and home_js)
+            if stale:
+                raw = HASHES.read(rel)
+                data = table.sub(raw, urls)
+
+                def sub(m):
+                    target = m.group(1).decode()
+                    q = pins.get(target.lstrip("/"))
+                    return m.group(0) if q is None else (target + q).encode()
+                data = refs.REF.sub(sub, data)
+                if info is not None:
+                    info = home.twin(data)
+                    home.require_crlf(rel, info)
+                    data = home.stamp(data, info["tag"])
+                if rel == INDEX and home_js:
+                    data = render_index(data, current(home_css).decode("utf-8"),
+                                        [(r,) + twins[r] for r in home_js])
+                if data != raw:
+                    files[rel] = data
+            if rel in ds_set:
+                name = hashed_name(rel, tag_for(rel))
+                mapping[rel] = "/" + name
+                publish(rel, name)
+            if info is not None:
+                twins[rel] = (info["tag"], info["build"])
+                publish(rel, hashed_name(rel, info["tag"]))
+
+    record = {"hashed": dict(sorted(mapping.items())),
+              "home": {r: "/" + hashed_name(r, twins[r][0]) for r in sorted(twins)},
+              "tags": {t: tag_for(t) for t in sorted({t for rel in known for t, _ in stamps[rel]
+                                                      if t in graph[rel]})}}
+    return files, immutables, mapping, record, notes
+
+
+def render_index(data, css, scripts):
+    """index.html with the critical CSS inlined and every homepage script
+    pinned to its twin, keeping the file's own line endings."""
+    crlf = data.count(b"\r\n") * 2 > data.count(b"\n")
+    html = data.decode("utf-8").replace("\r\n", "\n")
+    html = home.inline_css(html, css.replace("\r\n", "\n"))
+    for rel, tag, carries_build in scripts:
+        html = home.pin_script(html, rel, tag, carries_build)
+    if crlf:
+        html = html.replace("\n", "\r\n")
+    return html.encode("utf-8")
+
+
+def write(rel, data):
+    try:
+        return write_output(os.path.join(ROOT, rel), data)
+    except RuntimeError as err:
+        sys.exit("WRITE VERIFY FAILED: %s (%s)" % (rel, err))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--check", action="store_true", help="exit 1 if anything would change")
+    ap.add_argument("--publish", action="store_true",
+                    help="write only new hashed files and ds-assets.json")
+    ap.add_argument("--no-home", action="store_true",
+                    help="leave index.html's inlined CSS and hashed homepage JS alone")
+    args = ap.parse_args()
+
+    files, immutables, mapping, record, notes = plan(args.no_home)
+    manifest = ds.manifest_body(mapping)
+    manifest_stale = not ds.MANIFEST.exists() or ds.MANIFEST.read_bytes() != manifest
+    for note in notes:
+        print(note)
+    print(HASHES.stats())
+
+    if args.check:
+        HASHES.save()
+        stale = sorted(immutables) + sorted(files) \
+            + ([rel_of(ds.MANIFEST)] if manifest_stale else [])
+        if stale:
+            print("STALE: %d file(s) - run: python scripts/asset_pipeline.py" % len(stale))
+            for rel in stale:
+                print("  " + rel)
+            sys.exit(1)
+        print("every hashed name and ?v= tag is content-current")
+        return
+
+    # Immutable files first: once they are on disk nothing can name a file
+    # that is not there, whatever happens to the writes after them.
+    for rel in sorted(immutables):
+        write(rel, immutables[rel])
+        print("published " + rel)
+    write(rel_of(ds.MANIFEST), manifest)
+    if not args.publish:
+        for rel in sorted(files):
+            write(rel, files[rel])
+            print("rewrote " + rel)
+        write(rel_of(PIPELINE_MANIFEST), json.dumps(record, indent=1) + "\n")
+    HASHES.save()
+    print("%d new hashed file(s), %d file(s) rewritten%s" % (
+        len(immutables), 0 if args.publish else len(files),
+        " (--publish: pages not repointed)" if args.publish else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+bench_block_renderers.py - time the Game File block renderers on synthetic
+articles far bigger than anything the API serves today.
+
+A real Game File has a dozen modules. Nothing stops the research service from
+sending hundreds, and a bake that is fine at twelve and slow at five hundred
+only shows up on the cron, under a timeout. This builds articles of N modules
+that use EVERY block type in build_matchup_articles.RENDERERS and reports:
+
+  1. per renderer: calls, total ms, microseconds per call, bytes out
+  2. per module sweep: the render plan (plan_module) against the four list
+     filters render_body used before it, on the same modules. The two must
+     produce identical HTML; the run fails (exit 1) if they ever differ.
+  3. render_body end to end, per article, run twice to confirm it is
+     deterministic.
+
+Nothing here touches the network or writes a file.
+
+Usage:  python scripts/bench_block_renderers.py
+        python scripts/bench_block_renderers.py --modules 800 --articles 5 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import build_matchup_articles as B  # noqa: E402
+
+
+def sample_blocks(i):
+    """One of every block type, numbered so no two modules render alike."""
+    n = str(i)
+    row = {"away": "4.1" + n, "home": "3.8" + n, "away_n": 41 + i, "home_n": 38, "key": "ERA " + n,
+           "better": "home" if i % 2 else "away"}
+    return [
+        {"type": "p", "text": "Paragraph %s with <markup> & entities to escape." % n},
+        {"type": "h3", "text": "Heading " + n},
+        {"type": "list", "items": ["plain " + n, {"text": "noted " + n, "sample": "n=%s" % (40 + i)}]},
+        {"type": "rail", "items": [{"value": "%d-%d" % (50 + i, 40), "label": "Record", "tone": "up"}] * 4},
+        {"type": "trendboard", "note": "note " + n, "categories": [
+            {"name": "Group %d" % g, "items": [
+                {"value": "%d-%d" % (g, i), "label": "Trend %d" % c, "sample": "last 40",
+                 "timeframe": "2026", "source": "statcast", "tone": "up" if c % 2 else ""}
+                for c in range(6)]}
+            for g in range(8)]},
+        {"type": "bars", "title": "Bars " + n, "source": "fangraphs", "note": "n",
+         "away_label": "Away", "home_label": "Home", "rows": [row] * 10},
+        {"type": "benchmark", "title": "Benchmark " + n, "source": "tmr", "rows": [
+            {"who": "Team %d" % r, "sub": "ML", "actual": 50 + r * 0.7, "expected": 52.4,
+             "roi": "-%d.%d%%" % (r, i % 10), "tone": "down"} for r in range(6)]},
+        {"type": "timeline", "title": "H2H " + n, "games": [
+            {"winner": "away", "score": "5-%d" % g, "date": "2026-0%d-12" % (g + 1), "site": "Home"}
+            for g in range(8)]},
+        {"type": "form", "title": "Form " + n, "teams": [
+            {"name": "Team A", "results": list("WLWWLWLLWW"), "summary": "6-4"},
+            {"name": "Team B", "results": list("LLWLWWLWLW"), "summary": "5-5"}]},
+        {"type": "showdown", "note": "starters",
+         "away": {"mono": "AB", "name": "Away Starter", "meta": "RHP",
+                  "stats": [{"value": "3.1" + n, "label": "ERA", "fill": 60}] * 4},
+         "home": {"mono": "CD", "name": "Home Starter", "meta": "LHP",
+                  "stats": [{"value": "2.9" + n, "label": "ERA", "fill": 40}] * 4}},
+        {"type": "call", "tag": "Angle " + n, "source": "tmr", "sample": "n=120",
+         "paragraphs": ["First reason.", "Second reason."]},
+        {"type": "verdict", "team": "Team " + n, "confidence": i % 6, "confidence_label": "Medium",
+         "why": ["a", "b", "c"], "changes": ["d", "e"]},
+        {"type": "cards", "items": [{"src": "/static/media/matchups/card-%s.svg" % n, "alt": "card"}] * 2},
+        {"type": "toollinks", "links": [{"href": "/trendspotter/", "text": "Trends"},
+                                        {"href": "https://elsewhere.example/", "text": "dropped"}]},
+        {"type": "herolines"},
+        {"type": "asidestats", "slot": "aside", "rows": [{"label": "Run line", "value": "-1.5"}] * 5},
+    ]
+
+
+def synthetic_article(modules):
+    body = []
+    for i in range(modules):
+        blocks = sample_blocks(i)
+        # Rotate the layouts render_body chooses between: mixed (duo), mixed
+        # with an aside (split), all prose and all data (full width).
+        shape = i % 4
+        if shape != 1:
+            blocks = [b for b in blocks if b.get("slot") != "aside"]
+        if shape == 2:
+            blocks = [b for b in blocks if b["type"] in B.PROSE]
+        elif shape == 3:
+            blocks = [b for b in blocks if b["type"] not in B.PROSE]
+        body.append({"module": "m%d" % i, "heading": "Module %d" % i, "sub": "sub", "blocks": blocks})
+    return {"body_json": body}
+
+
+def filtered_streams(module):
+    """What render_body did before the render plan: four list filters, then
+    render the aside plus either prose/data (duo layout) or main. Kept here as
+    the reference the plan is checked against. Returns (aside, columns)."""
+    blocks = module.get("blocks") or []
+    main_bs = [b for b in blocks if (b or {}).get("slot") != "aside"]
+    aside_bs = [b for b in blocks if (b or {}).get("slot") == "aside"]
+    aside = "".join(B.render_block(b) for b in aside_bs)
+    prose_bs = [b for b in main_bs if (b or {}).get("type", "p") in B.PROSE]
+    data_bs = [b for b in main_bs if (b or {}).get("type", "p") not in B.PROSE]
+    if prose_bs and data_bs and not aside_bs:
+        return aside, ("".join(B.render_block(b) for b in prose_bs),
+                       "".join(B.render_block(b) for b in data_bs))
+    return aside, ("".join(B.render_block(b) for b in main_bs),)
+
+
+def planned_streams(module):
+    """The same (aside, columns) from plan_module."""
+    plan = B.plan_module(module)
+    if plan["prose"] and plan["data"] and not plan["aside"]:
+        return "".join(plan["aside"]), ("".join(plan["prose"]), "".join(plan["data"]))
+    return "".join(plan["aside"]), ("".join(plan["main"]),)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--modules", type=int, default=400, help="modules per article (default 400)")
+    ap.add_argument("--articles", type=int, default=3, help="articles to render (default 3)")
+    ap.add_argument("--repeat", type=int, default=1, help="passes over every article (default 1)")
+    args = ap.parse_args()
+
+    articles = [synthetic_article(args.modules) for _ in range(args.articles)]
+    blocks = [b for a in articles for m in a["body_json"] for b in m["blocks"]]
+
+    print("%d article(s) x %d module(s), %d block(s)" % (args.articles, args.modules, len(blocks)))
+    print("\nper renderer")
+    stats = {}
+    for _ in range(args.repeat):
+        for b in blocks:
+            html, dt = timed(B.render_block, b)
+            row = stats.setdefault(b["type"], [0, 0.0, 0])
+            row[0] += 1
+            row[1] += dt
+            row[2] += len(html)
+    for kind, (calls, secs, size) in sorted(stats.items(), key=lambda kv: -kv[1][1]):
+        print("  %-11s %7d calls %9.1f ms %8.1f us/call %11d bytes" % (
+            kind, calls, secs * 1000, secs / calls * 1e6, size))
+
+    print("\nmodule sweep")
+    modules = [m for a in articles for m in a["body_json"]]
+    plan_s = filt_s = 0.0
+    for _ in range(args.repeat):
+        for m in modules:
+            plan, dt = timed(planned_streams, m)
+            plan_s += dt
+            ref, dt = timed(filtered_streams, m)
+            filt_s += dt
+            if plan != ref:
+                sys.exit("FAIL: render plan differs from the list filters on module %s" % m["module"])
+    print("  render plan    %9.1f ms" % (plan_s * 1000))
+    print("  list filters   %9.1f ms  (%.2fx)" % (filt_s * 1000, filt_s / plan_s if plan_s else 0))
+
+    print("\nrender_body")
+    for n, a in enumerate(articles, 1):
+        first, dt = timed(B.render_body, a)
+        again, _ = timed(B.render_body, a)
+        if first != again:
+            sys.exit("FAIL: render_body is not deterministic on article %d" % n)
+        print("  article %d  %9.1f ms %11d bytes" % (n, dt * 1000, len(first[0])))
+
+
+if __name__ == "__main__":
+    main()
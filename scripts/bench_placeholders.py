@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+bench_placeholders.py - time placeholders.Stash.restore() against the
+replace-per-item loop it took over from, on documents far more stash-heavy
+than anything the site serves today.
+
+  1. restore alone: a page with N inline <script> blocks, restored by the loop
+     and by Stash.restore. The two must produce identical text; the run fails
+     (exit 1) if they ever differ.
+  2. light_theme_transform.transform_html end to end on the same page.
+  3. build_forum_threads.render_content on a post with N links and images.
+
+Nothing here touches the network or writes a file.
+
+Usage:  python scripts/bench_placeholders.py
+        python scripts/bench_placeholders.py --scripts 2000 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import build_forum_threads as F  # noqa: E402
+import light_theme_transform as T  # noqa: E402
+from placeholders import Stash  # noqa: E402
+
+
+def synthetic_page(scripts):
+    """A page interleaving inline scripts (with style strings the attribute
+    pass must not touch) and styled markup."""
+    parts = ["<!doctype html><html><head><style>body{color:#e2e8f0;background:#0b1220}</style>"
+             "</head><body>"]
+    for i in range(scripts):
+        parts.append('<div style="color:#94a3b8;border:1px solid rgba(255,255,255,.08)">row %d</div>\n' % i)
+        parts.append("<script>el%d.setAttribute('style','color:#e2e8f0');var n=%d;</script>\n" % (i, i))
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+def synthetic_post(links):
+    lines = []
+    for i in range(links):
+        lines.append("see https://example.com/game/%d and [img]https://cdn.example.com/%d.png[/img]" % (i, i))
+        if i % 5 == 4:
+            lines.append("")
+    return "\n".join(lines)
+
+
+def loop_restore(doc, tag, items):
+    """What transform_html and render_content did before Stash: one
+    str.replace per stashed item. Kept here as the reference."""
+    for i, s in enumerate(items):
+        doc = doc.replace("\x00%s%d\x00" % (tag, i), s)
+    return doc
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--scripts", type=int, default=800, help="inline scripts / post links (default 800)")
+    ap.add_argument("--repeat", type=int, default=1, help="passes (default 1)")
+    args = ap.parse_args()
+
+    page = synthetic_page(args.scripts)
+    stash = Stash("SCRIPT")
+    hidden = T.SCRIPT_BLOCK.sub(stash, page)
+    print("page %d bytes, %d script(s) stashed" % (len(page), len(stash.items)))
+
+    print("\nrestore")
+    loop_s = one_s = 0.0
+    for _ in range(args.repeat):
+        ref, dt = timed(loop_restore, hidden, "SCRIPT", stash.items)
+        loop_s += dt
+        out, dt = timed(stash.restore, hidden)
+        one_s += dt
+        if out != ref or out != page:
+            sys.exit("FAIL: Stash.restore differs from the replace loop")
+    print("  replace loop   %9.1f ms" % (loop_s * 1000))
+    print("  single pass    %9.1f ms  (%.1fx)" % (one_s * 1000, loop_s / one_s if one_s else 0))
+
+    print("\nend to end")
+    total = 0.0
+    for _ in range(args.repeat):
+        (html, n), dt = timed(T.transform_html, page)
+        total += dt
+        if html.count("<script>") != args.scripts:
+            sys.exit("FAIL: transform_html lost a script block")
+    print("  transform_html %9.1f ms  %d declarations" % (total * 1000, n))
+
+    post = synthetic_post(args.scripts)
+    total = 0.0
+    for _ in range(args.repeat):
+        body, dt = timed(F.render_content, post)
+        total += dt
+        if "\x00" in body:
+            sys.exit("FAIL: render_content left a placeholder behind")
+    print("  render_content %9.1f ms  %d bytes" % (total * 1000, len(body)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+bench_repoint.py - time repoint_ds_assets.Table (one literal-prefixed pattern,
+ASSET_URL, plus a dispatch dict: one scan per file) against the rule-by-rule
+pat.sub loop it took over from, over every page and loader the real run
+touches.
+
+The manifest is rewritten to point every asset at a fresh hash, so every
+reference in the tree is actually repointed rather than merely scanned. Then
+the rule list is grown with synthetic assets (--extra, in steps) to show how
+each approach scales as more of the design system is content-hashed. The two
+must produce identical bytes for every file; the run fails (exit 1) if they
+ever differ.
+
+Nothing here writes a file.
+
+Usage:  python scripts/bench_repoint.py
+        python scripts/bench_repoint.py --extra 200 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import repoint_ds_assets as R  # noqa: E402
+
+
+def loop_repoint(raw, rules):
+    """What repoint() did before Table: one pat.sub per rule, each over the
+    whole file. Kept here as the reference."""
+    new = raw
+    for pat, _, url in rules:
+        new = pat.sub(url, new)
+    return new
+
+
+def fresh(manifest, extra):
+    """`manifest` with every asset moved to a new hash, plus `extra` made-up
+    assets no page references (they only add rules)."""
+    out = {}
+    for src, url in manifest.items():
+        stem, ext = os.path.splitext(src)
+        out[src] = "/%s.%s%s" % (stem, "0" * 12, ext)
+    for i in range(extra):
+        out["static/css/tmr-ds-bench-%d.css" % i] = "/static/css/tmr-ds-bench-%d.%s.css" % (i, "1" * 12)
+    return out
+
+
+def timed(fn, pages, *args):
+    t0 = time.perf_counter()
+    out = [fn(raw, *args) for raw in pages]
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--extra", type=int, default=100, help="largest number of synthetic assets (default 100)")
+    ap.add_argument("--steps", type=int, default=3, help="rule-count steps up to --extra (default 3)")
+    ap.add_argument("--repeat", type=int, default=1, help="passes per measurement (default 1)")
+    args = ap.parse_args()
+
+    paths = list(R.targets())
+    pages = [p.read_bytes() for p in paths]
+    print("%d files, %.1f MB, manifest of %d assets" % (
+        len(pages), sum(map(len, pages)) / 1e6, len(R.MANIFEST)))
+
+    print("\n%8s %12s %12s %8s %10s" % ("rules", "loop ms", "table ms", "speedup", "repointed"))
+    for step in range(args.steps + 1):
+        extra = args.extra * step // args.steps if args.steps else 0
+        manifest = fresh(R.MANIFEST, extra)
+        rules = R.rules(manifest)
+        table = R.Table(manifest)
+        loop_s = one_s = 0.0
+        for _ in range(args.repeat):
+            ref, dt = timed(loop_repoint, pages, rules)
+            loop_s += dt
+            out, dt = timed(R.repoint, pages, table)
+            one_s += dt
+            for path, a, b in zip(paths, ref, out):
+                if a != b:
+                    sys.exit("FAIL: Table.sub differs from the rule loop on %s" % path)
+        changed = sum(1 for raw, new in zip(pages, out) if raw != new)
+        print("%8d %12.1f %12.1f %7.1fx %10d" % (
+            len(rules), loop_s * 1000, one_s * 1000, loop_s / one_s if one_s else 0, changed))
+
+
+if __name__ == "__main__":
+    main()
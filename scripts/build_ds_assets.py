@@ -17,9 +17,13 @@ always produces a new URL the CDN has never seen.
 
 Run:  python scripts/build_ds_assets.py
 """
-import hashlib
 import json
+import os
 import pathlib
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_hash import HASHES  # noqa: E402
 
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 MANIFEST = ROOT / "static" / "ds-assets.json"
@@ -61,6 +65,19 @@ def sources():
     return found
 
 
+def manifest_body(mapping):
+    """The manifest file's bytes for `mapping`.
+
+    Binary, preserving whatever newline the manifest already uses: pathlib's
+    write_text rewrites every newline as CRLF on Windows and LF on Linux, so the
+    same no-op run produced a whole-file diff depending on who ran it. Keep the
+    existing convention and only the changed lines move."""
+    body = (json.dumps(mapping, indent=2) + "\n").encode("utf-8")
+    if MANIFEST.exists() and b"\r\n" in MANIFEST.read_bytes():
+        body = body.replace(b"\n", b"\r\n")
+    return body
+
+
 def main(only=()):
     """Rebuild every discovered asset, or just the ones named on the command line.
 
@@ -83,8 +100,7 @@ def main(only=()):
         key = str(src.relative_to(ROOT)).replace("\\", "/")
         if only and key not in only:
             continue
-        raw = src.read_bytes()
-        digest = hashlib.sha256(raw).hexdigest()[:12]
+        digest = HASHES.tag(src)
         hashed = src.with_name(f"{src.stem}.{digest}{src.suffix}")
         # Older hashed builds are KEPT (matching build_home_critical.py): a
         # document cached in a returning visitor's browser still references
@@ -97,22 +113,17 @@ def main(only=()):
         # an unconditional write flipped line endings on copies that CI had
         # committed as LF from a source that is CRLF in a Windows checkout, which
         # rewrote live stylesheets end to end for no content change. (2026-08-06)
-        if not hashed.exists() or hashed.read_bytes() != raw:
-            hashed.write_bytes(raw)
+        # Equal digests are equal bytes, and both come from the hash cache, so
+        # an up-to-date asset is not even opened.
+        if not hashed.exists() or HASHES.digest(hashed) != HASHES.digest(src):
+            hashed.write_bytes(HASHES.read(src))
         mapping[key] = "/" + str(hashed.relative_to(ROOT)).replace("\\", "/")
         print(f"{key}  ->  {mapping[key]}")
 
-    # Binary write, preserving whatever newline the manifest already uses:
-    # pathlib's write_text rewrites every newline as CRLF on Windows and LF on
-    # Linux, so the same no-op run produced a whole-file diff depending on who ran
-    # it. Keep the existing convention and only the changed lines move.
-    body = (json.dumps(mapping, indent=2) + "\n").encode("utf-8")
-    if MANIFEST.exists() and b"\r\n" in MANIFEST.read_bytes():
-        body = body.replace(b"\n", b"\r\n")
-    MANIFEST.write_bytes(body)
+    MANIFEST.write_bytes(manifest_body(mapping))
     print(f"wrote {MANIFEST.relative_to(ROOT)}")
+    HASHES.save()
 
 
 if __name__ == "__main__":
-    import sys
     main(sys.argv[1:])
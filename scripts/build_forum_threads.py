@@ -26,6 +26,11 @@ Add --dry-run to print what would be written without touching files.
 """
 import json, os, sys, html, re, urllib.request, urllib.error, datetime, shutil
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sitemap_sections  # noqa: E402
+from output_writer import summary, write_output  # noqa: E402
+from placeholders import Stash  # noqa: E402
+
 # Thread titles contain emoji. Never let a console encoding kill the build.
 for _s in (sys.stdout, sys.stderr):
     try:
@@ -169,11 +174,8 @@ def render_content(raw):
     """
     e = html.escape(raw or "")
 
-    slots, holder = [], []
-
-    def slot(h):
-        holder.append(h)
-        return f"\x00SLOT{len(holder)-1}\x00"
+    slots = Stash("SLOT")
+    slot = slots.put
 
     # [img]/[gif]url[/img] -> real <img>
     e = re.sub(r"\[(img|gif)\]\s*(https?://[^\s\]]+?)\s*\[/\1\]",
@@ -192,9 +194,7 @@ def render_content(raw):
     paras = [p.strip() for p in re.split(r"\n{2,}", e) if p.strip()]
     body = "".join(f"<p>{p.replace(chr(10), '<br>')}</p>" for p in paras) or "<p></p>"
 
-    for i, h in enumerate(holder):
-        body = body.replace(f"\x00SLOT{i}\x00", h)
-    return body
+    return slots.restore(body)
 
 
 def plain_excerpt(raw, limit=155):
@@ -616,46 +616,20 @@ def cat_page_html(cat, cat_threads):
 """
 
 
-def regen_sitemap_cats(entries):
-    """entries: list of (url, lastmod_iso_date) for category pages. Own marker
-    block so it never clobbers the thread/profile generators' blocks."""
-    if not os.path.exists(SITEMAP):
-        print("sitemap.xml not found, skipping cat urls"); return
-    with open(SITEMAP, encoding="utf-8") as f:
-        xml = f.read()
-    xml = re.sub(r"\s*<!-- BEGIN_FORUM_CAT_URLS -->.*?<!-- END_FORUM_CAT_URLS -->",
-                 "", xml, flags=re.S)
-    block = ["  <!-- BEGIN_FORUM_CAT_URLS -->"]
-    for url, lastmod in entries:
-        lm = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
-        block.append(f"  <url><loc>{url}</loc>{lm}"
-                     f"<changefreq>daily</changefreq><priority>0.6</priority></url>")
-    block.append("  <!-- END_FORUM_CAT_URLS -->")
-    xml = xml.replace("</urlset>", "\n".join(block) + "\n</urlset>")
-    with open(SITEMAP, "w", encoding="utf-8", newline="\n") as f:
-        f.write(xml)
+def regen_sitemap_cats(sm, entries):
+    """entries: list of (url, lastmod_iso_date) for category pages. Own section
+    so it never clobbers the thread/profile generators' blocks."""
+    sm.set_section("FORUM_CAT", [sitemap_sections.entry(url, lastmod, "daily", "0.6")
+                                 for url, lastmod in entries])
     print(f"sitemap.xml updated with {len(entries)} forum category URLs")
 
 
-def regen_sitemap(entries):
-    """entries: list of (url, lastmod_iso_date). Mirrors the BEGIN/END marker
-    pattern build_profile_pages.py uses so the two generators never clobber
-    each other's block."""
-    if not os.path.exists(SITEMAP):
-        print("sitemap.xml not found, skipping"); return
-    with open(SITEMAP, encoding="utf-8") as f:
-        xml = f.read()
-    xml = re.sub(r"\s*<!-- BEGIN_THREAD_URLS -->.*?<!-- END_THREAD_URLS -->",
-                 "", xml, flags=re.S)
-    block = ["  <!-- BEGIN_THREAD_URLS -->"]
-    for url, lastmod in entries:
-        lm = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
-        block.append(f"  <url><loc>{url}</loc>{lm}"
-                     f"<changefreq>weekly</changefreq><priority>0.5</priority></url>")
-    block.append("  <!-- END_THREAD_URLS -->")
-    xml = xml.replace("</urlset>", "\n".join(block) + "\n</urlset>")
-    with open(SITEMAP, "w", encoding="utf-8", newline="\n") as f:
-        f.write(xml)
+def regen_sitemap(sm, entries):
+    """entries: list of (url, lastmod_iso_date). SITEMAP_MODEL_20261019: both
+    forum sections are set on ONE parsed sitemap and saved once at the end of
+    main(), instead of two full read-strip-append-write passes over the file."""
+    sm.set_section("THREAD", [sitemap_sections.entry(url, lastmod, "weekly", "0.5")
+                              for url, lastmod in entries])
     print(f"sitemap.xml updated with {len(entries)} thread URLs")
 
 
@@ -718,13 +692,10 @@ def main():
 
     os.makedirs(TDIR, exist_ok=True)
     for tid, slug, t, posts in built:
-        d = os.path.join(TDIR, str(tid), slug)
-        os.makedirs(d, exist_ok=True)
         html_out = page_html(t, posts)
         if not html_out.strip():
             raise SystemExit(f"ABORT: empty HTML generated for thread {tid}")
-        with open(os.path.join(d, "index.html"), "w", encoding="utf-8", newline="\n") as f:
-            f.write(html_out)
+        write_output(os.path.join(TDIR, str(tid), slug, "index.html"), html_out)
 
     # Dirs for threads that are GONE are removed. Dirs for a RENAMED thread's old
     # slug are NOT removed: an edited title must never break the original URL, so
@@ -749,14 +720,17 @@ def main():
                             '</head><body>'
                             f'<p>This thread moved to <a href="{cur}">{cur}</a>.</p>'
                             '</body></html>\n')
-                    with open(os.path.join(idpath, slugname, "index.html"), "w",
-                              encoding="utf-8", newline="\n") as f:
-                        f.write(stub)
+                    write_output(os.path.join(idpath, slugname, "index.html"), stub)
                     redirected += 1
 
     print(f"wrote {len(built)} thread pages under {TDIR} (all index, follow); "
-          f"removed {removed} gone-thread dirs; {redirected} renamed-slug redirect stubs")
-    regen_sitemap(entries)
+          f"removed {removed} gone-thread dirs; {redirected} renamed-slug redirect stubs "
+          f"({summary()})")
+    sm = sitemap_sections.Sitemap(SITEMAP)
+    if sm.exists:
+        regen_sitemap(sm, entries)
+    else:
+        print("sitemap.xml not found, skipping")
 
     # ---- category pages: /forum/<slug>/ (crawler view + hydrate) ----
     # Never deletes anything under forum/ - it only (re)writes the index.html of
@@ -775,13 +749,10 @@ def main():
     cat_entries, empty_boards = [], []
     for c in cats:
         cthreads = by_cat.get(c["slug"], [])
-        d = os.path.join(ROOT, "forum", c["slug"])
-        os.makedirs(d, exist_ok=True)
         page = cat_page_html(c, cthreads)
         if not page.strip():
             raise SystemExit(f"ABORT: empty HTML generated for category {c['slug']}")
-        with open(os.path.join(d, "index.html"), "w", encoding="utf-8", newline="\n") as f:
-            f.write(page)
+        write_output(os.path.join(ROOT, "forum", c["slug"], "index.html"), page)
         # EMPTY_BOARD_20260809: a board with zero threads renders "No threads yet.
         # Be the first to post." over ~370 characters of nav. That is a real page
         # and it stays live, linked from /forum/ and from every thread crumb -- but
@@ -800,7 +771,10 @@ def main():
         if empty_boards:
             print(f"  {len(empty_boards)} empty board(s) written but NOT submitted "
                   f"to the sitemap: {empty_boards}")
-        regen_sitemap_cats(cat_entries)
+        if sm.exists:
+            regen_sitemap_cats(sm, cat_entries)
+    if sm.exists:
+        sm.save()
 
 
 if __name__ == "__main__":
@@ -22,10 +22,14 @@ Verify index.html is in sync (CI / pre-push guard):
     python scripts/build_home_critical.py --check
 """
 import hashlib
+import os
 import pathlib
 import re
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_hash import HASHES  # noqa: E402
+
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 INDEX = ROOT / "index.html"
 CRITICAL_CSS = ROOT / "static/css/tmr-home-v2.css"
@@ -48,74 +52,110 @@ CSS_END = "<!-- END HOME CRITICAL CSS -->"
 
 
 def digest(path):
-    return hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+    return HASHES.tag(path)
 
 
 BUILD_STAMP_RE = re.compile(rb"var BUILD = '[^']*'")
+# Keys twin() results in the asset hash cache; bump it when twin() changes.
+TWIN_VERSION = "1:" + BUILD_STAMP_RE.pattern.decode()
+
+
+def twin(raw):
+    """What build() needs to know about one homepage script's bytes: its
+    stamp-masked content hash, whether it carries `var BUILD`, whether it is
+    LF-only, and whether the stamp in it is already that hash. Remembered in
+    the asset hash cache, so an unchanged script is not re-read or re-hashed."""
+    masked = BUILD_STAMP_RE.sub(b"var BUILD = ''", raw)
+    h = hashlib.sha256(masked).hexdigest()[:12]
+    return {"tag": h,
+            "build": bool(BUILD_STAMP_RE.search(raw)),
+            "lf": b"\r\n" not in raw and b"\n" in raw,
+            "stamped": stamp(raw, h) == raw}
+
+
+def inline_css(html, css):
+    """Inline the critical CSS, replacing either the <link> or a previous block."""
+    block = "%s\n<style>\n%s\n</style>\n%s" % (CSS_BEGIN, css.strip(), CSS_END)
+    if CSS_BEGIN in html:
+        return re.sub(re.escape(CSS_BEGIN) + r".*?" + re.escape(CSS_END), lambda m: block,
+                      html, flags=re.S)
+    link = re.compile(r'[ \t]*<link[^>]+href="/static/css/tmr-home-v2\.css[^"]*"[^>]*>')
+    if not link.search(html):
+        sys.exit("index.html references neither the critical CSS link nor the generated block")
+    return link.sub(lambda m: block, html, count=1)
+
+
+def require_crlf(rel, info):
+    # The digest is over BYTES, so line endings are part of it. This repo has
+    # no .gitattributes, so a file stored with LF gets smudged to CRLF when
+    # Git for Windows checks it out (autocrlf) and hashes to something else
+    # there than it does here -- the reference baked into index.html then
+    # looks stale on CI and the predeploy guard blocks the deploy, while
+    # every local check passes. Store these files with CRLF and the smudge
+    # is a no-op everywhere. Caught the hard way on first-pick-onboarding.js:
+    # dd77f7c3c2b7 locally, ff27bfd01a57 on the runner.
+    if info["lf"]:
+        sys.exit("%s is stored with LF endings. A content-hashed file must be "
+                 "CRLF or its hash changes on a Windows checkout. Convert it, "
+                 "then re-run this script." % rel)
+
+
+def stamp(raw, h):
+    """`raw` with its `var BUILD` set to `h`."""
+    return BUILD_STAMP_RE.sub(("var BUILD = '%s'" % h).encode(), raw)
+
+
+def pin_script(html, rel, h, carries_build):
+    """Point index.html's <script> for `rel` at its twin `<stem>.<h><ext>`."""
+    src = ROOT / rel
+    stem, suffix = src.stem, src.suffix
+    hashed = "%s.%s%s" % (stem, h, suffix)
+    # Only the script that actually carries `var BUILD` owns the document's
+    # build id -- that pairing is what its self-heal reload compares. Letting
+    # a second hashed file overwrite the attribute would point the check at a
+    # hash no script reports, and every load would look like a mismatch.
+    if carries_build:
+        if 'data-tmr-build="' not in html:
+            sys.exit("index.html is missing the data-tmr-build attribute on <html>")
+        html = re.sub(r'data-tmr-build="[^"]*"', 'data-tmr-build="%s"' % h, html, count=1)
+    pattern = re.compile(r'src="/%s/%s(\.[0-9a-f]{12})?%s(\?[^"]*)?"'
+                         % (re.escape(str(src.parent.relative_to(ROOT)).replace("\\", "/")),
+                            re.escape(stem), re.escape(suffix)))
+    if not pattern.search(html):
+        sys.exit("index.html does not reference %s" % rel)
+    return pattern.sub('src="/%s/%s"' % (str(src.parent.relative_to(ROOT)).replace("\\", "/"),
+                                         hashed), html)
 
 
 def build(html):
-    # 1. Inline the critical CSS, replacing either the <link> or a previous block.
-    block = "%s\n<style>\n%s\n</style>\n%s" % (
-        CSS_BEGIN, CRITICAL_CSS.read_text(encoding="utf-8").strip(), CSS_END)
-    if CSS_BEGIN in html:
-        html = re.sub(re.escape(CSS_BEGIN) + r".*?" + re.escape(CSS_END), lambda m: block,
-                      html, flags=re.S)
-    else:
-        link = re.compile(r'[ \t]*<link[^>]+href="/static/css/tmr-home-v2\.css[^"]*"[^>]*>')
-        if not link.search(html):
-            sys.exit("index.html references neither the critical CSS link nor the generated block")
-        html = link.sub(lambda m: block, html, count=1)
+    # 1. Inline the critical CSS.
+    html = inline_css(html, CRITICAL_CSS.read_text(encoding="utf-8"))
 
     # 2. Point every homepage script at an immutable, content-hashed twin.
     for rel in HASHED_JS:
         src = ROOT / rel
-        stem, suffix = src.stem, src.suffix
         # Stamp the build id into the JS AND <html data-tmr-build> so the page
         # can detect a document/script pairing from two different deployments
         # (stale HTTP cache, restored session) and self-heal with one reload.
         # The digest is computed with the stamp masked so it stays stable.
-        raw = src.read_bytes()
-        # The digest is over BYTES, so line endings are part of it. This repo has
-        # no .gitattributes, so a file stored with LF gets smudged to CRLF when
-        # Git for Windows checks it out (autocrlf) and hashes to something else
-        # there than it does here -- the reference baked into index.html then
-        # looks stale on CI and the predeploy guard blocks the deploy, while
-        # every local check passes. Store these files with CRLF and the smudge
-        # is a no-op everywhere. Caught the hard way on first-pick-onboarding.js:
-        # dd77f7c3c2b7 locally, ff27bfd01a57 on the runner.
-        if b"\r\n" not in raw and b"\n" in raw:
-            sys.exit("%s is stored with LF endings. A content-hashed file must be "
-                     "CRLF or its hash changes on a Windows checkout. Convert it, "
-                     "then re-run this script." % rel)
-        masked = BUILD_STAMP_RE.sub(b"var BUILD = ''", raw)
-        h = hashlib.sha256(masked).hexdigest()[:12]
-        stamped = BUILD_STAMP_RE.sub(("var BUILD = '%s'" % h).encode(), raw)
-        if stamped != raw:
-            src.write_bytes(stamped)
-        hashed = "%s.%s%s" % (stem, h, suffix)
-        (src.parent / hashed).write_bytes(stamped)
-        # Only the script that actually carries `var BUILD` owns the document's
-        # build id -- that pairing is what its self-heal reload compares. Letting
-        # a second hashed file overwrite the attribute would point the check at a
-        # hash no script reports, and every load would look like a mismatch.
-        if BUILD_STAMP_RE.search(raw):
-            if 'data-tmr-build="' not in html:
-                sys.exit("index.html is missing the data-tmr-build attribute on <html>")
-            html = re.sub(r'data-tmr-build="[^"]*"', 'data-tmr-build="%s"' % h, html, count=1)
-        pattern = re.compile(r'src="/%s/%s(\.[0-9a-f]{12})?%s(\?[^"]*)?"'
-                             % (re.escape(str(src.parent.relative_to(ROOT)).replace("\\", "/")),
-                                re.escape(stem), re.escape(suffix)))
-        if not pattern.search(html):
-            sys.exit("index.html does not reference %s" % rel)
-        html = pattern.sub('src="/%s/%s"' % (str(src.parent.relative_to(ROOT)).replace("\\", "/"),
-                                             hashed), html)
+        info = HASHES.memo(rel, "home-twin", TWIN_VERSION, twin)
+        require_crlf(rel, info)
+        h = info["tag"]
+        if not info["stamped"]:
+            src.write_bytes(stamp(HASHES.read(src), h))
+        # The twin is the stamped source byte for byte; leave it alone when the
+        # digests already agree.
+        target = src.with_name("%s.%s%s" % (src.stem, h, src.suffix))
+        if not target.exists() or HASHES.digest(target) != HASHES.digest(src):
+            target.write_bytes(HASHES.read(src))
+        html = pin_script(html, rel, h, info["build"])
     return html
 
 
 def main():
     current = INDEX.read_text(encoding="utf-8")
     built = build(current)
+    HASHES.save()
     if "--check" in sys.argv:
         if built != current:
             sys.exit("index.html is STALE - run: python scripts/build_home_critical.py")
@@ -16,7 +16,8 @@ opts in with one class and opts out by removing it.
 Chrome that must STAY dark (the global nav, the global footer, their menus) is
 excluded by selector, not by colour, so it cannot drift back in later.
 
-  python scripts/build_light_overrides.py > static/css/_light-auto.css
+  python scripts/build_light_overrides.py            # writes static/css/tmr-light.css
+  python scripts/build_light_overrides.py --pretty   # unoptimized, for reading
 """
 from __future__ import annotations
 
@@ -26,7 +27,10 @@ import re
 import sys
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from light_theme_transform import CLIP_TEXT, rewrite_declarations  # noqa: E402
+import css_optimize  # noqa: E402
+import css_tree  # noqa: E402
+from light_theme_transform import COLOURS, clips_text, rewrite_declarations  # noqa: E402
+from output_writer import write_output  # noqa: E402
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -78,32 +82,6 @@ COLOR_DECL = re.compile(
 HAS_COLOR_VALUE = re.compile(r"#[0-9a-fA-F]{3,8}\b|rgba?\(|hsla?\(", re.I)
 
 
-def split_rules(css: str):
-    """Yield (selector, body) for top-level rules, recursing into @media."""
-    i, n = 0, len(css)
-    depth = 0
-    buf = []
-    while i < n:
-        ch = css[i]
-        if ch == "/" and css[i:i + 2] == "/*":
-            j = css.find("*/", i)
-            i = n if j < 0 else j + 2
-            continue
-        buf.append(ch)
-        if ch == "{":
-            depth += 1
-        elif ch == "}":
-            depth -= 1
-            if depth == 0:
-                chunk = "".join(buf).strip()
-                buf = []
-                yield chunk
-        i += 1
-
-
-AT_RULE = re.compile(r"^\s*@(media|supports)([^{]*)\{(.*)\}\s*$", re.S)
-
-
 def rescope(one: str, scope_re, repl: str) -> str:
     """Point a legacy-shell selector at `body.tmr-light` instead."""
     # A legacy sheet's own token block. `body.tmr-light :root` matches nothing,
@@ -120,22 +98,23 @@ def rescope(one: str, scope_re, repl: str) -> str:
     return "body.tmr-light " + one
 
 
-def process(chunk: str, scope, out: list[str], repl: str = "body.tmr-light"):
-    m = AT_RULE.match(chunk)
-    if m:
+def process(node, scope, out: list[str], repl: str = "body.tmr-light"):
+    """Derive one parsed css_tree node into `out`, recursing into @media and
+    @supports. Comments never reach a selector or a declaration here."""
+    if not isinstance(node, css_tree.Block):
+        return
+    name = node.at_name()
+    if name in ("media", "supports"):
         inner: list[str] = []
-        for sub in split_rules(m.group(3)):
+        for sub in node.items or []:
             process(sub, scope, inner, repl)
         if inner:
-            out.append(f"@{m.group(1)}{m.group(2)}{{\n" + "\n".join(inner) + "\n}")
+            rest = css_tree.bare(node.prelude).lstrip()[len(name) + 1:]
+            out.append(f"@{name}{rest}{{\n" + "\n".join(inner) + "\n}")
         return
 
-    if "{" not in chunk:
-        return
-    sel, _, body = chunk.partition("{")
-    body = body.rstrip().rstrip("}")
-    sel = " ".join(sel.split())
-    if sel.startswith("@"):
+    sel = " ".join(css_tree.bare(node.prelude).split())
+    if name or sel.startswith("@") or node.body is None:
         return
     if KEEP_DARK.search(sel):
         return
@@ -146,20 +125,22 @@ def process(chunk: str, scope, out: list[str], repl: str = "body.tmr-light"):
     # palette -- tmr-page-polish.css keeps its whole dark ramp in one such
     # `:root` -- and skipping those is what left .tmr-glass a dark card on an
     # otherwise converted page.
+    all_decls = css_tree.declarations(node.body)
     decls = []
-    for d in body.split(";"):
+    for decl in all_decls:
+        d = decl.clean()
         if not d.strip():
             continue
-        prop = d.split(":", 1)[0].strip().lower()
         if not HAS_COLOR_VALUE.search(d):
             continue
+        prop = (decl.prop or "").lower()
         if prop.startswith("--") or COLOR_DECL.search(";" + d + ":"):
             decls.append(d.strip())
     if not decls:
         return
 
     new_body, changed = rewrite_declarations(";".join(decls) + ";",
-                                             clip_text=bool(CLIP_TEXT.search(body)))
+                                             clip_text=clips_text(all_decls))
     if not changed:
         return
 
@@ -183,7 +164,10 @@ BANNER = """/* =================================================================
 """
 
 
-def main():
+def build(optimize: bool = True) -> str:
+    """The full text of tmr-light.css: minified, merged and with shadowed
+    declarations dropped (scripts/css_optimize.py) unless `optimize` is
+    False."""
     with io.open(os.path.join(ROOT, BASE.replace("/", os.sep)), "r",
                  encoding="utf-8", newline="") as fh:
         base = fh.read()
@@ -194,18 +178,26 @@ def main():
         with io.open(path, "r", encoding="utf-8", newline="") as fh:
             css = fh.read()
         out: list[str] = []
-        for chunk in split_rules(css):
-            process(chunk, scope, out, repl)
+        for node in css_tree.parse(css):
+            process(node, scope, out, repl)
         chunks.append(f"/* ---- derived from {rel} ---- */\n" + "\n".join(out))
 
     # Derived rules first, hand-written base LAST: the base file is the design
     # decision (one navy, one radius, two shadows) and has to be able to beat a
     # rule it was derived from at equal specificity.
-    body = BANNER + "\n" + "\n\n".join(chunks) + "\n\n" + base + "\n"
-    out_path = os.path.join(ROOT, TARGET.replace("/", os.sep))
-    with io.open(out_path, "w", encoding="utf-8", newline="\n") as fh:
-        fh.write(body)
+    sheet = "\n\n".join(chunks) + "\n\n" + base + "\n"
+    if optimize:
+        sheet = css_optimize.optimize(sheet)
+    return BANNER + "\n" + sheet
+
+
+def main():
+    body = build(optimize="--pretty" not in sys.argv)
+    write_output(os.path.join(ROOT, TARGET.replace("/", os.sep)), body)
     sys.stderr.write(f"wrote {TARGET} ({len(body)} bytes)\n")
+    if "--pretty" not in sys.argv:
+        sys.stderr.write("optimized: " + css_optimize.report() + "\n")
+    sys.stderr.write(COLOURS.stats() + "\n")
 
 
 if __name__ == "__main__":
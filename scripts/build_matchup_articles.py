@@ -14,7 +14,8 @@ Reads published Game Files from /api/matchups and writes:
     static/media/matchups/<slug>-*.svg    that article's original artwork
     matchups/index.html                   the earlier archive (markers)
     matchups/<sport>/index.html           earlier sport hubs (markers)
-    sitemap.xml                           <!-- BEGIN_MATCHUP_URLS --> block
+    static/data/gamefiles/<hub>/*.json    content-hashed archive feeds per hub
+    sitemap.xml                           MATCHUP section (scripts/sitemap_sections.py)
 
 It does NOT write the homepage. The homepage link updates itself: the ticker
 reads /api/matchups/today and follows the `url` the API returns, so featuring a
@@ -25,6 +26,9 @@ Build only. Does NOT commit or deploy. Run from the repo root:
     python scripts/build_matchup_articles.py
     python scripts/build_matchup_articles.py --dry-run
     python scripts/build_matchup_articles.py --from-file drafts/g1000.json
+    python scripts/build_matchup_articles.py --full      # ignore the manifest
+    python scripts/build_matchup_articles.py --full --jobs 8
+    python scripts/build_matchup_articles.py --rebuild-art
 
 THE TWO RULES THIS FILE EXISTS TO ENFORCE
 -----------------------------------------
@@ -49,18 +53,50 @@ THE TWO RULES THIS FILE EXISTS TO ENFORCE
    non-zero having written nothing, and the last good bake stays live.
 
 Idempotent: re-running replaces content between <!--MK:key--> markers.
+
+INCREMENTAL_BAKE_20261019. An article page is a function of its own record, its
+provenance, its prev/next neighbours and this file. matchup-of-the-day/
+.bake-manifest.json records a hash of exactly those inputs per slug, and an
+article whose hash matches and whose page is on disk is not rendered again.
+Rule 2 still holds for the dirty set: every dirty article renders into memory
+before anything is written, and the manifest is written last, so a bake that
+stops part-way re-renders the same articles next time. A new article dirties
+its neighbour (the neighbour's prev/next link changes); editing this file
+dirties everything (so does editing build_matchup_graphics.py, whose
+artwork is only redrawn for articles the bake fetched). --full ignores the
+manifest.
+
+STREAMED_INGEST_20261019. /api/matchups returns every article ever published
+with its body and provenance, in one response that grows by an article a day,
+on a 512MB Render instance. When the API serves /api/matchups/index - every
+article's listing fields and a content_hash, no bodies - the bake reads that
+instead, works out the dirty set from it, and fetches full records only for
+the dirty articles, BODY_PAGE slugs per request and BODY_JOBS requests at a
+time. The declared-count check runs on the index exactly as it did on the full
+payload. A body that is missing, or whose content_hash no longer matches the
+index, aborts the bake before anything is written. An API without the index
+endpoint (404) gets the old single full read.
 """
 
 import argparse
 import calendar as cal
+import concurrent.futures
 import datetime as dt
+import hashlib
 import html
 import json
 import os
 import re
 import sys
+import urllib.error
+import urllib.parse
 import urllib.request
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import build_matchup_graphics as art  # noqa: E402
+import sitemap_sections  # noqa: E402
+from output_writer import summary, write_output  # noqa: E402
+
 API = os.environ.get("TMR_API", "https://trustmyrecord-api.onrender.com/api")
 SITE = "https://trustmyrecord.com"
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -89,6 +125,9 @@ SUPERSEDED = {
 }
 SITEMAP = os.path.join(ROOT, "sitemap.xml")
 HOME = os.path.join(ROOT, "index.html")
+# Dot-named, so GitHub Pages (Jekyll) never publishes it.
+MANIFEST = os.path.join(MOTD_DIR, ".bake-manifest.json")
+ARCHIVE_CACHE = os.path.join(MOTD_DIR, ".archive-cache.json")
 
 def article_rel(article):
     """The article's path, relative to the repo root. ONE definition, because
@@ -182,25 +221,13 @@ def write(path, text):
     conflict generator and an enormous pointless Pages rebuild.
 
     A NEW file gets LF, which is what every other generator here emits.
+
+    The bytes go through output_writer.write_output: an unchanged file is not
+    touched at all, a changed one is replaced atomically, and the read-back
+    hash check is what catches C: writing a Game File as 40KB of \x00 - a file
+    that would pass every downstream check that only looks at its size.
     """
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    newline = "\n"
-    if os.path.exists(path):
-        with open(path, "rb") as f:
-            existing = f.read()
-        crlf = existing.count(b"\r\n")
-        lf = existing.count(b"\n") - crlf
-        if crlf > lf:
-            newline = "\r\n"
-    with open(path, "w", encoding="utf-8", newline=newline) as f:
-        f.write(text)
-    # C: on this machine intermittently writes files as all-NULL bytes. A Game
-    # File that bakes to 40KB of \x00 would pass every downstream check that
-    # only looks at file size.
-    with open(path, "rb") as f:
-        head = f.read(64)
-    if head and set(head) == {0}:
-        raise RuntimeError(f"{path} wrote as NULL bytes - refusing to continue")
+    return write_output(path, text, preserve_newlines=True)
 
 
 def replace_marker(text, key, payload, path_for_error):
@@ -611,6 +638,38 @@ def render_block(block):
     return fn(block)
 
 
+# Blocks that read as running text. In a section that mixes them with charts
+# they go in the left column of the duo layout (see render_body).
+PROSE = frozenset(("p", "h3", "list", "call"))
+
+
+def plan_module(module):
+    """Render a module's blocks in ONE sweep, sorted as they go.
+
+    RENDER_PLAN_20261019. render_body used to filter `blocks` four times (main,
+    aside, prose, data) and then render whichever lists the layout needed, so
+    every block was classified up to four times before it was drawn once. The
+    plan reads each block once, renders it once, and files the HTML under every
+    stream it belongs to; order within each stream is the authored order, so
+    the joined HTML is byte-for-byte what the filters produced. Render time is
+    then linear in blocks whatever the layout. scripts/bench_block_renderers.py
+    checks that equivalence and shows where the time actually goes: in the
+    b_* renderers (trendboard first), not in the classification.
+
+    Returns {"main", "aside", "prose", "data"}, each a list of HTML strings.
+    """
+    plan = {"main": [], "aside": [], "prose": [], "data": []}
+    for b in module.get("blocks") or []:
+        meta = b or {}
+        html = render_block(b)
+        if meta.get("slot") == "aside":
+            plan["aside"].append(html)
+            continue
+        plan["main"].append(html)
+        plan["prose" if meta.get("type", "p") in PROSE else "data"].append(html)
+    return plan
+
+
 def module_id(module, index):
     raw = module.get("id") or module.get("module") or module.get("heading") or ("section-%d" % index)
     slug = re.sub(r"[^a-z0-9]+", "-", str(raw).lower()).strip("-")
@@ -641,11 +700,10 @@ def render_body(article):
         # publish gate walks body_json[].blocks[], so anything moved out of that
         # array would be rendered on a live page without its numbers ever being
         # checked. Layout choice must not create a hole in the guarantee.
-        main_bs = [b for b in module.get("blocks") or [] if (b or {}).get("slot") != "aside"]
-        aside_bs = [b for b in module.get("blocks") or [] if (b or {}).get("slot") == "aside"]
+        plan = plan_module(module)
         sub = ('<p class="gf-sect-sub">%s</p>' % esc(module.get("sub"))) if module.get("sub") else ""
         mark = (' data-mark="%s"' % esc(module["mark"])) if module.get("mark") else ""
-        aside = "".join(render_block(b) for b in aside_bs)
+        aside = "".join(plan["aside"])
 
         # ---- prose and data side by side, not stacked -----------------------
         #
@@ -660,18 +718,13 @@ def render_body(article):
         # feature and keeps it readable. Sections that are all prose or all
         # visuals (the trend board) are left alone and run full width; splitting
         # those would only make a column of nothing.
-        PROSE = {"p", "h3", "list", "call"}
-        prose_bs = [b for b in main_bs if (b or {}).get("type", "p") in PROSE]
-        data_bs = [b for b in main_bs if (b or {}).get("type", "p") not in PROSE]
-
-        if prose_bs and data_bs and not aside_bs:
+        if plan["prose"] and plan["data"] and not plan["aside"]:
             body = ('<div class="gf-duo">'
                     '<div class="gf-duo-read">%s</div>'
                     '<div class="gf-duo-data">%s</div></div>' % (
-                        "".join(render_block(b) for b in prose_bs),
-                        "".join(render_block(b) for b in data_bs)))
+                        "".join(plan["prose"]), "".join(plan["data"])))
         else:
-            blocks = "".join(render_block(b) for b in main_bs)
+            blocks = "".join(plan["main"])
             body = ('<div class="gf-split"><div class="gf-split-main">%s</div>'
                     '<div class="gf-split-aside">%s</div></div>' % (blocks, aside)) if aside else blocks
         out.append(
@@ -768,15 +821,57 @@ def collect_media(articles):
     return wanted
 
 
-def fetch_media(wanted):
+# MEDIA_MANIFEST_20261019. One row per downloaded asset: {src: {"sha256",
+# "bytes", "source"}}. A src with a row is taken as present without touching the
+# disk, which is what keeps a bake over a season of headshots from stat-ing every
+# one of them. --verify-media re-hashes every recorded file instead, and a file
+# that no longer matches its row (a silent truncation, a bad checkout) is
+# fetched again and accepted ONLY if it hashes back to the recorded bytes - the
+# picture a published article shows never changes underneath it. Dot-named, so
+# Pages does not publish it.
+MEDIA_MANIFEST = os.path.join(ROOT, "static", "media", ".media-manifest.json")
+MEDIA_JOBS = 8
+
+
+def load_media_manifest():
+    try:
+        with open(MEDIA_MANIFEST, encoding="utf-8") as f:
+            return dict(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def media_row(blob, remote):
+    return {"sha256": hashlib.sha256(blob).hexdigest(), "bytes": len(blob), "source": remote}
+
+
+def download(remote):
+    """(bytes, None) or (None, error). Never raises: the caller decides, after
+    every download has finished, whether the bake may go on."""
+    try:
+        req = urllib.request.Request(remote, headers={"User-Agent": "TrustMyRecord/1.0 (+%s)" % SITE})
+        with urllib.request.urlopen(req, timeout=45) as r:
+            return r.read(), None
+    except Exception as err:                            # noqa: BLE001
+        return None, err
+
+
+def fetch_media(wanted, verify=False, jobs=MEDIA_JOBS):
     """Download anything not already in the tree. Returns how many were new.
 
     NEVER re-downloads and never deletes. An asset already committed is the one
     the published article is showing; re-fetching it would let a CDN change the
     picture under a piece that has already been read, and would churn the repo
-    on every bake for no reason.
+    on every bake for no reason. (The one exception is restoring a file that
+    no longer matches its manifest row, and only to those exact bytes.)
+
+    Downloads run `jobs` at a time, and every one of them finishes and passes
+    its checks before the first file is written, so a bad download still stops
+    the bake with nothing on disk - not halfway through a backfill.
     """
-    added = 0
+    manifest = load_media_manifest()
+    adopted = False
+    todo = []                                           # (src, remote, path, sha256 or None)
     for src, remote in sorted(wanted.items()):
         if not src.startswith("/static/"):
             sys.exit("ABORT: media src %r is not a /static/ path" % src)
@@ -784,17 +879,35 @@ def fetch_media(wanted):
             sys.exit("ABORT: refusing to download %r - host is not on the allow-list" % remote)
 
         path = os.path.join(ROOT, src.lstrip("/").replace("/", os.sep))
+        row = manifest.get(src)
+        if row and not verify:
+            continue
+        if row:
+            try:
+                with open(path, "rb") as f:
+                    ok = hashlib.sha256(f.read()).hexdigest() == row["sha256"]
+            except OSError:
+                ok = False
+            if not ok:
+                print("media  %s does not match its manifest row; restoring it" % src)
+                todo.append((src, row.get("source") or remote, path, row["sha256"]))
+            continue
         if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Committed before the manifest existed: record it, do not fetch it.
+            with open(path, "rb") as f:
+                manifest[src] = media_row(f.read(), remote)
+            adopted = True
             continue
+        todo.append((src, remote, path, None))
 
-        try:
-            req = urllib.request.Request(remote, headers={"User-Agent": "TrustMyRecord/1.0 (+%s)" % SITE})
-            with urllib.request.urlopen(req, timeout=45) as r:
-                blob = r.read()
-        except Exception as err:                        # noqa: BLE001
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        results = list(pool.map(download, [remote for _, remote, _, _ in todo]))
+
+    blobs = []
+    for (src, remote, path, sha), (blob, err) in zip(todo, results):
+        if err is not None:
             sys.exit("ABORT: could not download %s (%s). Nothing written; the "
                      "last good bake stays live." % (remote, err))
-
         ext = os.path.splitext(path)[1].lower()
         expected = MAGIC.get(ext)
         if not blob:
@@ -802,13 +915,18 @@ def fetch_media(wanted):
         if expected and not any(blob.lstrip()[:16].startswith(m) for m in expected):
             sys.exit("ABORT: %s did not return a %s (got %r). An error page is "
                      "valid bytes; it is not an image." % (remote, ext, blob[:24]))
-
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "wb") as f:
-            f.write(blob)
+        if sha and hashlib.sha256(blob).hexdigest() != sha:
+            sys.exit("ABORT: %s no longer serves the bytes %s was published with. "
+                     "Restore it from git; a published picture does not change." % (remote, src))
+        blobs.append((src, remote, path, blob))
+
+    for src, remote, path, blob in blobs:
+        write_output(path, blob)
+        manifest[src] = media_row(blob, remote)
         print("media  %-58s %7d bytes" % (src, len(blob)))
-        added += 1
-    return added
+    if blobs or adopted:
+        write_output(MEDIA_MANIFEST, json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+    return len(blobs)
 
 
 def graphics_spec(article):
@@ -1335,7 +1453,114 @@ def months_between(first, last):
     return span
 
 
-def calendar_html(articles, today):
+# ARCHIVE_FRAGMENTS_20261019. The calendar grid and the dated index are built
+# per month, and a month's markup only changes when one of its articles does,
+# when "today" moves into or out of it, or when the strip grows a month on
+# either side of it (the prev/next arrows). FragmentCache keeps each month's
+# markup with a hash of exactly those inputs in matchup-of-the-day/
+# .archive-cache.json; a month whose inputs hash the same is reused as-is, so a
+# daily bake rebuilds the current month and whatever month a changed article
+# sits in, and the cost of a closed season is one hash per month. The cache is
+# keyed to the renderer version, so editing this file drops it, and months no
+# longer in the archive are dropped on save.
+
+class FragmentCache:
+    """{kind: {key: [inputs hash, html]}}, persisted between bakes."""
+
+    def __init__(self, path, version):
+        self.path, self.version = path, version
+        self.slots, self.used = {}, set()
+        self.hits = self.misses = 0
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == version:
+                self.slots = dict(data.get("fragments") or {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, kind, key, inputs, render):
+        digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str)
+                                .encode("utf-8")).hexdigest()[:20]
+        slot = self.slots.setdefault(kind, {})
+        self.used.add((kind, key))
+        hit = slot.get(key)
+        if hit and hit[0] == digest:
+            self.hits += 1
+            return hit[1]
+        self.misses += 1
+        slot[key] = [digest, render()]
+        return slot[key][1]
+
+    def save(self):
+        fragments = {kind: {k: v for k, v in slot.items() if (kind, k) in self.used}
+                     for kind, slot in self.slots.items()}
+        write_output(self.path, json.dumps({"version": self.version, "fragments": fragments},
+                                           indent=1, sort_keys=True) + "\n")
+
+
+def _uncached(kind, key, inputs, render):
+    return render()
+
+
+def calendar_month(year, month, days, today, prev_ym, next_ym):
+    """One month's grid. `days` maps day number -> article."""
+    key = "%04d-%02d" % (year, month)
+    first_weekday, days_in_month = cal.monthrange(year, month)
+    # monthrange counts from Monday; the grid starts on Sunday.
+    pad = (first_weekday + 1) % 7
+
+    cells = ['<span class="gf-cal-dow" aria-hidden="true">%s</span>' % d
+             for d in DOW_ABBR]
+    cells += ['<span class="gf-cal-pad" aria-hidden="true"></span>'] * pad
+
+    for number in range(1, days_in_month + 1):
+        article = days.get(number)
+        classes = ["gf-cal-day"]
+        if number == today:
+            classes.append("gf-cal-day--today")
+        if article:
+            classes.append("gf-cal-day--has")
+            cells.append(
+                '<a class="%s" href="%s" aria-label="%s %d: %s vs. %s">'
+                '<span class="gf-cal-n">%d</span></a>' % (
+                    " ".join(classes), esc(article_href(article)),
+                    MONTH_ABBR[month - 1], number,
+                    esc(article["away_team"]), esc(article["home_team"]),
+                    number))
+        else:
+            cells.append(
+                '<span class="%s"><span class="gf-cal-n">%d</span></span>' % (
+                    " ".join(classes), number))
+
+    if prev_ym:
+        prev_year, prev_month = prev_ym
+        nav_prev = ('<a class="gf-cal-nav" href="#cal-%04d-%02d" '
+                    'data-gf-cal-go="%04d-%02d" rel="prev">&larr;&nbsp;%s</a>' % (
+                        prev_year, prev_month, prev_year, prev_month,
+                        MONTH_ABBR[prev_month - 1]))
+    else:
+        nav_prev = ('<span class="gf-cal-nav gf-cal-nav--off" '
+                    'aria-hidden="true">&larr;</span>')
+
+    if next_ym:
+        next_year, next_month = next_ym
+        nav_next = ('<a class="gf-cal-nav" href="#cal-%04d-%02d" '
+                    'data-gf-cal-go="%04d-%02d" rel="next">%s&nbsp;&rarr;</a>' % (
+                        next_year, next_month, next_year, next_month,
+                        MONTH_ABBR[next_month - 1]))
+    else:
+        nav_next = ('<span class="gf-cal-nav gf-cal-nav--off" '
+                    'aria-hidden="true">&rarr;</span>')
+
+    return ('<div class="gf-cal-month" id="cal-%s" data-month="%s">'
+            '<div class="gf-cal-bar">%s<h3 class="gf-cal-title">%s</h3>%s</div>'
+            '<div class="gf-cal-grid">%s</div>'
+            '</div>' % (key, key, nav_prev, esc(month_label(year, month)),
+                        nav_next, "".join(cells)))
+
+
+def calendar_html(articles, today, cache=None):
     """One grid per month. Days that published link to that day's own URL."""
     by_day = {}
     for a in articles:                      # newest first; first writer wins
@@ -1348,64 +1573,22 @@ def calendar_html(articles, today):
 
     span = months_between(min(by_day), max(max(by_day), today))
     open_key = month_key(today if (today.year, today.month) in span else max(by_day))
+    months = {}
+    for day, a in by_day.items():
+        months.setdefault((day.year, day.month), {})[day.day] = a
 
+    fragment = cache.get if cache else _uncached
     blocks = []
     for i, (year, month) in enumerate(span):
-        key = "%04d-%02d" % (year, month)
-        first_weekday, days_in_month = cal.monthrange(year, month)
-        # monthrange counts from Monday; the grid starts on Sunday.
-        pad = (first_weekday + 1) % 7
-
-        cells = ['<span class="gf-cal-dow" aria-hidden="true">%s</span>' % d
-                 for d in DOW_ABBR]
-        cells += ['<span class="gf-cal-pad" aria-hidden="true"></span>'] * pad
-
-        for number in range(1, days_in_month + 1):
-            day = dt.date(year, month, number)
-            article = by_day.get(day)
-            classes = ["gf-cal-day"]
-            if day == today:
-                classes.append("gf-cal-day--today")
-            if article:
-                classes.append("gf-cal-day--has")
-                cells.append(
-                    '<a class="%s" href="%s" aria-label="%s %d: %s vs. %s">'
-                    '<span class="gf-cal-n">%d</span></a>' % (
-                        " ".join(classes), esc(article_href(article)),
-                        MONTH_ABBR[month - 1], number,
-                        esc(article["away_team"]), esc(article["home_team"]),
-                        number))
-            else:
-                cells.append(
-                    '<span class="%s"><span class="gf-cal-n">%d</span></span>' % (
-                        " ".join(classes), number))
-
-        if i > 0:
-            prev_year, prev_month = span[i - 1]
-            nav_prev = ('<a class="gf-cal-nav" href="#cal-%04d-%02d" '
-                        'data-gf-cal-go="%04d-%02d" rel="prev">&larr;&nbsp;%s</a>' % (
-                            prev_year, prev_month, prev_year, prev_month,
-                            MONTH_ABBR[prev_month - 1]))
-        else:
-            nav_prev = ('<span class="gf-cal-nav gf-cal-nav--off" '
-                        'aria-hidden="true">&larr;</span>')
-
-        if i + 1 < len(span):
-            next_year, next_month = span[i + 1]
-            nav_next = ('<a class="gf-cal-nav" href="#cal-%04d-%02d" '
-                        'data-gf-cal-go="%04d-%02d" rel="next">%s&nbsp;&rarr;</a>' % (
-                            next_year, next_month, next_year, next_month,
-                            MONTH_ABBR[next_month - 1]))
-        else:
-            nav_next = ('<span class="gf-cal-nav gf-cal-nav--off" '
-                        'aria-hidden="true">&rarr;</span>')
-
-        blocks.append(
-            '<div class="gf-cal-month" id="cal-%s" data-month="%s">'
-            '<div class="gf-cal-bar">%s<h3 class="gf-cal-title">%s</h3>%s</div>'
-            '<div class="gf-cal-grid">%s</div>'
-            '</div>' % (key, key, nav_prev, esc(month_label(year, month)),
-                        nav_next, "".join(cells)))
+        days = months.get((year, month), {})
+        prev_ym = span[i - 1] if i > 0 else None
+        next_ym = span[i + 1] if i + 1 < len(span) else None
+        today_n = today.day if (today.year, today.month) == (year, month) else None
+        inputs = [sorted((n, article_href(a), a["away_team"], a["home_team"])
+                         for n, a in days.items()), today_n, prev_ym, next_ym]
+        blocks.append(fragment(
+            "calendar", "%04d-%02d" % (year, month), inputs,
+            lambda: calendar_month(year, month, days, today_n, prev_ym, next_ym)))
 
     return ('<div class="gf-cal" data-gf-cal data-current="%s">%s</div>'
             '<p class="gf-cal-key">'
@@ -1414,7 +1597,7 @@ def calendar_html(articles, today):
             '</p>' % (open_key, "".join(blocks)))
 
 
-def by_month_html(articles):
+def by_month_html(articles, cache=None):
     """The calendar's plain-text twin: every article as a dated line.
 
     A grid of numbers is quick to scan and tells you nothing about what is on
@@ -1424,10 +1607,11 @@ def by_month_html(articles):
     seen = {}
     # Re-sorted rather than trusting the caller's order: a backfilled day arrives
     # with a much later published_at and would otherwise sit at the top of its
-    # month above days that came after it.
-    for a in sorted(articles, key=lambda x: (archive_day(x) or dt.date.min,
-                                             x.get("id") or 0), reverse=True):
-        day = archive_day(a)
+    # month above days that came after it. archive_day is computed once per
+    # article, not once per comparison.
+    dated = [(archive_day(a), a) for a in articles]
+    for day, a in sorted(dated, key=lambda x: (x[0] or dt.date.min,
+                                               x[1].get("id") or 0), reverse=True):
         if not day:
             continue
         key = month_key(day)
@@ -1440,17 +1624,24 @@ def by_month_html(articles):
         return ('<p class="gf-empty">The dated index starts with our first '
                 'Matchup of the Day.</p>')
 
-    out = []
-    for year, month, key in groups:
+    def month_list(year, month, entries):
         rows = "".join(
             '<li><span class="gf-mo-d">%s %d</span>'
             '<a href="%s">%s</a></li>' % (
-                MONTH_ABBR[day.month - 1], day.day, esc(article_href(a)),
-                esc(a.get("title") or "%s vs. %s" % (a["away_team"], a["home_team"])))
-            for day, a in seen[key])
-        out.append('<div class="gf-mo"><h3 class="gf-mo-h">%s</h3>'
-                   '<ul class="gf-mo-list">%s</ul></div>' % (
-                       esc(month_label(year, month)), rows))
+                MONTH_ABBR[day.month - 1], day.day, esc(href), esc(title))
+            for day, href, title in entries)
+        return ('<div class="gf-mo"><h3 class="gf-mo-h">%s</h3>'
+                '<ul class="gf-mo-list">%s</ul></div>' % (
+                    esc(month_label(year, month)), rows))
+
+    fragment = cache.get if cache else _uncached
+    out = []
+    for year, month, key in groups:
+        entries = [(day, article_href(a),
+                    a.get("title") or "%s vs. %s" % (a["away_team"], a["home_team"]))
+                   for day, a in seen[key]]
+        out.append(fragment("by_month", key, entries,
+                            lambda: month_list(year, month, entries)))
     return "".join(out)
 
 
@@ -1470,42 +1661,345 @@ def itemlist_jsonld(articles, list_url, name):
         payload, indent=2, ensure_ascii=False)
 
 
-def sitemap_block(articles, hubs):
-    lines = ["  <!-- BEGIN_MATCHUP_URLS -->"]
-    for loc, lastmod in hubs:
-        lines.append('  <url><loc>%s</loc><lastmod>%s</lastmod>'
-                     '<changefreq>daily</changefreq><priority>0.8</priority></url>' % (loc, lastmod))
+# ============================================================ archive feeds ==
+#
+# GAMEFILE_FEEDS_20261019. A hub bakes its first 20-40 cards; anything deeper
+# used to mean the live API. Each bake also publishes every hub's full listing
+# as static JSON under static/data/gamefiles/<hub>/:
+#
+#     page-<n>.<sha12>.json     FEED_PAGE cards per page, numbered from the
+#                               oldest; page 1 is the first FEED_PAGE ever
+#                               published, the last page the newest (and the
+#                               only one still filling)
+#     <yyyy-mm>.<sha12>.json    one month of the archive, by archive_day
+#
+# Named by content hash, because the CDN caches by path and ignores ?v=, and
+# carrying no timestamp, so an unchanged page keeps its URL. Numbering from the
+# oldest end is what keeps them unchanged: a new article lands on the last page
+# only, where newest-first slicing shifted every card down one and renamed every
+# page. For the same reason no page carries the page count or the total - those
+# live in the index below. The current names
+# go into the hub itself as <script type="application/json" id="gfFeed">,
+# inside an MK:gfFeed marker added before </head> the first time. "Load more"
+# and archive browsing can then page through the CDN without an origin call,
+# while the hub's own HTML grows by one URL per page and per month. Files
+# named by neither this bake nor the previous one are removed.
+FEEDS_DIR = os.path.join(ROOT, "static", "data", "gamefiles")
+FEED_PAGE = 40
+_FEED_SCRIPT = re.compile(r'<script type="application/json" id="gfFeed">(.*?)</script>', re.S)
+
+
+def feed_item(a):
+    day = archive_day(a)
+    return {
+        "url": article_href(a),
+        "sport": a["sport"],
+        "matchup": "%s vs. %s" % (a["away_team"], a["home_team"]),
+        "title": a.get("title") or "",
+        "dek": a.get("dek") or a.get("meta_description") or "",
+        "angle_label": a.get("angle_label") or "",
+        "published_at": a.get("published_at") or "",
+        "day": day.isoformat() if day else "",
+    }
+
+
+def feed_files(hub, articles):
+    """[(path, bytes)] for one hub's feeds, and the {"pages", "months",
+    "total", "per_page"} index of their public URLs. `articles` is the hub's
+    listing, newest first; index["pages"] runs oldest page first, so "load
+    more" walks it from the end. Cards within a page stay newest first."""
+    files, index = [], {"pages": [], "months": {}, "total": len(articles),
+                        "per_page": FEED_PAGE}
+
+    def put(name, doc):
+        body = json.dumps(doc, sort_keys=True, separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+        full = "%s.%s.json" % (name, hashlib.sha256(body).hexdigest()[:12])
+        files.append((os.path.join(FEEDS_DIR, hub, full), body))
+        return "/static/data/gamefiles/%s/%s" % (hub, full)
+
+    items = [feed_item(a) for a in articles]
+    oldest = items[::-1]
+    pages = max(1, -(-len(items) // FEED_PAGE))
+    for n in range(1, pages + 1):
+        index["pages"].append(put("page-%d" % n, {
+            "hub": hub, "page": n,
+            "items": oldest[(n - 1) * FEED_PAGE:n * FEED_PAGE][::-1]}))
+    months = {}
+    for item in items:
+        if item["day"]:
+            months.setdefault(item["day"][:7], []).append(item)
+    for key in sorted(months, reverse=True):
+        index["months"][key] = put(key, {"hub": hub, "month": key, "items": months[key]})
+    return files, index
+
+
+def set_feed(text, index):
+    """Bake a hub's feed index into it. Returns (text, URLs it named before)."""
+    old = _FEED_SCRIPT.search(text)
+    before = []
+    if old:
+        try:
+            data = json.loads(old.group(1))
+            before = list(data.get("pages") or []) + list((data.get("months") or {}).values())
+        except ValueError:
+            pass
+    block = ('<script type="application/json" id="gfFeed">%s</script>'
+             % json.dumps(index, sort_keys=True))
+    if "<!--MK:gfFeed-->" not in text:
+        text = text.replace("</head>", "<!--MK:gfFeed--><!--/MK:gfFeed-->\n</head>", 1)
+    return replace_marker(text, "gfFeed", block, "hub"), before
+
+
+def prune_feeds(keep):
+    """Remove feed files no hub names in this bake or the one before."""
+    keep = {os.path.normpath(os.path.join(ROOT, u.lstrip("/"))) for u in keep}
+    for folder, _, names in os.walk(FEEDS_DIR):
+        for name in names:
+            path = os.path.normpath(os.path.join(folder, name))
+            if name.endswith(".json") and path not in keep:
+                os.remove(path)
+
+
+def sitemap_entries(articles, hubs):
+    """The MATCHUP section of sitemap.xml, as sitemap_sections entries. The
+    section's place in the file is fixed by sitemap_sections.ORDER."""
+    out = [sitemap_sections.entry(loc, lastmod, "daily", "0.8") for loc, lastmod in hubs]
     for a in articles:
         # lastmod is the article's real content-modified date. It is NOT today's
         # date, and a widget refresh does not move it: a lastmod that changes
         # every day on a page that did not change teaches Google to ignore it.
         lastmod = iso_date(a.get("content_modified_at") or a.get("published_at"))
-        lines.append('  <url><loc>%s</loc>%s'
-                     '<changefreq>monthly</changefreq><priority>0.7</priority></url>' % (
-                         article_abs(a),
-                         "<lastmod>%s</lastmod>" % lastmod if lastmod else ""))
-    lines.append("  <!-- END_MATCHUP_URLS -->")
-    return "\n".join(lines)
+        out.append(sitemap_sections.entry(article_abs(a), lastmod, "monthly", "0.7"))
+    return out
 
 
-def update_sitemap(text, block):
-    text = re.sub(r"\s*<!-- BEGIN_MATCHUP_URLS -->.*?<!-- END_MATCHUP_URLS -->", "", text, flags=re.S)
-    return text.replace("</urlset>", block + "\n</urlset>")
+# ---------------------------------------------------------------------- main
 
+def renderer_version():
+    """Any edit to this file - template, block renderers, helpers - counts as
+    a new renderer. Coarser than necessary, never wrong."""
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+# What /api/matchups/index leaves out. Everything else on a record is a
+# listing field the hubs, calendar and sitemap read.
+HEAVY_FIELDS = ("body_json", "postgame_json", "research_json", "provenance")
+BODY_PAGE = 25
+BODY_JOBS = 4
+
+
+def content_hash(article):
+    """The API's hash of an article's heavy fields when it sends one (the index
+    always does); otherwise computed here from the same fields. A local hash
+    only ever keys the bake manifest - it is never compared with the API's,
+    whose serialisation this file does not know."""
+    if article.get("content_hash"):
+        return article["content_hash"]
+    blob = json.dumps({k: article.get(k) for k in HEAVY_FIELDS},
+                      sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def input_hash(article, neighbours, version):
+    """Hash of everything render_article() reads: the listing fields, the
+    heavy fields by their content_hash, and the three values each neighbour's
+    prev/next link prints. Computable from an index row."""
+    def link(n):
+        return None if n is None else [article_href(n), n["away_team"], n["home_team"]]
+    row = {k: v for k, v in article.items() if k not in HEAVY_FIELDS}
+    row["content_hash"] = content_hash(article)
+    blob = json.dumps({"article": row, "neighbours": [link(n) for n in neighbours],
+                       "renderer": version},
+                      sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def load_manifest(section="articles"):
+    """{slug: input hash} from the last complete bake, or another section of
+    the same manifest. A missing or unreadable manifest is an empty one, which
+    means a full render - never a skipped one."""
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            data = json.load(f)
+        return dict(data.get(section) or {})
+    except (OSError, ValueError, AttributeError, TypeError):
+        return {}
+
+
+# SUPERSEDED_STATE_20261019. Every bake used to read each SUPERSEDED page in
+# full and re-run both substitutions on it, then write it back, even though
+# after the first bake the canonical already names the new address. With one
+# entry that was noise; with the hundreds a bulk URL migration would add it is
+# seconds per bake, spent proving nothing changed. Now only each page's <head>
+# is read - the tags live there, so the body never is - and the manifest
+# records, per old path, the target it was pointed at and a hash of that head.
+# A page whose target and head hash still match is left alone without running
+# a single pattern; anything else is checked, and rewritten only if its
+# canonical or og:url is actually wrong. The state is derived from content,
+# not mtimes, because CI bakes from a fresh checkout and an mtime in a
+# committed manifest would change on every run.
+_CANONICAL = re.compile(r'<link rel="canonical" href="([^"]*)">')
+_OG_URL = re.compile(r'<meta property="og:url" content="([^"]*)">')
+
+
+def read_head(path, chunk=1 << 16):
+    """The file's bytes up to and including </head>, without reading the body."""
+    data = b""
+    with open(path, "rb") as f:
+        while b"</head>" not in data:
+            block = f.read(chunk)
+            if not block:
+                break
+            data += block
+    end = data.find(b"</head>")
+    return data[:end + 7] if end >= 0 else data
+
+
+def head_state(path, target):
+    return [target, hashlib.sha256(read_head(path)).hexdigest()[:16]]
+
+
+def repoint_superseded(applied):
+    """Point each SUPERSEDED page's canonical and og:url at its new address.
+    `applied` is the state from the last bake; returns the state to save."""
+    state, rewritten = {}, 0
+    for old_rel, new_rel in SUPERSEDED.items():
+        old_file = os.path.join(ROOT, old_rel.replace("/", os.sep), "index.html")
+        if not os.path.exists(old_file):
+            continue
+        head = read_head(old_file)
+        key = [new_rel, hashlib.sha256(head).hexdigest()[:16]]
+        if applied.get(old_rel) == key:
+            state[old_rel] = key
+            continue
+        new_url = "%s/%s/" % (SITE, new_rel)
+        head = head.decode("utf-8", "replace")
+        canonical = _CANONICAL.search(head)
+        og = _OG_URL.search(head)
+        if canonical and canonical.group(1) == new_url and (not og or og.group(1) == new_url):
+            state[old_rel] = key
+            continue
+        page = read(old_file)
+        page, n = re.subn(r'<link rel="canonical" href="[^"]*">',
+                          '<link rel="canonical" href="%s">' % new_url, page, count=1)
+        if not n:
+            print("WARN: %s has no canonical tag to repoint" % old_rel)
+            continue
+        # og:url follows the canonical, or a share preview names the old address.
+        page = re.sub(r'<meta property="og:url" content="[^"]*">',
+                      '<meta property="og:url" content="%s">' % new_url, page, count=1)
+        write(old_file, page)
+        state[old_rel] = head_state(old_file, new_rel)
+        rewritten += 1
+        print("canonical %s -> %s" % (old_rel, new_rel))
+    print("superseded: %d page(s), %d repointed" % (len(state), rewritten))
+    return state
+
+
+def _render_task(task):
+    """render_article() for a worker process. Top-level so it pickles."""
+    article, provenance, neighbours = task
+    return render_article(article, provenance, neighbours)
+
+
+def render_all(tasks, jobs):
+    """[(slug, path, (article, provenance, neighbours))] -> {slug: (path, html)},
+    in the order given. With jobs > 1 the renders run in a process pool; the
+    first failure, in archive order, aborts the bake exactly as the serial loop
+    does, and nothing has been written by then in either mode."""
+    rendered = {}
+    if jobs <= 1 or len(tasks) < 2:
+        for slug, path, task in tasks:
+            try:
+                rendered[slug] = (path, _render_task(task))
+            except Exception as err:                    # noqa: BLE001
+                sys.exit("ABORT: %s failed to render: %s" % (slug, err))
+        return rendered
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [(slug, path, pool.submit(_render_task, task)) for slug, path, task in tasks]
+        for slug, path, future in futures:
+            try:
+                rendered[slug] = (path, future.result())
+            except Exception as err:                    # noqa: BLE001
+                pool.shutdown(wait=True, cancel_futures=True)
+                sys.exit("ABORT: %s failed to render: %s" % (slug, err))
+    return rendered
 
-# ---------------------------------------------------------------------- main
 
 def load_payload(args):
+    """The published set: the index when the API serves one (payload["index"]
+    is then True and the rows carry no bodies), else the full payload."""
     if args.from_file:
         with open(args.from_file, encoding="utf-8") as f:
             return json.load(f)
-    return get(API + "/matchups")
+    # Same retries as every other read: a transient 500 on the index must not
+    # kill the cron bake. Only a 404 means "no index endpoint".
+    try:
+        payload = get(API + "/matchups/index")
+        payload["index"] = True
+        return payload
+    except urllib.error.HTTPError as err:
+        if err.code != 404:
+            sys.exit("ABORT: /api/matchups/index failed (%s). Nothing written; "
+                     "the last good bake stays live." % err)
+    except Exception as err:                            # noqa: BLE001
+        sys.exit("ABORT: could not read /api/matchups/index (%s). Nothing written; "
+                 "the last good bake stays live." % err)
+    try:
+        return get(API + "/matchups")
+    except Exception as err:                            # noqa: BLE001
+        sys.exit("ABORT: could not read /api/matchups (%s). Nothing written; "
+                 "the last good bake stays live." % err)
+
+
+def fetch_bodies(rows, jobs=BODY_JOBS, page=BODY_PAGE):
+    """Full records for the index `rows`, in the same order. Exits if any page
+    fails, any record is missing, or any record is not the one the index
+    described."""
+    slugs = [r["slug"] for r in rows]
+    pages = [slugs[i:i + page] for i in range(0, len(slugs), page)]
+
+    def one(chunk):
+        return get(API + "/matchups?slugs=" + urllib.parse.quote(",".join(chunk), safe=","))
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            results = list(pool.map(one, pages))
+    except Exception as err:                            # noqa: BLE001
+        sys.exit("ABORT: could not fetch Game File bodies (%s). Nothing written; "
+                 "the last good bake stays live." % err)
+    got = {a.get("slug"): a for p in results for a in (p.get("articles") or [])}
+    out = []
+    for r in rows:
+        full = got.get(r["slug"])
+        if full is None:
+            sys.exit("ABORT: /api/matchups did not return the body of %s" % r["slug"])
+        # Only ever the API's own hash on both sides.
+        if not full.get("content_hash"):
+            sys.exit("ABORT: /api/matchups sent the body of %s without a content_hash, "
+                     "so it cannot be checked against the index. Nothing written."
+                     % r["slug"])
+        if full["content_hash"] != r.get("content_hash"):
+            sys.exit("ABORT: %s changed between the index read and the body fetch; "
+                     "re-run the bake" % r["slug"])
+        out.append(full)
+    return out
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--dry-run", action="store_true", help="render everything, write nothing")
     ap.add_argument("--from-file", help="read the /api/matchups payload from a local JSON file")
+    ap.add_argument("--full", action="store_true",
+                    help="re-render every article, ignoring the bake manifest")
+    ap.add_argument("--jobs", type=int, default=1, metavar="N",
+                    help="render articles in N worker processes (default 1)")
+    ap.add_argument("--rebuild-art", action="store_true",
+                    help="redraw every article's artwork, ignoring the art manifest")
+    ap.add_argument("--verify-media", action="store_true",
+                    help="re-hash every downloaded asset against the media manifest")
     args = ap.parse_args()
 
     payload = load_payload(args)
@@ -1537,34 +2031,50 @@ def main():
                        a.get("id") or 0),
         reverse=True)
 
-    # ---- render every page into memory before touching the tree -------------
-    rendered = {}
+    # ---- render every dirty page into memory before touching the tree -------
+    # --rebuild-art needs every body, so it re-renders everything too.
+    manifest = {} if args.full or args.rebuild_art else load_manifest()
+    version = renderer_version() + art.generator_version()
+    dirty, inputs = [], {}
     for i, a in enumerate(ordered):
         prev_a = ordered[i + 1] if i + 1 < len(ordered) else None
         next_a = ordered[i - 1] if i > 0 else None
-        prov = a.get("provenance") or []
-        try:
-            rendered[a["slug"]] = (
-                os.path.join(ROOT, article_rel(a), "index.html"),
-                render_article(a, prov, (prev_a, next_a)))
-        except Exception as err:                        # noqa: BLE001
-            sys.exit("ABORT: %s failed to render: %s" % (a["slug"], err))
+        path = os.path.join(ROOT, article_rel(a), "index.html")
+        inputs[a["slug"]] = input_hash(a, (prev_a, next_a), version)
+        if manifest.get(a["slug"]) == inputs[a["slug"]] and os.path.exists(path):
+            continue
+        dirty.append(i)
+    if payload.get("index") and dirty:
+        # Swap the dirty index rows for full records. Neighbours stay index
+        # rows: a prev/next link only needs listing fields.
+        for i, full in zip(dirty, fetch_bodies([ordered[i] for i in dirty])):
+            ordered[i] = full
+        print("fetched %d of %d Game File bodies" % (len(dirty), len(ordered)))
+    tasks = []
+    for i in dirty:
+        a = ordered[i]
+        prev_a = ordered[i + 1] if i + 1 < len(ordered) else None
+        next_a = ordered[i - 1] if i > 0 else None
+        tasks.append((a["slug"], os.path.join(ROOT, article_rel(a), "index.html"),
+                      (a, a.get("provenance") or [], (prev_a, next_a))))
+    rendered = render_all(tasks, args.jobs)
+    # Only records with a body can feed the media and artwork steps. Without
+    # the index that is every article, as before.
+    bodied = [a for a in ordered if "body_json" in a]
 
     # ---- artwork -----------------------------------------------------------
-    # Generated for every published article on every bake. Output is
-    # deterministic, so an unchanged article rewrites byte-identical files and
-    # produces no diff; a NEW article gets its artwork in the same commit as its
-    # HTML, which is the only way the hero image is never a 404 on the day the
-    # piece goes live.
+    # Checked for every article this bake holds a body for, and drawn only where
+    # the spec or the generator changed (build_matchup_graphics.build_all). A
+    # NEW article gets its artwork in the same commit as its HTML, which is the
+    # only way the hero image is never a 404 on the day the piece goes live.
     if not args.dry_run:
         # Photography first: a missing headshot must stop the bake BEFORE any
         # HTML is written, not after, or the article ships with a broken <img>.
-        fetch_media(collect_media(ordered))
+        fetch_media(collect_media(bodied), verify=args.verify_media)
         try:
-            sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-            import build_matchup_graphics as art
-            for a in ordered:
-                art.build_for_article(a["slug"], graphics_spec(a))
+            drawn, skipped = art.build_all([(a["slug"], graphics_spec(a)) for a in bodied],
+                                           rebuild=args.rebuild_art)
+            print("artwork: drew %d article(s), %d unchanged" % (drawn, skipped))
         except Exception as err:                        # noqa: BLE001
             sys.exit("ABORT: artwork generation failed: %s" % err)
 
@@ -1610,6 +2120,15 @@ def main():
     hub_sports = '<ul class="gf-sportlist">%s</ul>' % "".join(sport_items)
 
     writes = []
+    fragments = FragmentCache(ARCHIVE_CACHE, version)
+    feeds, feed_urls = [], []
+
+    def with_feed(text, hub, listing):
+        files, index = feed_files(hub, listing)
+        feeds.extend(files)
+        text, before = set_feed(text, index)
+        feed_urls.extend(index["pages"] + list(index["months"].values()) + before)
+        return text
 
     # /matchup-of-the-day/ — the daily feature's own home and its archive.
     # Driven off the articles that HAVE an angle, so the legacy /matchups/ pages
@@ -1641,12 +2160,15 @@ def main():
         today_local = (to_display(dt.datetime.now(dt.timezone.utc).isoformat())
                        or dt.datetime.now(dt.timezone.utc)).date()
         text = replace_marker(text, "motdCalendar",
-                              calendar_html(daily, today_local), motd_path)
+                              calendar_html(daily, today_local, fragments), motd_path)
         text = replace_marker(text, "motdByMonth",
-                              by_month_html(daily), motd_path)
+                              by_month_html(daily, fragments), motd_path)
+        print("archive: %d month fragment(s) reused, %d rebuilt" % (
+            fragments.hits, fragments.misses))
         text = replace_marker(text, "motdItemList",
                               itemlist_jsonld(daily, SITE + "/matchup-of-the-day/",
                                               "TMR Matchup of the Day"), motd_path)
+        text = with_feed(text, "matchup-of-the-day", daily)
         writes.append((motd_path, text))
 
         # /matchup-of-the-day/today/ — the front door for the NAV.
@@ -1693,6 +2215,7 @@ def main():
     hub = replace_marker(hub, "matchupsHubSports", hub_sports, hub_path)
     hub = replace_marker(hub, "matchupsHubItemList",
                          itemlist_jsonld(legacy, SITE + "/matchups/", "TMR Game Files"), hub_path)
+    hub = with_feed(hub, "matchups", legacy)
     writes.append((hub_path, hub))
 
     # Iterate over the hub shells that EXIST, not over the sports that happen to
@@ -1727,6 +2250,7 @@ def main():
                               itemlist_jsonld(in_sport, "%s/matchups/%s/" % (SITE, sport),
                                               "%s Game Files" % SPORT_LABEL.get(sport, sport.upper())),
                               sport_path)
+        text = with_feed(text, "matchups-%s" % sport, in_sport)
         writes.append((sport_path, text))
 
     # ---- homepage: intentionally NOT touched --------------------------------
@@ -1757,8 +2281,12 @@ def main():
         for sport in sorted(os.listdir(MATCHUPS_DIR)):
             if os.path.exists(os.path.join(MATCHUPS_DIR, sport, "index.html")):
                 hubs.append(("%s/matchups/%s/" % (SITE, sport), today_iso))
-    sitemap = update_sitemap(read(SITEMAP), sitemap_block(ordered, hubs))
-    writes.append((SITEMAP, sitemap))
+    sitemap = sitemap_sections.Sitemap(SITEMAP)
+    if not sitemap.exists:
+        # Saving would create a sitemap holding only the MATCHUP section, with
+        # every CORE URL gone. Stop before anything is written.
+        sys.exit("ABORT: %s not found. Nothing written." % os.path.relpath(SITEMAP, ROOT))
+    sitemap.set_section("MATCHUP", sitemap_entries(ordered, hubs))
 
     # ---- orphan report. REPORT ONLY. Nothing here deletes anything. ---------
     known = {a["slug"] for a in ordered}
@@ -1785,10 +2313,12 @@ def main():
               "is a deliberate manual act, never a side effect of a bake." % orphan)
 
     if args.dry_run:
-        print("DRY RUN - %d article(s), %d file(s) would be written" % (len(ordered), len(writes) + len(rendered)))
+        print("DRY RUN - %d article(s), %d re-rendered, %d file(s) would be written" % (
+            len(ordered), len(rendered),
+            len(feeds) + len(writes) + len(rendered) + len(sitemap.files())))
         for slug, (path, _) in rendered.items():
             print("  article %s -> %s" % (slug, os.path.relpath(path, ROOT)))
-        for path, _ in writes:
+        for path, _ in feeds + writes + sitemap.files():
             print("  update  %s" % os.path.relpath(path, ROOT))
         return
 
@@ -1796,28 +2326,25 @@ def main():
         write(path, text)
 
     # ---- superseded URLs: repoint the canonical, keep serving --------------
-    for old_rel, new_rel in SUPERSEDED.items():
-        old_file = os.path.join(ROOT, old_rel.replace("/", os.sep), "index.html")
-        if not os.path.exists(old_file):
-            continue
-        new_url = "%s/%s/" % (SITE, new_rel)
-        page = read(old_file)
-        page, n = re.subn(r'<link rel="canonical" href="[^"]*">',
-                          '<link rel="canonical" href="%s">' % new_url, page, count=1)
-        if not n:
-            print("WARN: %s has no canonical tag to repoint" % old_rel)
-            continue
-        # og:url follows the canonical, or a share preview names the old address.
-        page = re.sub(r'<meta property="og:url" content="[^"]*">',
-                      '<meta property="og:url" content="%s">' % new_url, page, count=1)
-        write(old_file, page)
-        print("canonical %s -> %s" % (old_rel, new_rel))
+    superseded = repoint_superseded({} if args.full else load_manifest("superseded"))
+    # Feeds before the hubs that name them.
+    for path, body in feeds:
+        write_output(path, body)
     for path, text in writes:
         # Hard stop: this generator has no business writing the homepage.
         assert os.path.abspath(path) != os.path.abspath(HOME),             "build_matchup_articles.py must never write the homepage"
         write(path, text)
-
-    print("baked %d Game File(s); updated %d shared file(s)" % (len(rendered), len(writes)))
+    # The sitemap (one file, or an index plus its shards) goes through the same
+    # line-ending-preserving write() as everything else.
+    sitemap.save(writer=write)
+    # Last, so they only ever describe pages that are on disk.
+    fragments.save()
+    prune_feeds(feed_urls)
+    write_output(MANIFEST, json.dumps({"articles": inputs, "superseded": superseded},
+                                      indent=1, sort_keys=True) + "\n")
+
+    print("baked %d of %d Game File(s), %d unchanged; updated %d shared file(s) (%s)" % (
+        len(rendered), len(ordered), len(ordered) - len(rendered), len(writes), summary()))
 
 
 if __name__ == "__main__":
@@ -24,23 +24,131 @@ Two kinds of output:
 SVG throughout: a few KB each, sharp at any density, no srcset, diffable.
 
     python scripts/build_matchup_graphics.py
+
+ART_CACHE_20261019. The bake calls build_all() for every published article on
+every run, and the artwork is a pure function of graphics_spec(article) and this
+file. static/media/matchups/.art-manifest.json keeps, per slug, a hash of the
+spec plus a hash of this file; an article whose hash matches and whose files are
+on disk is skipped without being drawn or written. Editing anything here changes
+the generator hash and redraws everything once. `--rebuild-art` on the article
+bake forces a redraw regardless.
 """
+import hashlib
+import json
 import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from output_writer import write_output  # noqa: E402
 
 OUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
                    "static", "media", "matchups")
+# Dot-named, so GitHub Pages (Jekyll) never publishes it.
+ART_MANIFEST = os.path.join(OUT, ".art-manifest.json")
 
 INK, MUT = "#F2F6FA", "#6B7885"
 FONT = "Inter, 'Segoe UI', Arial, sans-serif"
 COND = "'Barlow Condensed', Inter, sans-serif"
 
 
+# ------------------------------------------------------------------ emission
+#
+# SVG_EMIT_20261019. Every drawing function builds its markup with f-strings
+# over float arithmetic, so a scaled floodlight tower lands in the file as
+# y="119.36000000000001", and each file carries its own <defs>. emit() is the
+# one pass all output goes through before it is written:
+#
+#   numbers   attribute values rounded to PRECISION places, trailing zeros and
+#             the leading 0 of a fraction dropped (".26", "-.5", "132")
+#   paths     no spaces around path commands ("M0,330L1600,300Z")
+#   defs      every <defs> block merged into one; a definition identical to an
+#             earlier one apart from its id is dropped and its references
+#             pointed at the first
+#   shared    optional (SHARED_DEFS, off): the colour-independent stadium
+#             gradients and the seat pattern move to one content-hashed
+#             tmr-art-defs.<sha>.svg, referenced by URL. Off because the pages
+#             show this artwork through <img>, and an SVG loaded as an image
+#             may not fetch external resources - the referenced fills would
+#             simply vanish. Only turn it on for artwork that is inlined or
+#             embedded with <object>.
+#
+# write() prints the before/after size of each file, and build_for_article()
+# returns them so the bake can report bytes per article.
+PRECISION = 2
+SHARED_DEFS = os.environ.get("TMR_ART_SHARED_DEFS") == "1"
+SHARED_IDS = ("sky", "bloomL", "bloomR", "fade", "seats")
+REPORT = {}                                     # name -> (raw bytes, emitted bytes)
+
+_ATTR = re.compile(r'( [\w:-]+)="([^"]*)"')
+_DECIMAL = re.compile(r"-?\d*\.\d+")
+_PATH_CMD = re.compile(r"\s*([MLHVCSQTAZmlhvcsqtaz])\s*")
+_DEFS = re.compile(r"<defs>(.*?)</defs>", re.S)
+_DEF = re.compile(r'<(\w+)\b[^>]*?\bid="([^"]+)"[^>]*?(?:/>|>.*?</\1>)', re.S)
+_TEXT_ATTRS = (" aria-label", " font-family", " id")
+
+
+def _short(m):
+    v = round(float(m.group()), PRECISION)
+    out = ("%.*f" % (PRECISION, v)).rstrip("0").rstrip(".")
+    if out in ("-0", ""):
+        out = "0"
+    return out.replace("0.", ".", 1) if out.startswith(("0.", "-0.")) else out
+
+
+def _attr(m):
+    name, value = m.group(1), m.group(2)
+    if name in _TEXT_ATTRS:
+        return m.group()
+    value = _DECIMAL.sub(_short, value)
+    if name == " d":
+        value = _PATH_CMD.sub(r"\1", value).strip()
+    return '%s="%s"' % (name, value)
+
+
+def _shared_defs(defs):
+    """Write the shared defs file for these definitions; return its URL."""
+    doc = ('<svg xmlns="http://www.w3.org/2000/svg"><defs>%s</defs></svg>\n'
+           % "".join(defs))
+    name = "tmr-art-defs.%s.svg" % hashlib.sha256(doc.encode("utf-8")).hexdigest()[:12]
+    write_output(os.path.join(OUT, name), doc)
+    return "/static/media/matchups/" + name
+
+
+def emit(svg):
+    """Minified, de-duplicated markup for one complete SVG document."""
+    svg = _ATTR.sub(_attr, svg)
+    blocks = _DEFS.findall(svg)
+    if not blocks:
+        return svg
+    kept, first, alias, shared = [], {}, {}, []
+    for m in _DEF.finditer("".join(blocks)):
+        markup, ident = m.group(), m.group(2)
+        body = markup.replace('id="%s"' % ident, 'id=""', 1)
+        if body in first:
+            alias[ident] = first[body]
+            continue
+        first[body] = ident
+        (shared if SHARED_DEFS and ident in SHARED_IDS else kept).append(markup)
+    at = svg.index("<defs>")
+    svg = _DEFS.sub("", svg)
+    svg = svg[:at] + ("<defs>%s</defs>" % "".join(kept) if kept else "") + svg[at:]
+    for dup, ident in alias.items():
+        svg = svg.replace("url(#%s)" % dup, "url(#%s)" % ident)
+    if shared:
+        url = _shared_defs(shared)
+        for m in _DEF.finditer("".join(shared)):
+            svg = svg.replace("url(#%s)" % m.group(2), "url(%s#%s)" % (url, m.group(2)))
+    return svg
+
+
 def write(name, body):
-    os.makedirs(OUT, exist_ok=True)
     path = os.path.join(OUT, name)
-    with open(path, "w", encoding="utf-8", newline="\n") as f:
-        f.write(body + "</svg>\n")
-    print("%-30s %6d bytes" % (name, os.path.getsize(path)))
+    raw = body + "</svg>\n"
+    out = emit(raw)
+    REPORT[name] = (len(raw.encode("utf-8")), len(out.encode("utf-8")))
+    if write_output(path, out):
+        print("%-30s %6d bytes (%d before emit)" % (name, REPORT[name][1], REPORT[name][0]))
 
 
 def stadium(away_hex, home_hex, out_name="g1000-stadium.svg"):
@@ -231,6 +339,7 @@ def build_for_article(slug, spec):
     `spec` comes straight off the published record — team colours, the two
     starters, the venue — so the artwork cannot drift from the piece beside it.
     """
+    REPORT.clear()
     away_hex = spec.get("away_color") or "#FF5910"
     home_hex = spec.get("home_color") or "#CE1141"
 
@@ -245,6 +354,57 @@ def build_for_article(slug, spec):
     if spec.get("venue_name"):
         venue(spec["venue_name"], spec.get("venue_city") or "",
               away_hex, home_hex, out_name="%s-venue.svg" % slug)
+    return dict(REPORT)
+
+
+def generator_version():
+    with open(os.path.abspath(__file__), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def art_files(slug, spec):
+    """The files build_for_article() writes for this spec."""
+    names = ["%s-stadium.svg" % slug]
+    if spec.get("venue_name"):
+        names.append("%s-venue.svg" % slug)
+    return [os.path.join(OUT, n) for n in names]
+
+
+def spec_key(spec, version, shared=False):
+    # SHARED_DEFS changes what emit() writes, so flipping it must redraw.
+    blob = json.dumps({"spec": spec, "generator": version, "shared_defs": shared},
+                      sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def build_all(items, rebuild=False):
+    """build_for_article() for every (slug, spec) whose artwork is stale.
+
+    Returns (drawn, skipped), and prints the emitted bytes of each article
+    drawn. The manifest is written after the last article,
+    so a run that fails part-way redraws the same articles next time. Rows for
+    slugs not in `items` are kept: their files are still on disk."""
+    try:
+        with open(ART_MANIFEST, encoding="utf-8") as f:
+            manifest = dict(json.load(f))
+    except (OSError, ValueError, TypeError):
+        manifest = {}
+    version = generator_version()
+    drawn = skipped = 0
+    for slug, spec in items:
+        key = spec_key(spec, version, SHARED_DEFS)
+        if (not rebuild and manifest.get(slug) == key
+                and all(os.path.exists(p) for p in art_files(slug, spec))):
+            skipped += 1
+            continue
+        sizes = build_for_article(slug, spec)
+        raw, out = (sum(v[i] for v in sizes.values()) for i in (0, 1))
+        print("art    %-52s %7d bytes (%d before emit)" % (slug, out, raw))
+        manifest[slug] = key
+        drawn += 1
+    if drawn:
+        write_output(ART_MANIFEST, json.dumps(manifest, indent=1, sort_keys=True) + "\n")
+    return drawn, skipped
 
 
 if __name__ == "__main__":
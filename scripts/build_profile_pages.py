@@ -47,6 +47,10 @@ Add --dry-run to print the eligible/excluded sets without writing files.
 """
 import json, os, sys, html, urllib.request, urllib.error, urllib.parse, datetime, re, shutil
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import sitemap_sections  # noqa: E402
+from output_writer import summary, write_output  # noqa: E402
+
 API   = "https://trustmyrecord-api.onrender.com/api"
 SITE  = "https://trustmyrecord.com"
 ROOT  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # repo root
@@ -966,9 +970,7 @@ def write_edge_fallback_template():
     if EDGE_SENTINEL not in out:
         raise SystemExit("edge fallback: renderer emitted no username — refusing to write")
     out = out.replace(EDGE_SENTINEL, EDGE_PLACEHOLDER)
-    os.makedirs(os.path.dirname(EDGE_TEMPLATE), exist_ok=True)
-    with open(EDGE_TEMPLATE, "w", encoding="utf-8", newline="\n") as f:
-        f.write(out)
+    write_output(EDGE_TEMPLATE, out)
     print(f"wrote edge fallback template ({len(out)} bytes, "
           f"{out.count(EDGE_PLACEHOLDER)} placeholders) -> {EDGE_TEMPLATE}")
 
@@ -1091,16 +1093,17 @@ def main():
         return
 
     os.makedirs(UDIR, exist_ok=True)
+    lastmods = {}
     for d in eligible_pages:
         un = d["username"]
         recent, avg_amer, sport_rows, _ = derive(fetch_picks(un))
+        if recent and recent[0].get("graded_at"):
+            lastmods[un] = str(recent[0]["graded_at"])[:10]
         m = fetch_metrics(un)
         awards = fetch_awards(un)
-        ddir = os.path.join(UDIR, un)
-        os.makedirs(ddir, exist_ok=True)
-        with open(os.path.join(ddir, "index.html"), "w", encoding="utf-8", newline="\n") as f:
-            sibs = [x for x in sorted(elig_names) if x != un]
-            f.write(page_html(d, recent, avg_amer, sport_rows, m, siblings=sibs, awards=awards))
+        sibs = [x for x in sorted(elig_names) if x != un]
+        write_output(os.path.join(UDIR, un, "index.html"),
+                     page_html(d, recent, avg_amer, sport_rows, m, siblings=sibs, awards=awards))
     for un in to_compact:
         # SOFT404_20260809: compact pages get the SAME baked record data as full
         # ones. These three calls are the whole fix -- the data was always
@@ -1113,14 +1116,14 @@ def main():
         except Exception:
             det = None
         sibs = [x for x in sorted(elig_names) if x != un]
-        os.makedirs(os.path.join(UDIR, un), exist_ok=True)
-        with open(os.path.join(UDIR, un, "index.html"), "w", encoding="utf-8", newline="\n") as f:
-            f.write(compact_html(un, awards=fetch_awards(un), d=det, recent=recent,
-                                 avg_amer=avg_amer, sport_rows=sport_rows, m=m,
-                                 siblings=sibs))
+        write_output(os.path.join(UDIR, un, "index.html"),
+                     compact_html(un, awards=fetch_awards(un), d=det, recent=recent,
+                                  avg_amer=avg_amer, sport_rows=sport_rows, m=m,
+                                  siblings=sibs))
     for un in zombies:
         shutil.rmtree(os.path.join(UDIR, un), ignore_errors=True)
-    print(f"wrote {len(eligible_pages)} full + {len(to_compact)} compact pages under {UDIR} (ALL index, follow)")
+    print(f"baked {len(eligible_pages)} full + {len(to_compact)} compact pages under {UDIR} "
+          f"(ALL index, follow; {summary()})")
     if zombies:
         print(f"pruned {len(zombies)} page(s) for accounts the API 404s (now correctly 404): {zombies}")
     if skipped_test:
@@ -1128,24 +1131,22 @@ def main():
 
     write_edge_fallback_template()
 
-    regen_sitemap(sorted(elig_names))
-
-def regen_sitemap(usernames):
-    if not os.path.exists(SITEMAP):
+    regen_sitemap(sorted(elig_names), lastmods)
+
+def regen_sitemap(usernames, lastmods=None):
+    """SITEMAP_MODEL_20261019: the PROFILE block goes through sitemap_sections,
+    which keeps its position fixed instead of moving it to the bottom of the
+    file on every run. `lastmods` maps username -> the date of that member's
+    most recent graded pick, the last time the page's record actually changed;
+    a member with nothing graded gets no <lastmod> rather than an invented one."""
+    lastmods = lastmods or {}
+    sm = sitemap_sections.Sitemap(SITEMAP)
+    if not sm.exists:
         print("sitemap.xml not found, skipping"); return
-    with open(SITEMAP, encoding="utf-8") as f:
-        xml = f.read()
-    xml = re.sub(r"\s*<!-- BEGIN_PROFILE_URLS -->.*?<!-- END_PROFILE_URLS -->",
-                 "", xml, flags=re.S)
-    block = ["  <!-- BEGIN_PROFILE_URLS -->"]
-    for un in sorted(usernames):
-        block.append(f"  <url><loc>{SITE}/u/{un}/</loc><changefreq>daily</changefreq>"
-                     f"<priority>0.6</priority></url>")
-    block.append("  <!-- END_PROFILE_URLS -->")
-    block = "\n".join(block)
-    xml = xml.replace("</urlset>", block + "\n</urlset>")
-    with open(SITEMAP, "w", encoding="utf-8", newline="\n") as f:
-        f.write(xml)
+    sm.set_section("PROFILE", [
+        sitemap_sections.entry(f"{SITE}/u/{un}/", lastmods.get(un), "daily", "0.6")
+        for un in sorted(usernames)])
+    sm.save()
     print(f"sitemap.xml updated with {len(usernames)} eligible profile URLs")
 
 if __name__ == "__main__":
@@ -24,6 +24,10 @@ import io
 import os
 import re
 import json
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from output_writer import summary, write_output  # noqa: E402
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TEMPLATE = os.path.join(ROOT, 'sports-picks-leaderboard', 'index.html')
@@ -471,13 +475,11 @@ def main():
     head = template[:template.find('<body')]
 
     for page in PAGES:
-        out_dir = os.path.join(ROOT, page['slug'])
-        if not os.path.isdir(out_dir):
-            os.makedirs(out_dir)
         html = build_head(head, page) + build_body(page) + cluster_for(page['slug'])
-        path = os.path.join(out_dir, 'index.html')
-        io.open(path, 'w', encoding='utf-8', newline='').write(html)
-        print('wrote %s (%d bytes)' % (path, len(html)))
+        path = os.path.join(ROOT, page['slug'], 'index.html')
+        if write_output(path, html):
+            print('wrote %s (%d bytes)' % (path, len(html)))
+    print(summary())
 
 
 if __name__ == '__main__':
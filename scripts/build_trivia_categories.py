@@ -28,6 +28,9 @@ import os
 import re
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from output_writer import write_output  # noqa: E402
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MASTER = os.path.join(ROOT, "trivia", "index.html")
 SITE = "https://trustmyrecord.com"
@@ -270,11 +273,12 @@ def main():
             else:
                 print("  ok     /trivia/%s/ (%d bytes)" % (slug, len(out)))
         else:
-            os.makedirs(os.path.dirname(path), exist_ok=True)
-            open(path, "wb").write(out)
-            back = open(path, "rb").read()
-            assert back == out, "short write on %s" % path
-            print("  wrote  trivia/%s/index.html (%d bytes)" % (slug, len(out)))
+            # write_output reads the temp file back against the same digest
+            # before it replaces anything, so a short write never lands.
+            if write_output(path, out):
+                print("  wrote  trivia/%s/index.html (%d bytes)" % (slug, len(out)))
+            else:
+                print("  same   trivia/%s/index.html (%d bytes)" % (slug, len(out)))
 
     if failures:
         raise SystemExit("\nFAILED: %d generated page(s) drifted from trivia/index.html. "
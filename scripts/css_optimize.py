@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+css_optimize.py - shrink a generated stylesheet without changing what it paints.
+
+CSS_OPTIMIZE_20261019. build_light_overrides.py concatenates every rescoped
+colour rule from every legacy sheet and then the hand-written base, so
+tmr-light.css - loaded on every light page - repeats itself: the same selector
+rescoped out of three sheets, the same declaration block under a dozen
+selectors, base rules that overwrite a derived rule outright, and all the
+comments and indentation of the sources. optimize() runs over the css_tree
+parse and:
+
+  1. drops a declaration that can never win: a LATER declaration of the same
+     property, in the same @media/@supports context, under the same selector
+     (so the same specificity AND the same elements), at least as important.
+     A rule with a selector list counts as shadowed only when every selector
+     in it is.
+  2. folds a rule into an earlier rule with the same selector list.
+  3. merges rules whose declaration blocks are identical into one selector list.
+  4. minifies: comments out, whitespace collapsed, one rule per line so the
+     committed file still diffs by rule.
+
+Everything that moves a declaration is guarded, because order is half of the
+cascade:
+
+  - 2 and 3 move declarations to the earlier rule's position. They only do so
+    when no rule in between, in ANY context, sets a property from the same
+    family (background / background-color, font / line-height, inset / top...).
+  - 1 never lets a later declaration shadow an earlier one when an older browser
+    might not parse it (a function or unit outside SAFE_FUNCTIONS / the vh/vw
+    family, a vendor-prefixed value): that is the fallback pattern, and there
+    the earlier line is the one that paints.
+  - 3 never puts a selector a browser may reject (vendor pseudo-classes, :has,
+    anything that is not plainly a selector) into a list, where it would take
+    the whole list down with it; 1 never lets a rule holding one shadow
+    anything.
+  - At-rules other than @media and @supports (@keyframes, @font-face, ...) are
+    minified but otherwise left alone.
+
+    css_optimize.optimize(css)  -> minified css
+    css_optimize.report()       -> "85238 -> 64816 bytes (-24.0%): 88 shadowed ..."
+"""
+from __future__ import annotations
+
+import re
+
+import css_tree
+
+STATS = {"in": 0, "out": 0, "dropped": 0, "folded": 0, "merged": 0}
+
+GROUPS = ("media", "supports")
+
+# Functions every browser the site supports parses. A later declaration using
+# anything else (color-mix, oklch, light-dark, ...) may be a progressive
+# enhancement over the earlier one, so it does not shadow it.
+SAFE_FUNCTIONS = frozenset("""
+    rgb rgba hsl hsla var calc min max clamp url attr counter counters format local
+    linear-gradient radial-gradient repeating-linear-gradient repeating-radial-gradient
+    translate translatex translatey translatez translate3d scale scalex scaley scale3d
+    rotate rotatex rotatey rotatez rotate3d skew skewx skewy matrix matrix3d perspective
+    cubic-bezier steps blur brightness contrast drop-shadow grayscale hue-rotate invert
+    opacity saturate sepia
+""".split())
+_FUNCTION = re.compile(r"([-A-Za-z][-A-Za-z0-9]*)\(")
+_NEW_UNIT = re.compile(r"\d(?:[dsl]v(?:h|w|min|max|i|b)|cq(?:w|h|i|b|min|max))\b", re.I)
+_RISKY_SELECTOR = re.compile(r"::?-|:has\(", re.I)
+# What a squeezed selector looks like: compounds of type / class / id /
+# attribute / pseudo (one level of nested parens), joined by combinators.
+# Anything else - prose left outside a comment by a stray `*/` is the case
+# this repo has - is dropped by the browser together with its whole list.
+_COMPOUND = (r"(?:\*|-?[_a-zA-Z][-\w]*|\.-?[_a-zA-Z][-\w]*|#[-\w]+|\[[^\[\]]*\]"
+             r"|::?[-a-zA-Z]+(?:\((?:[^()]|\([^()]*\))*\))?)+")
+_PLAIN_SELECTOR = re.compile(r"%s(?:[ >+~]%s)*" % (_COMPOUND, _COMPOUND))
+_IMPORTANT = re.compile(r"\s*!\s*important\s*$", re.I)
+
+# Shorthands whose longhands start with a different word. Everything else
+# shares its first word with its longhands (border-top-color -> border).
+_FAMILY = {"line": "font", "top": "inset", "right": "inset", "bottom": "inset",
+           "left": "inset", "align": "place", "justify": "place", "row": "grid",
+           "column": "grid", "columns": "grid", "gap": "grid", "inline": "size",
+           "block": "size", "width": "size", "height": "size", "min": "size",
+           "max": "size"}
+
+
+def family(prop: str) -> str:
+    if prop.startswith("--"):
+        return prop
+    word = re.sub(r"^-[a-z]+-", "", prop).split("-")[0]
+    return _FAMILY.get(word, word)
+
+
+def risky(selector: str) -> bool:
+    """Could a supported browser reject this selector - and with it every
+    other selector in the same list?"""
+    return bool(_RISKY_SELECTOR.search(selector)) or not _PLAIN_SELECTOR.fullmatch(selector)
+
+
+def safe(value: str) -> bool:
+    """Would every supported browser parse this value?"""
+    if "-webkit-" in value or "-moz-" in value or _NEW_UNIT.search(value):
+        return False
+    return all(f.lower() in SAFE_FUNCTIONS for f in _FUNCTION.findall(value))
+
+
+# --------------------------------------------------------------------------
+# minifying token runs
+# --------------------------------------------------------------------------
+# Where a space can go, by what kind of text it is in: (no space after, no
+# space before). In a selector `a :hover` is not `a:hover`, so `:` is not in
+# its sets; in an at-rule prelude `and (` needs its space.
+_VALUE = (frozenset(",(:;{}"), frozenset(",):;{}"))
+_SELECTOR = (frozenset(",(>+~"), frozenset(",)>+~"))
+_PRELUDE = (frozenset(",(:"), frozenset(",):"))
+
+
+_CLOSED_STRING = re.compile(r"""(["'])(?:(?!\1)[^\\\n]|\\[\s\S])*\1""")
+
+
+def unclosed(tokens) -> bool:
+    """Is there a string the input never closed? A browser ends one at the
+    newline, so the newlines around it are not whitespace to collapse."""
+    return any(t[0] in "\"'" and not _CLOSED_STRING.fullmatch(t) for t in tokens)
+
+
+def squeeze(tokens, tight=_VALUE) -> str:
+    """Comments out, whitespace collapsed to one space, and dropped where the
+    neighbouring punctuation makes it meaningless. Text with an unclosed string
+    in it comes back exactly as written."""
+    if unclosed(tokens):
+        return css_tree.text(tokens)
+    after, before = tight
+    toks = [t for t in tokens if not css_tree.is_comment(t)]
+    out: list[str] = []
+    for i, tok in enumerate(toks):
+        if not tok.isspace():
+            out.append(tok)
+            continue
+        prev = out[-1] if out else ""
+        nxt = next((t for t in toks[i + 1:] if not t.isspace()), "")
+        if prev and nxt and prev not in after and nxt not in before:
+            out.append(" ")
+    return "".join(out)
+
+
+# --------------------------------------------------------------------------
+# model
+# --------------------------------------------------------------------------
+class Decl:
+    __slots__ = ("prop", "key", "value", "important")
+
+    def __init__(self, prop, value, important):
+        self.prop = prop
+        # Custom properties are case-sensitive, everything else is not.
+        self.key = prop if prop.startswith("--") else prop.lower()
+        self.value = value
+        self.important = important
+
+    def text(self) -> str:
+        return self.prop + ":" + self.value + ("!important" if self.important else "")
+
+
+class Rule:
+    __slots__ = ("selectors", "decls", "ctx", "order", "opaque", "dead")
+
+    def __init__(self, selectors, decls, ctx, opaque):
+        self.selectors = selectors
+        self.decls = decls
+        self.ctx = ctx
+        self.opaque = opaque          # a leaf we do not understand: emitted as is
+        self.order = 0
+        self.dead = False
+
+    def body(self) -> tuple:
+        return tuple(d.text() for d in self.decls)
+
+    def families(self) -> set:
+        return {family(d.key) for d in self.decls}
+
+
+class Group:
+    __slots__ = ("prelude", "items")
+
+    def __init__(self, prelude, items):
+        self.prelude = prelude
+        self.items = items
+
+
+def _leaf(block, ctx):
+    body = block.body or []
+    if unclosed(block.prelude) or unclosed(body):
+        return Rule([css_tree.text(block.prelude).strip()], [css_tree.text(body)], ctx, True)
+    if block.at_name():
+        prelude = squeeze(block.prelude, _PRELUDE)
+        # @font-face, @page, ...: a descriptor block, not a style rule.
+        return Rule([prelude], [squeeze(body)], ctx, True)
+    prelude = squeeze(block.prelude, _SELECTOR)
+    decls = []
+    for piece in css_tree.declarations(body):
+        if piece.prop is None:
+            if css_tree.bare(piece.piece).strip():
+                return Rule([prelude], [squeeze(body)], ctx, True)
+            continue
+        if css_tree.bare(css_tree.tokenize(piece.head)).strip():
+            # `*zoom:1` and other hacks: keep the rule exactly as written.
+            return Rule([prelude], [squeeze(body)], ctx, True)
+        value = squeeze(piece.value)
+        important = bool(_IMPORTANT.search(value))
+        if important:
+            value = _IMPORTANT.sub("", value)
+        decls.append(Decl(piece.prop, value, important))
+    selectors = [squeeze(part, _SELECTOR) for part in css_tree.split_selector(block.prelude)
+                 if css_tree.bare(part).strip()]
+    return Rule(selectors, decls, ctx, False)
+
+
+def build_model(nodes):
+    """css_tree nodes -> [Rule | Group | str], plus every Rule in source order."""
+    rules: list[Rule] = []
+    top: list = []
+    stack = [(iter(nodes), top, ())]
+    while stack:
+        it, out, ctx = stack[-1]
+        node = next(it, None)
+        if node is None:
+            stack.pop()
+            continue
+        if isinstance(node, css_tree.Raw):
+            text = squeeze(node.tokens)
+            if text.strip(" ;"):
+                out.append(text)
+            continue
+        if node.items is None:
+            rule = _leaf(node, ctx)
+            rule.order = len(rules)
+            rules.append(rule)
+            out.append(rule)
+            continue
+        prelude = squeeze(node.prelude, _PRELUDE)
+        if node.at_name() in GROUPS:
+            group = Group(prelude, [])
+            out.append(group)
+            stack.append((iter(node.items), group.items, ctx + (prelude,)))
+        else:
+            # @keyframes and friends: children are not style rules.
+            out.append(prelude + "{" + _opaque(node.items) + "}")
+    return top, rules
+
+
+def _opaque(items) -> str:
+    out = []
+    for node in items:
+        if isinstance(node, css_tree.Raw):
+            out.append(squeeze(node.tokens))
+        elif node.items is None:
+            out.append(squeeze(node.prelude, _PRELUDE) + "{" + squeeze(node.body or []) + "}")
+        else:
+            out.append(squeeze(node.prelude, _PRELUDE) + "{" + _opaque(node.items) + "}")
+    return "".join(out)
+
+
+# --------------------------------------------------------------------------
+# passes
+# --------------------------------------------------------------------------
+def drop_shadowed(rules):
+    """Pass 1, walking the sheet backwards: `winner[(ctx, selector, key)]`
+    is True/False once a later, safely-parsed declaration of `key` exists
+    for that selector (True if !important)."""
+    winner: dict = {}
+    for rule in reversed(rules):
+        if rule.dead or rule.opaque:
+            continue
+        rejected = any(risky(s) for s in rule.selectors)
+        keep = []
+        for decl in reversed(rule.decls):
+            slots = [(rule.ctx, s, decl.key) for s in rule.selectors]
+            if slots and all(slot in winner and (winner[slot] or not decl.important)
+                             for slot in slots):
+                STATS["dropped"] += 1
+                continue
+            keep.append(decl)
+            if not rejected and safe(decl.value):
+                for slot in slots:
+                    winner[slot] = winner.get(slot, False) or decl.important
+        rule.decls = keep[::-1]
+        if not rule.decls:
+            rule.dead = True
+
+
+def _clear_between(rules, lo, hi, families) -> bool:
+    """No live rule strictly between source positions lo and hi sets a
+    property from `families`."""
+    for rule in rules[lo + 1:hi]:
+        if rule.dead:
+            continue
+        if rule.opaque:
+            return False
+        fams = rule.families()
+        if "all" in fams or fams & families:
+            return False
+    return True
+
+
+def fold_same_selector(rules):
+    """Pass 2: `a{x}` ... `a{y}` -> `a{x;y}` at the first one's position."""
+    seen: dict = {}
+    for rule in rules:
+        if rule.dead or rule.opaque:
+            continue
+        key = (rule.ctx, frozenset(rule.selectors))
+        prev = seen.get(key)
+        if prev is not None and not prev.dead and \
+                _clear_between(rules, prev.order, rule.order, rule.families()):
+            prev.decls += rule.decls
+            rule.dead = True
+            STATS["folded"] += 1
+            continue
+        seen[key] = rule
+
+
+def merge_same_body(rules):
+    """Pass 3: `a{x}` ... `b{x}` -> `a,b{x}` at the first one's position."""
+    seen: dict = {}
+    for rule in rules:
+        if rule.dead or rule.opaque:
+            continue
+        if any(risky(s) for s in rule.selectors):
+            continue
+        key = (rule.ctx, rule.body())
+        prev = seen.get(key)
+        if prev is not None and not prev.dead and \
+                _clear_between(rules, prev.order, rule.order, rule.families()):
+            prev.selectors += [s for s in rule.selectors if s not in prev.selectors]
+            rule.dead = True
+            STATS["merged"] += 1
+            continue
+        seen[key] = rule
+
+
+def serialize(items, depth=0) -> str:
+    out = []
+    for item in items:
+        if isinstance(item, str):
+            out.append(item)
+        elif isinstance(item, Group):
+            inner = serialize(item.items, depth + 1)
+            if inner:
+                out.append(item.prelude + "{\n" + inner + "\n}")
+        elif not item.dead:
+            body = item.decls if item.opaque else [d.text() for d in item.decls]
+            out.append(",".join(item.selectors) + "{" + ";".join(body) + "}")
+    return "\n".join(out)
+
+
+def optimize(css: str) -> str:
+    top, rules = build_model(css_tree.parse(css.lstrip("\ufeff")))
+    drop_shadowed(rules)
+    fold_same_selector(rules)
+    # A fold can line two declarations of one property up in a single rule.
+    drop_shadowed(rules)
+    merge_same_body(rules)
+    out = serialize(top) + "\n"
+    STATS["in"] += len(css.encode("utf-8"))
+    STATS["out"] += len(out.encode("utf-8"))
+    return out
+
+
+def report() -> str:
+    saved = STATS["in"] - STATS["out"]
+    pct = 100.0 * saved / STATS["in"] if STATS["in"] else 0.0
+    return ("%d -> %d bytes (-%.1f%%): %d shadowed declarations dropped, "
+            "%d same-selector rules folded, %d same-body rules merged"
+            % (STATS["in"], STATS["out"], pct, STATS["dropped"], STATS["folded"], STATS["merged"]))
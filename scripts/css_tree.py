@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+css_tree.py - one streaming CSS tokenizer and a lightweight rule tree, shared by
+light_theme_transform.py and build_light_overrides.py.
+
+CSS_TREE_20261019. The light-theme tools each used to take the stylesheet apart
+their own way: the transform matched innermost `{...}` with a regex, stashed
+comments behind \\x01C{i}\\x01 placeholders so prose colons could not pass for
+declarations, then re-scanned every rule body with a declaration regex; the
+override builder walked the text a character at a time in a loop that knew
+about comments but not strings. Three parsers, three different ideas of where
+a rule ends, and none of them would survive a `}` inside a content string.
+
+This module reads the text ONCE, left to right:
+
+  tokenize(css)   -> [token]. A token is just its text; joining the list gives
+                     back the input exactly. Comments, strings and unquoted
+                     url(...) are single opaque tokens (is_opaque), so nothing
+                     inside them is ever read as structure or as a colour.
+  parse(css)      -> [Raw | Block]. A Block is `prelude { ... }`; a block with
+                     no block inside it is a LEAF (a style rule, @font-face, a
+                     keyframe) and keeps its body as tokens, anything else is a
+                     container (@media, @supports, ...) and keeps child nodes.
+                     Text between blocks - whitespace, comments, @import ...; -
+                     is Raw. Neither parsing nor serializing recurses, so
+                     nesting depth is not bounded by the interpreter's stack.
+  declarations(tokens)
+                  -> [Decl] for a leaf body or a style="" attribute.
+  split_selector(tokens)
+                  -> the selector list split on top-level commas.
+
+serialize(nodes) round-trips parse(css) byte for byte, so a tool only has to
+produce new text for the parts it changes.
+"""
+from __future__ import annotations
+
+import re
+
+# One alternation, tried at each position in turn; every branch is a plain
+# character class or an unrolled loop, so no input can make it backtrack more
+# than a character. Comments, strings and unquoted url(...) come out whole -
+# including a `;` or a `#` in a data: URI. A comment or string the input never
+# closes runs to the end of the file or the line, as it does in a browser.
+_TOKEN = re.compile(r"""
+    /\*[^*]*\*+(?:[^/*][^*]*\*+)*/ | /\*[\s\S]*
+  | "(?:[^"\\\n]|\\[\s\S])*"? | '(?:[^'\\\n]|\\[\s\S])*'?
+  | [uU][rR][lL]\(\s*[^\s"')][^"')]*\)?
+  | \s+
+  | [^\s/"'{}();:,\\]+ | \\[\s\S]? | /
+  | [{}();:,]
+""", re.X)
+_IDENT_TAIL = re.compile(r"[-A-Za-z][-A-Za-z0-9_]*$")
+
+
+def tokenize(css: str) -> list[str]:
+    return _TOKEN.findall(css)
+
+
+def is_comment(tok: str) -> bool:
+    return tok[:2] == "/*"
+
+
+def is_opaque(tok: str) -> bool:
+    """A comment, a string or an unquoted url(...): never structure, never a
+    colour."""
+    return tok[:2] == "/*" or tok[0] in "\"'" or tok[:4].lower() == "url("
+
+
+def text(tokens) -> str:
+    return "".join(tokens)
+
+
+def bare(tokens) -> str:
+    """The text without its comments."""
+    return "".join([t for t in tokens if t[:2] != "/*"])
+
+
+# --------------------------------------------------------------------------
+# tree
+# --------------------------------------------------------------------------
+class Raw:
+    """Text between blocks, kept verbatim."""
+    __slots__ = ("tokens",)
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+
+class Block:
+    """`prelude { body }`. Exactly one of `body` (a leaf: tokens) and `items`
+    (a container: child nodes) is set. `closed` is False only for a block the
+    input never closed."""
+    __slots__ = ("prelude", "body", "items", "closed")
+
+    def __init__(self, prelude):
+        self.prelude = prelude
+        self.body = None
+        self.items: list | None = []
+        self.closed = False
+
+    def at_name(self) -> str:
+        """`media` for `@media ...`, "" for a style rule."""
+        head = bare(self.prelude).lstrip()
+        if not head.startswith("@"):
+            return ""
+        m = re.match(r"@([-A-Za-z0-9_]+)", head)
+        return m.group(1) if m else ""
+
+
+def parse(css: str) -> list:
+    root = Block([])
+    stack = [root]
+    pending: list[str] = []
+    semi = -1           # last `;` in pending: a statement such as @import ends there
+    for tok in tokenize(css):
+        if tok == "{":
+            if semi >= 0:
+                stack[-1].items.append(Raw(pending[:semi + 1]))
+                pending = pending[semi + 1:]
+            block = Block(pending)
+            stack[-1].items.append(block)
+            stack.append(block)
+            pending, semi = [], -1
+        elif tok == "}" and len(stack) > 1:
+            _finish(stack.pop(), pending).closed = True
+            pending, semi = [], -1
+        else:
+            if tok == ";":
+                semi = len(pending)
+            pending.append(tok)
+    while len(stack) > 1:
+        _finish(stack.pop(), pending)
+        pending = []
+    if pending:
+        root.items.append(Raw(pending))
+    return root.items
+
+
+def _finish(block, pending):
+    if block.items:
+        if pending:
+            block.items.append(Raw(pending))
+    else:
+        block.body = pending
+        block.items = None
+    return block
+
+
+def serialize(nodes) -> str:
+    out: list[str] = []
+    stack = [iter(nodes)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif isinstance(node, str):
+            out.append(node)
+        elif isinstance(node, Raw):
+            out.append(text(node.tokens))
+        else:
+            out.append(text(node.prelude) + "{")
+            tail = ["}"] if node.closed else []
+            if node.items is None:
+                out.append(text(node.body))
+                out.extend(tail)
+            else:
+                stack.append(iter(node.items + tail))
+    return "".join(out)
+
+
+# --------------------------------------------------------------------------
+# declarations and selectors
+# --------------------------------------------------------------------------
+class Decl:
+    """One `;`-separated piece of a declaration block.
+
+    head + prop + sep + value + end is the piece's exact text, `value` as
+    tokens. `prop` is None when the piece is not a declaration at all (blank
+    space, a comment, a stray word); its whole text is then in `head`."""
+    __slots__ = ("piece", "head", "prop", "sep", "value", "end")
+
+    def __init__(self, piece, head, prop, sep, value, end):
+        self.piece = piece
+        self.head, self.prop, self.sep, self.value, self.end = head, prop, sep, value, end
+
+    def source(self) -> str:
+        return text(self.piece) + self.end
+
+    def clean(self) -> str:
+        """The piece without its comments or the `;`."""
+        return bare(self.piece)
+
+
+def declarations(tokens) -> list[Decl]:
+    out: list[Decl] = []
+    start = 0
+    for i, tok in enumerate(tokens):
+        if tok == ";":
+            out.append(_decl(tokens[start:i], ";"))
+            start = i + 1
+    if start < len(tokens):
+        out.append(_decl(tokens[start:], ""))
+    return out
+
+
+def _decl(piece, end):
+    try:
+        colon = piece.index(":")
+    except ValueError:
+        return Decl(piece, text(piece), None, "", [], end)
+    name = colon - 1
+    while name >= 0 and piece[name].isspace():
+        name -= 1
+    word = piece[name] if name >= 0 else ""
+    m = _IDENT_TAIL.search(word) if word and not is_opaque(word) else None
+    if not m:
+        return Decl(piece, text(piece), None, "", [], end)
+    v = colon + 1
+    while v < len(piece) and piece[v].isspace():
+        v += 1
+    return Decl(piece, text(piece[:name]) + word[:m.start()], m.group(0),
+                text(piece[name + 1:v]), piece[v:], end)
+
+
+def split_selector(tokens) -> list[list[str]]:
+    """Split a selector list on top-level commas; surrounding whitespace is
+    dropped from each part, empty parts are dropped."""
+    parts, depth, buf = [], 0, []
+    for tok in tokens:
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+        elif tok == "," and depth == 0:
+            parts.append(buf)
+            buf = []
+            continue
+        elif not is_opaque(tok):
+            depth += tok.count("[") - tok.count("]")
+        buf.append(tok)
+    parts.append(buf)
+    out = []
+    for part in parts:
+        lo, hi = 0, len(part)
+        while lo < hi and part[lo].isspace():
+            lo += 1
+        while hi > lo and part[hi - 1].isspace():
+            hi -= 1
+        if lo < hi:
+            out.append(part[lo:hi])
+    return out
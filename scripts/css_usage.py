@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+css_usage.py - which rules of the shared stylesheets each page can actually use.
+
+CSS_USAGE_20261019. Every opted-in page loads all of tmr-light.css, and every
+design-system page all of tmr-ds.css plus its section sheet, whatever the page
+puts on screen. build_home_critical.py answers "what does this page need" for
+the homepage by hand, with one stylesheet curated for one document. This
+answers it for every page and every shared sheet mechanically:
+
+  1. index each page's vocabulary - the element names, classes and ids in its
+     markup, plus every word in the scripts it runs (inline, on* attributes,
+     and each local /static/js/ file it loads by src or data-src, following
+     any /static/js/ path a loader names, and the markup of any same-site page
+     a hydrate script fetches to render in place). A word ending in `-` is a
+     prefix (`'tmr-toast--' + kind`, `pick-${id}`): every class that starts
+     with it counts as present. JS_INJECTED covers what no string shows, such
+     as state classes.
+  2. read each selector's requirements - its classes, ids and element names,
+     outside :not()/:is()/:where()/:has() and attribute tests, which are never
+     narrowed. A selector the reader cannot follow (escapes) counts as used.
+  3. a rule is used by a page when one of its selectors' requirements are all
+     in the page's vocabulary. Nothing is ever judged unused that a page could
+     match, so the mistakes go one way: an unused rule kept, never a used one
+     dropped. @font-face, @keyframes and the like are always kept.
+
+Pages are grouped by TEMPLATES (the home page, the /u/ profiles, the Game
+Files, ...; anything else is "site").
+
+  python scripts/css_usage.py                 # per sheet, per group: rules and bytes used
+  python scripts/css_usage.py --unused        # + the rules no page uses at all
+  python scripts/css_usage.py --emit          # + write static/css/critical/<group>/<sheet>.css
+
+An emitted subset keeps only the rules some page of the group uses - and of a
+selector list, only the selectors it uses - in source order, minified through
+css_optimize. No page links them yet; they are the candidates for inlining the
+way build_home_critical.py inlines the homepage's.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import re
+import sys
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import css_optimize  # noqa: E402
+import css_tree  # noqa: E402
+from light_theme_targets import git_html_files  # noqa: E402
+from output_writer import summary, write_output  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DS_MANIFEST = os.path.join(ROOT, "static", "ds-assets.json")
+CRITICAL_DIR = os.path.join(ROOT, "static", "css", "critical")
+
+# The shared sheets: the light overrides, and every design-system stylesheet
+# build_ds_assets.py publishes (read from its manifest).
+SHARED = ["static/css/tmr-light.css"]
+
+TEMPLATES = [
+    ("home", re.compile(r"^index\.html$")),
+    ("profiles", re.compile(r"^u/")),
+    ("gamefiles", re.compile(r"^(matchups|matchup-of-the-day|about/research)/")),
+    ("forum", re.compile(r"^forum/")),
+    ("arena", re.compile(r"^(arena|challenges|tmr-challenges)/")),
+    ("stats", re.compile(r"^stats/")),
+    ("wallet", re.compile(r"^(wallet|tmr-coin|coin|marketplace)/")),
+    ("trivia", re.compile(r"^trivia/")),
+    ("contests", re.compile(r"^contests/")),
+]
+
+# Classes scripts add without the name appearing in any string: state toggles
+# set from a variable, and names built from data. Present on every page.
+JS_INJECTED = re.compile(
+    r"^(?:is|has)-|^(?:active|open|opened|show|shown|visible|hidden|selected|disabled|"
+    r"loading|loaded|ready|collapsed|expanded|sticky|scrolled|current|error|success)$")
+
+_WORD = re.compile(r"-?[_a-zA-Z][-\w]*")
+_JS_PATH = re.compile(r"/static/js/[-\w.]+\.js")
+# A hydrate script that swaps a whole page's app in at runtime - /u/<name>/
+# becomes /profile/, a baked thread becomes /forum/ - brings that page's
+# vocabulary with it.
+_PAGE_FETCH = re.compile(r"""fetch\(\s*['"](/[-\w/]*/)['"]""")
+_HASHED = re.compile(r"\.[0-9a-f]{12}(?=\.(?:css|js)$)")
+
+
+def read(rel: str) -> str | None:
+    try:
+        with io.open(os.path.join(ROOT, rel.replace("/", os.sep)), "r", encoding="utf-8",
+                     newline="") as fh:
+            return fh.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def local(url: str) -> str | None:
+    """/static/css/x.css?v=1 -> static/css/x.css; None for anything off-site."""
+    url = url.split("?", 1)[0].split("#", 1)[0]
+    if not url.startswith("/static/"):
+        return None
+    return url.lstrip("/")
+
+
+def source_of(rel: str) -> str:
+    """A content-hashed copy names the same sheet as its source."""
+    return _HASHED.sub("", rel)
+
+
+# --------------------------------------------------------------------------
+# page vocabulary
+# --------------------------------------------------------------------------
+class Vocabulary:
+    __slots__ = ("tags", "classes", "ids", "words", "prefixes")
+
+    def __init__(self):
+        self.tags = {"html", "head", "body"}
+        self.classes, self.ids, self.words, self.prefixes = set(), set(), set(), set()
+
+    def add_script(self, js: str):
+        # Every word, not just the ones inside string literals: a regex literal
+        # or an apostrophe in a comment throws any quote-matching off, and a
+        # class missed here is a rule wrongly pruned. Identifiers only ever add
+        # words, which can only keep more.
+        for word in _WORD.findall(js):
+            if word.endswith("-"):
+                self.prefixes.add(word)
+            else:
+                self.words.add(word)
+
+    def has_class(self, name: str) -> bool:
+        return (name in self.classes or name in self.words or bool(JS_INJECTED.search(name))
+                or any(name.startswith(p) for p in self.prefixes))
+
+    def has_id(self, name: str) -> bool:
+        return name in self.ids or name in self.words or any(name.startswith(p) for p in self.prefixes)
+
+    def has_tag(self, name: str) -> bool:
+        return name in self.tags or name in self.words
+
+
+class _Page(HTMLParser):
+    def __init__(self, vocab):
+        super().__init__(convert_charrefs=True)
+        self.vocab = vocab
+        self.sheets: list[str] = []
+        self.scripts: list[str] = []
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        v = self.vocab
+        v.tags.add(tag)
+        attrs = dict(attrs)
+        v.classes.update((attrs.get("class") or "").split())
+        if attrs.get("id"):
+            v.ids.add(attrs["id"])
+        for name, value in attrs.items():
+            if name.startswith("on") and value:     # onclick="this.classList.add('x')"
+                v.add_script(value)
+        if tag == "link" and "stylesheet" in (attrs.get("rel") or "").lower():
+            rel = local(attrs.get("href") or "")
+            if rel:
+                self.sheets.append(source_of(rel))
+        elif tag == "script":
+            # data-src too: /u/ pages ship their chrome as
+            # <script type="text/tmr-fallback" data-src=...>, which
+            # tmr-profile-hydrate.js runs on the baked page.
+            for name in ("src", "data-src"):
+                rel = local(attrs.get(name) or "")
+                if rel:
+                    self.scripts.append(rel)
+            self._in_script = True
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_script = False
+
+    def handle_data(self, data):
+        if self._in_script:
+            self.vocab.add_script(data)
+
+
+_JS_CACHE: dict = {}
+
+
+def _script(rel: str):
+    """(words-only Vocabulary, /static/js/ files it names, pages it fetches)."""
+    if rel not in _JS_CACHE:
+        vocab, js = Vocabulary(), read(rel) or ""
+        vocab.add_script(js)
+        _JS_CACHE[rel] = (vocab, [p.lstrip("/") for p in _JS_PATH.findall(js)],
+                          [p.lstrip("/") + "index.html" for p in _PAGE_FETCH.findall(js)])
+    return _JS_CACHE[rel]
+
+
+def index_page(rel: str):
+    """(Vocabulary, [stylesheet sources the page links])."""
+    vocab = Vocabulary()
+    sheets = None
+    seen, pages = set(), [rel]
+    while pages:
+        page = pages.pop()
+        if page in seen:
+            continue
+        seen.add(page)
+        parser = _Page(vocab)
+        parser.feed(read(page) or "")
+        if sheets is None:
+            sheets = parser.sheets
+        todo = list(parser.scripts)
+        while todo:
+            js = todo.pop()
+            if js in seen:
+                continue
+            seen.add(js)
+            found, named, fetched = _script(js)
+            vocab.words |= found.words
+            vocab.prefixes |= found.prefixes
+            todo += named
+            pages += fetched
+    return vocab, sheets
+
+
+# --------------------------------------------------------------------------
+# selector requirements
+# --------------------------------------------------------------------------
+_FUNCTIONAL = re.compile(r"::?[-a-zA-Z]+\(")
+_PSEUDO = re.compile(r"::?[-a-zA-Z]+")
+_CLASS = re.compile(r"\.(-?[_a-zA-Z][-\w]*)")
+_ID = re.compile(r"#(-?[_a-zA-Z0-9][-\w]*)")
+_TAG = re.compile(r"^[a-zA-Z][-\w]*")
+
+
+def _strip_functional(sel: str) -> str:
+    """Drop every :pseudo(...) with its argument, nested parens included."""
+    out, i = [], 0
+    while True:
+        m = _FUNCTIONAL.search(sel, i)
+        if not m:
+            out.append(sel[i:])
+            return "".join(out)
+        out.append(sel[i:m.start()])
+        depth, j = 1, m.end()
+        while j < len(sel) and depth:
+            depth += {"(": 1, ")": -1}.get(sel[j], 0)
+            j += 1
+        i = j
+
+
+def requirements(sel: str):
+    """(classes, ids, tags) every element matching `sel` implies, or None when
+    the selector is beyond this reader (then it always counts as used)."""
+    if "\\" in sel:
+        return None
+    bare = re.sub(r"\[[^\]]*\]", "", _strip_functional(sel))
+    bare = _PSEUDO.sub("", bare)
+    tags = set()
+    for compound in re.split(r"[\s>+~]+", bare):
+        m = _TAG.match(compound)
+        if m:
+            tags.add(m.group(0).lower())
+    return set(_CLASS.findall(bare)), set(_ID.findall(bare)), tags
+
+
+def uses(vocab: Vocabulary, need) -> bool:
+    if need is None:
+        return True
+    classes, ids, tags = need
+    return (all(vocab.has_class(c) for c in classes) and all(vocab.has_id(i) for i in ids)
+            and all(vocab.has_tag(t) for t in tags))
+
+
+# --------------------------------------------------------------------------
+# sheets
+# --------------------------------------------------------------------------
+class Sheet:
+    """One stylesheet's style rules, each with its selectors' requirements."""
+
+    def __init__(self, rel: str):
+        self.rel = rel
+        self.text = read(rel) or ""
+        self.nodes = css_tree.parse(self.text)
+        self.rules = []          # (block, [(selector text, requirements)], keep whole list)
+        stack = [iter(self.nodes)]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+            elif isinstance(node, css_tree.Block):
+                if node.items is not None and node.at_name() in css_optimize.GROUPS:
+                    stack.append(iter(node.items))
+                elif node.items is None and not node.at_name():
+                    sels = [css_optimize.squeeze(s, css_optimize._SELECTOR)
+                            for s in css_tree.split_selector(node.prelude)
+                            if css_tree.bare(s).strip()]
+                    self.rules.append((node, [(s, requirements(s)) for s in sels],
+                                       any(css_optimize.risky(s) for s in sels)))
+
+    def used(self, vocabs) -> dict:
+        """{id(block): [selectors some page in `vocabs` uses]} (all of them for a
+        list that must stay whole)."""
+        out = {}
+        for block, sels, whole in self.rules:
+            hit = [s for s, need in sels if any(uses(v, need) for v in vocabs)]
+            if hit:
+                out[id(block)] = [s for s, _ in sels] if whole else hit
+        return out
+
+    def subset(self, used) -> str:
+        """The sheet with only `used` rules and selectors, minified."""
+        def emit(nodes):
+            out = []
+            for node in nodes:
+                if isinstance(node, css_tree.Raw):
+                    out.append(css_tree.text(node.tokens))
+                elif node.items is not None and node.at_name() in css_optimize.GROUPS:
+                    out.append(css_tree.text(node.prelude) + "{" + emit(node.items) + "}")
+                elif node.items is not None or node.at_name():
+                    out.append(css_tree.serialize([node]))       # @keyframes, @font-face
+                elif id(node) in used:
+                    out.append(",".join(used[id(node)]) + "{" + css_tree.text(node.body) + "}")
+            return "\n".join(out)
+        return css_optimize.optimize(emit(self.nodes))
+
+
+def shared_sheets() -> list[str]:
+    sheets = list(SHARED)
+    try:
+        with io.open(DS_MANIFEST, "r", encoding="utf-8") as fh:
+            sheets += sorted(k for k in json.load(fh) if k.endswith(".css"))
+    except (OSError, ValueError):
+        pass
+    return sheets
+
+
+def template_of(rel: str) -> str:
+    for name, pattern in TEMPLATES:
+        if pattern.search(rel):
+            return name
+    return "site"
+
+
+def kb(n: int) -> str:
+    return "%.1fKB" % (n / 1024.0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--unused", action="store_true", help="list the rules no page uses")
+    ap.add_argument("--emit", action="store_true",
+                    help="write each group's subset under static/css/critical/")
+    args = ap.parse_args()
+
+    # {sheet: {group: [Vocabulary]}}, for the pages that link the sheet.
+    sheets = shared_sheets()
+    readers: dict = {rel: {} for rel in sheets}
+    pages = 0
+    for rel in git_html_files():
+        vocab, linked = index_page(rel)
+        hit = [s for s in sheets if s in linked]
+        if hit:
+            pages += 1
+        for sheet in hit:
+            readers[sheet].setdefault(template_of(rel), []).append(vocab)
+    print(f"{pages} pages link a shared sheet")
+
+    for rel in sheets:
+        groups = readers[rel]
+        if not groups:
+            continue
+        sheet = Sheet(rel)
+        full = len(css_optimize.optimize(sheet.text).encode("utf-8"))
+        print(f"\n{rel}: {len(sheet.rules)} rules, {kb(len(sheet.text.encode('utf-8')))} "
+              f"({kb(full)} optimized)")
+        for group, vocabs in sorted(groups.items()):
+            used = sheet.used(vocabs)
+            text = sheet.subset(used)
+            size = len(text.encode("utf-8"))
+            print(f"  {group:10s} {len(vocabs):4d} pages  {len(used):5d} rules used  "
+                  f"{kb(size):>8s}  ({100.0 * size / full if full else 0:.0f}%)")
+            if args.emit:
+                stem = os.path.splitext(os.path.basename(rel))[0]
+                write_output(os.path.join(CRITICAL_DIR, group, stem + ".css"), text)
+        everyone = sheet.used([v for vocabs in groups.values() for v in vocabs])
+        unused = [sels for block, sels, _ in sheet.rules if id(block) not in everyone]
+        print(f"  unused by every page: {len(unused)} rules")
+        if args.unused:
+            for sels in unused:
+                print("    " + ",".join(s for s, _ in sels))
+    if args.emit:
+        print(f"\n{summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,28 +6,73 @@ Kept as one entry point because the order matters and two of the steps are not
 idempotent: light_theme_transform.py maps a colour onto the light ramp, and
 running it twice on the same file keeps mapping the already-mapped value (a
 2% ink wash decays to 0.2%). So the transform must only ever see pristine
-input. `--reset <commit>` restores the content files first and is the supported
-way to re-run.
+input.
 
   python scripts/light_theme_build.py                    # build from current tree
-  python scripts/light_theme_build.py --reset e4d320f2   # restore, then build
+  python scripts/light_theme_build.py --reset e4d320f2   # pristine input from that commit
+  python scripts/light_theme_build.py --jobs 8
 
 Steps:
-  1. transform the shell pages' own <style> and opt them in
-  2. drop tmr-ds--dark from the design-system pages and transform their styles
-  3. transform the page-dedicated stylesheets and the one JS-injected stylesheet
-  4. apply the page-specific fixes no rule can infer  (idempotent)
-  5. regenerate static/css/tmr-light.css
-  6. restamp every /static/ ?v= tag so the edge serves the new bytes
+  1. per file, on a process pool, from the file's PRISTINE text:
+       shell pages        transform their own <style>, then opt in
+       design-system      drop tmr-ds--dark, then transform
+       dedicated sheets   transform (including the one JS-injected stylesheet)
+     and then the page-specific fixes no rule can infer, for any file that
+     has some (idempotent, so fix-only files start from their current text)
+  2. regenerate static/css/tmr-light.css
+  3. restamp every /static/ ?v= tag so the edge serves the new bytes
+
+LIGHT_BUILD_20261019. This used to be five subprocesses in a row, each
+re-reading every file, and `--reset <commit>` did a `git checkout <commit> --
+.` over the whole worktree first, because nothing recorded which files were
+already transformed. Now it runs in one process, reads each target once, and
+keeps a manifest (BUILD_MANIFEST) of, per file, the hash of the pristine
+input and the hash of what the pipeline made of it, under a version derived
+from the pipeline's own source:
+
+  current bytes == recorded output, same version   cache hit: not even parsed
+  the version moved                                rebuilt from the pristine
+                                                   text at the recorded base
+                                                   commit (git cat-file, the
+                                                   worktree is not touched)
+  never built                                      its current text IS the
+                                                   pristine input
+  edited since it was built                        skipped with a warning:
+                                                   its text is part output,
+                                                   part edit, and the
+                                                   transform would map the
+                                                   mapped half again. Rebuild
+                                                   it with --reset, or --force
+                                                   to take it as pristine.
+
+Outputs go through output_writer, so an unchanged file is not rewritten.
 """
 from __future__ import annotations
 
+import argparse
+import concurrent.futures
+import hashlib
+import io
+import json
 import os
+import re
 import subprocess
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import build_light_overrides  # noqa: E402
+import css_optimize  # noqa: E402
+import light_theme_optin as optin  # noqa: E402
+import light_theme_page_fixes as fixes  # noqa: E402
+import light_theme_targets as targets  # noqa: E402
+import light_theme_transform as transform  # noqa: E402
+import version_static_refs  # noqa: E402
+from output_writer import summary, write_output  # noqa: E402
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-PY = sys.executable
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Dot-named, so GitHub Pages (Jekyll) never publishes it.
+BUILD_MANIFEST = os.path.join(ROOT, "static", "css", ".light-build.json")
 
 # Stylesheets used ONLY by pages being converted, so they can be edited in
 # place. Anything shared with a page that stays dark is derived into
@@ -38,47 +83,242 @@ DEDICATED = [
     "static/js/tmr-fan-identity.js",  # builds the profile's Sports Identity card
 ]
 
+# Everything that decides what a file becomes. Editing any of them moves the
+# version and rebuilds every file from its pristine text.
+PIPELINE = ["css_tree.py", "placeholders.py", "light_theme_transform.py", "light_theme_optin.py",
+            "light_theme_page_fixes.py", "light_theme_build.py"]
+
+
+def pipeline_version() -> str:
+    h = hashlib.sha256()
+    for name in PIPELINE:
+        with open(os.path.join(HERE, name), "rb") as fh:
+            h.update(fh.read())
+    return h.hexdigest()[:16]
+
+
+# The ?v= tags step 3 stamps after the manifest is written, and restamps
+# whenever some other asset changes. They are not part of what the pipeline
+# made of a file, so they are not part of its digest either.
+STAMP = re.compile(r"(/static/(?:js|css)/[A-Za-z0-9._-]+\.(?:js|css))\?v=[A-Za-z0-9]*")
+
+
+def digest(text: str) -> str:
+    return hashlib.sha256(STAMP.sub(r"\1", text).encode("utf-8")).hexdigest()[:16]
+
+
+def read(rel: str) -> str | None:
+    try:
+        with io.open(os.path.join(ROOT, rel.replace("/", os.sep)), "r",
+                     encoding="utf-8", newline="") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def git_blobs(commit: str, rels: list[str]) -> dict[str, str | None]:
+    """{rel: text at `commit`, or None if it did not exist}, read through one
+    `git cat-file --batch` without touching the worktree."""
+    if not rels:
+        return {}
+    query = "".join(f"{commit}:{rel}\n" for rel in rels).encode("utf-8")
+    raw = subprocess.run(["git", "cat-file", "--batch"], cwd=ROOT, input=query,
+                         stdout=subprocess.PIPE, check=True).stdout
+    out, pos = {}, 0
+    for rel in rels:
+        end = raw.index(b"\n", pos)
+        header = raw[pos:end].split()
+        pos = end + 1
+        if header[-1] == b"missing":
+            out[rel] = None
+            continue
+        size = int(header[2])
+        # newline="" semantics: bytes as committed, CRLF kept.
+        try:
+            out[rel] = raw[pos:pos + size].decode("utf-8")
+        except UnicodeDecodeError:
+            out[rel] = None
+        pos += size + 1
+    return out
+
 
-def run(args: list[str], capture: bool = False) -> str:
-    r = subprocess.run(args, cwd=ROOT, text=True,
-                       stdout=subprocess.PIPE if capture else None)
-    if r.returncode != 0 and not capture:
-        raise SystemExit(f"step failed: {' '.join(args)}")
-    return r.stdout or ""
+def resolve(commit: str) -> str:
+    return subprocess.run(["git", "rev-parse", "--verify", commit + "^{commit}"], cwd=ROOT,
+                          stdout=subprocess.PIPE, check=True, text=True).stdout.strip()
 
 
-def lines(out: str) -> list[str]:
-    return [l.strip() for l in out.splitlines() if l.strip()]
+def load_manifest() -> dict:
+    try:
+        with io.open(BUILD_MANIFEST, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        data["files"] = dict(data.get("files") or {})
+        return data
+    except (OSError, ValueError, TypeError, AttributeError):
+        return {}
+
+
+# --------------------------------------------------------------------------
+# the per-file chain (runs in a worker)
+# --------------------------------------------------------------------------
+def build_file(task):
+    """(rel, kind, pristine text) -> (rel, output text, notes, colours), the
+    last being the colour cache's drain() for this file. Top-level so it
+    pickles. Raises on a page fix whose anchor is gone."""
+    rel, kind, text = task
+    notes = []
+    if kind == "ds":
+        text, done = optin.optin(text, undark=True, link=False)
+        notes += done
+    if kind in ("shell", "ds", "dedicated"):
+        text, n = transform.transform_file(rel, text)
+        notes.append(f"{n} declarations")
+    if kind == "shell":
+        text, done = optin.optin(text)
+        notes += done
+    text, report, missing = fixes.apply_fixes(rel, text)
+    if missing:
+        raise RuntimeError("\n".join(report))
+    applied = sum(line.startswith("applied") for line in report)
+    if applied:
+        notes.append(f"{applied} fixes")
+    return rel, text, notes, transform.COLOURS.drain()
+
+
+def kinds_of(shell, ds) -> dict[str, str]:
+    kinds = {rel: "fix" for rel in fixes.fixed_files()}
+    kinds.update({rel: "dedicated" for rel in DEDICATED})
+    kinds.update({rel: "ds" for rel in ds})
+    kinds.update({rel: "shell" for rel in shell})
+    return kinds
+
+
+def plan(args, manifest, version):
+    """Which files need building, and from what. Returns (tasks, hits,
+    skipped), tasks as [(rel, kind, pristine text)]."""
+    recorded = manifest.get("files", {})
+    same_version = manifest.get("version") == version
+    if args.reset:
+        # Classify the pages as they were at the commit: a converted page has
+        # lost its tmr-ds--dark, so the worktree would misfile it as shell.
+        pages = targets.git_html_files(args.reset)
+        blobs = git_blobs(args.reset, pages)
+        kinds = kinds_of(*targets.classify(pages, blobs.get))
+        pristine = {**git_blobs(args.reset, [r for r in kinds if r not in blobs]), **blobs}
+    else:
+        # Same reason: a file the manifest knows keeps the kind it was built as.
+        kinds = kinds_of(*targets.classify())
+        kinds.update({rel: entry["kind"] for rel, entry in recorded.items() if "kind" in entry})
+        base = manifest.get("base")
+        pristine = git_blobs(base, sorted(kinds)) if base and not same_version else {}
+
+    tasks, hits, skipped = [], [], []
+    for rel, kind in sorted(kinds.items()):
+        current = read(rel)
+        if current is None:
+            continue
+        entry = recorded.get(rel)
+        built = entry is not None and entry.get("out") == digest(current)
+        if built and same_version and not args.reset:
+            hits.append(rel)
+            continue
+        if kind == "fix":
+            # Page fixes are idempotent: the current text is always safe input.
+            tasks.append((rel, kind, current))
+        elif entry is not None and not built and not args.reset:
+            # Edited since it was built. Checked before the pristine copy: a
+            # version bump must not rebuild from the base blob and drop the edit.
+            if args.force:
+                tasks.append((rel, kind, current))
+            else:
+                skipped.append(rel)
+        elif pristine.get(rel) is not None:
+            tasks.append((rel, kind, pristine[rel]))
+        elif args.reset:
+            continue                    # not in the commit: nothing pristine to build from
+        elif built:
+            sys.exit(f"ABORT: {rel} was built by an older pipeline and there is no pristine "
+                     f"copy of it at {manifest.get('base') or 'any recorded commit'} - "
+                     "run with --reset <commit>")
+        elif args.force or (entry is None and not looks_built(current)):
+            tasks.append((rel, kind, current))
+        else:
+            skipped.append(rel)
+    return tasks, hits, skipped
+
+
+def looks_built(html: str) -> bool:
+    """A page the manifest has never seen can still be one an earlier build
+    converted (a tree from before the manifest existed). Transforming it again
+    is exactly the double-mapping this build exists to prevent."""
+    return "/static/css/tmr-light.css" in html
 
 
 def main() -> int:
-    if "--reset" in sys.argv:
-        base = sys.argv[sys.argv.index("--reset") + 1]
-        print(f"== restoring content files from {base}")
-        run(["git", "checkout", base, "--", "."])
-
-    targets = os.path.join("scripts", "light_theme_targets.py")
-    shell = lines(run([PY, targets, "--shell"], capture=True))
-    ds = lines(run([PY, targets, "--ds-dark"], capture=True))
-    print(f"== {len(shell)} shell pages, {len(ds)} design-system pages")
-
-    tr = os.path.join("scripts", "light_theme_transform.py")
-    optin = os.path.join("scripts", "light_theme_optin.py")
-
-    run([PY, tr, "--apply"] + shell, capture=True)
-    run([PY, optin] + shell, capture=True)
-    if ds:
-        run([PY, optin, "--undark", "--no-link"] + ds, capture=True)
-        run([PY, tr, "--apply"] + ds, capture=True)
-    run([PY, tr, "--apply"] + DEDICATED, capture=True)
-
-    print("== page fixes")
-    run([PY, os.path.join("scripts", "light_theme_page_fixes.py")])
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--reset", metavar="COMMIT",
+                    help="take every target's pristine text from COMMIT (the worktree is not checked out)")
+    ap.add_argument("--force", action="store_true",
+                    help="treat a file edited since its last build as pristine")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, metavar="N",
+                    help="worker processes for the per-file chain (default: one per CPU)")
+    args = ap.parse_args()
+
+    version = pipeline_version()
+    manifest = load_manifest()
+    if args.reset:
+        args.reset = resolve(args.reset)
+
+    if not manifest and not (args.reset or args.force):
+        sys.exit(f"ABORT: no {os.path.relpath(BUILD_MANIFEST, ROOT)} - nothing records which "
+                 "files are already converted. Run once with --reset <commit> (the last commit "
+                 "before the rollout), or --force to take the tree as it stands as pristine")
+    tasks, hits, skipped = plan(args, manifest, version)
+    print(f"== {len(tasks) + len(hits) + len(skipped)} files: {len(hits)} cached, "
+          f"{len(tasks)} to build, {len(skipped)} skipped")
+    for rel in skipped:
+        print(f"   SKIPPED  {rel}: edited since its last build (--reset or --force to rebuild)")
+
+    # Everything renders before anything is written, so a failed fix leaves
+    # the tree exactly as it was.
+    # Each worker warms its own colour cache and hands back what it computed,
+    # so the saved table covers every file whichever process built it.
+    results = []
+    transform.COLOURS.load()
+    if args.jobs > 1 and len(tasks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs,
+                                                    initializer=transform.COLOURS.load) as pool:
+            results = list(pool.map(build_file, tasks, chunksize=4))
+    else:
+        results = [build_file(task) for task in tasks]
+    for result in results:
+        transform.COLOURS.merge(result[3])
+
+    # A skipped file keeps its old entry, so it stays "edited since built"
+    # until someone rebuilds it.
+    files = dict(manifest.get("files", {}))
+    source = {rel: (kind, text) for rel, kind, text in tasks}
+    for rel, text, notes, _ in results:
+        # Differing only in ?v= stamps: step 3 would put the current ones
+        # straight back, so leave the file alone.
+        if digest(text) != digest(read(rel) or ""):
+            write_output(os.path.join(ROOT, rel.replace("/", os.sep)), text)
+        kind, pristine = source[rel]
+        files[rel] = {"kind": kind, "in": digest(pristine), "out": digest(text)}
+        print(f"   {'  '.join(notes) or 'no change':28s} {rel}")
+
     print("== generating tmr-light.css")
-    run([PY, os.path.join("scripts", "build_light_overrides.py")])
+    write_output(os.path.join(ROOT, build_light_overrides.TARGET.replace("/", os.sep)),
+                 build_light_overrides.build())
+    print("   " + css_optimize.report())
+    print("   " + transform.COLOURS.stats())
+    transform.COLOURS.save()
     print("== restamping asset versions")
-    run([PY, os.path.join("scripts", "version_static_refs.py")], capture=True)
-    print("done")
+    version_static_refs.run(False)
+
+    write_output(BUILD_MANIFEST, json.dumps(
+        {"version": version, "base": args.reset or manifest.get("base"), "files": files},
+        indent=1, sort_keys=True) + "\n")
+    print(f"done ({summary()})")
     return 0
 
 
@@ -79,6 +79,23 @@ def add_link(html: str) -> tuple[str, bool]:
     return html[:m.start()] + f"{indent}{LINK}\n" + html[m.start():], True
 
 
+def optin(html: str, undark: bool = False, link: bool = True) -> tuple[str, list[str]]:
+    """The whole opt-in for one page. Returns (html, notes)."""
+    notes = []
+    if undark:
+        html, ok = drop_body_class(html, "tmr-ds--dark")
+        if ok:
+            notes.append("-tmr-ds--dark")
+    if link:
+        html, ok = add_body_class(html, "tmr-light")
+        if ok:
+            notes.append("+tmr-light")
+        html, ok = add_link(html)
+        if ok:
+            notes.append("+link")
+    return html, notes
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("files", nargs="+")
@@ -92,19 +109,7 @@ def main():
         path = os.path.join(ROOT, rel.replace("/", os.sep))
         with io.open(path, "r", encoding="utf-8", newline="") as fh:
             src = fh.read()
-        out = src
-        notes = []
-        if args.undark:
-            out, ok = drop_body_class(out, "tmr-ds--dark")
-            if ok:
-                notes.append("-tmr-ds--dark")
-        if not args.no_link:
-            out, ok = add_body_class(out, "tmr-light")
-            if ok:
-                notes.append("+tmr-light")
-            out, ok = add_link(out)
-            if ok:
-                notes.append("+link")
+        out, notes = optin(src, undark=args.undark, link=not args.no_link)
         if out != src:
             with io.open(path, "w", encoding="utf-8", newline="") as fh:
                 fh.write(out)
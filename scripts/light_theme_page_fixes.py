@@ -87,32 +87,53 @@ def as_pattern(literal: str) -> re.Pattern:
     return re.compile(re.escape(literal).replace("\\\n", "\r?\n"))
 
 
-def main() -> int:
-    check = "--check" in sys.argv
-    missing = 0
-    for rel, old, new in FIXES:
-        path = os.path.join(ROOT, rel.replace("/", os.sep))
-        with io.open(path, "r", encoding="utf-8", newline="") as fh:
-            src = fh.read()
+def apply_fixes(rel: str, src: str, check: bool = False) -> tuple[str, list[str], int]:
+    """Every fix for `rel`, applied to its text in order.
+
+    Returns (text, report lines, count of fixes missing or - with check -
+    still pending)."""
+    report, missing = [], 0
+    for fix_rel, old, new in FIXES:
+        if fix_rel != rel:
+            continue
         old_re, new_re = as_pattern(old), as_pattern(new)
         # `new` decides done-ness, not the absence of `old`. Some fixes INSERT
         # ahead of an anchor and deliberately keep it, so testing for `old` would
         # re-apply them on every run and duplicate the rule.
         if new_re.search(src):
-            print(f"ok       {rel}: already applied")
+            report.append(f"ok       {rel}: already applied")
             continue
         if not old_re.search(src):
-            print(f"MISSING  {rel}: pattern not found -- source changed shape")
+            report.append(f"MISSING  {rel}: pattern not found -- source changed shape")
             missing += 1
             continue
         if check:
-            print(f"PENDING  {rel}")
+            report.append(f"PENDING  {rel}")
             missing += 1
             continue
         eol = "\r\n" if "\r\n" in src else "\n"
-        with io.open(path, "w", encoding="utf-8", newline="") as fh:
-            fh.write(old_re.sub(new.replace("\n", eol).replace("\\", "\\\\"), src, count=1))
-        print(f"applied  {rel}")
+        src = old_re.sub(new.replace("\n", eol).replace("\\", "\\\\"), src, count=1)
+        report.append(f"applied  {rel}")
+    return src, report, missing
+
+
+def fixed_files() -> list[str]:
+    return list(dict.fromkeys(rel for rel, _, _ in FIXES))
+
+
+def main() -> int:
+    check = "--check" in sys.argv
+    missing = 0
+    for rel in fixed_files():
+        path = os.path.join(ROOT, rel.replace("/", os.sep))
+        with io.open(path, "r", encoding="utf-8", newline="") as fh:
+            src = fh.read()
+        out, report, n = apply_fixes(rel, src, check)
+        missing += n
+        print("\n".join(report))
+        if out != src:
+            with io.open(path, "w", encoding="utf-8", newline="") as fh:
+                fh.write(out)
     return 1 if missing else 0
 
 
@@ -52,21 +52,34 @@ DS_DARK_KEEP = re.compile(r"^(mlb-simulator/|sportsbook/)")
 EXTRA_SHELL = ["activation/index.html"]
 
 
-def git_html_files() -> list[str]:
-    out = subprocess.check_output(["git", "ls-files", "*.html"], cwd=ROOT)
-    return out.decode("utf-8").splitlines()
-
-
-def classify():
+def git_html_files(commit: str | None = None) -> list[str]:
+    """The tracked pages - in the worktree, or in `commit` if given."""
+    if commit is None:
+        out = subprocess.check_output(["git", "ls-files", "*.html"], cwd=ROOT)
+        return out.decode("utf-8").splitlines()
+    # ls-tree takes path prefixes, not globs.
+    out = subprocess.check_output(["git", "ls-tree", "-r", "--name-only", commit], cwd=ROOT)
+    return [rel for rel in out.decode("utf-8").splitlines() if rel.endswith(".html")]
+
+
+def read_worktree(rel: str) -> str | None:
+    path = os.path.join(ROOT, rel.replace("/", os.sep))
+    try:
+        with io.open(path, "r", encoding="utf-8", newline="") as fh:
+            return fh.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def classify(files=None, read=read_worktree):
+    """(shell, ds_dark). light_theme_build.py passes the page list and texts of
+    a commit, to classify the pristine pages rather than the converted ones."""
     shell, ds_dark = [], []
-    for rel in git_html_files():
+    for rel in git_html_files() if files is None else files:
         if EXCLUDE.search(rel):
             continue
-        path = os.path.join(ROOT, rel.replace("/", os.sep))
-        try:
-            with io.open(path, "r", encoding="utf-8", newline="") as fh:
-                html = fh.read()
-        except (OSError, UnicodeDecodeError):
+        html = read(rel)
+        if html is None:
             continue
         m = re.search(r"(?is)<body[^>]*\bclass\s*=\s*['\"]([^'\"]*)['\"]", html)
         cls = m.group(1) if m else ""
@@ -31,10 +31,18 @@ from __future__ import annotations
 
 import argparse
 import colorsys
+import hashlib
 import io
+import json
 import os
 import re
 import sys
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import css_tree  # noqa: E402
+from output_writer import write_output  # noqa: E402
+from placeholders import Stash  # noqa: E402
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -340,21 +348,123 @@ ROLE_MAP["auto"] = map_auto
 SKIP_VALUE = re.compile(r"url\(|var\(|currentColor|transparent|inherit|initial|unset", re.I)
 
 
+# --------------------------------------------------------------------------
+# colour cache
+# --------------------------------------------------------------------------
+# COLOUR_CACHE_20261019. Every colour literal used to be parsed, converted to
+# HSL and run through its role's mapper on every occurrence, and a full-tree
+# rebuild meets the same few dozen palette colours tens of thousands of times.
+# The mappers are pure functions of (colour, role), so the answer is cached
+# under that key: the literal normalised (hex lower-cased, a function's
+# whitespace collapsed) plus the role. clip_text needs no place in the key -
+# it only ever changes WHICH role a declaration gets, never what a role does.
+#
+# Bounded LRU, so a pathological input cannot grow it without limit. The CLI
+# loads it from COLOUR_MAP and saves it back after --apply, which also makes
+# the mapping auditable: the file is every literal this tool has rewritten,
+# what it became, and under which role. It is keyed to a hash of this file, so
+# editing any mapper discards the table instead of replaying stale answers.
+# Worker processes (light_theme_build --jobs) each fill their own copy; drain()
+# hands what one worker learned back to the parent, which merge()s it before
+# saving.
+COLOUR_MAP = os.path.join(ROOT, "static", "css", ".light-colour-map.json")
+
+
+def _mapping_version() -> str:
+    with open(os.path.abspath(__file__), "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()[:16]
+
+
+class ColourCache:
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.table: OrderedDict = OrderedDict()
+        self.hits = self.misses = 0
+        self.fresh: list = []
+
+    def lookup(self, literal: str, role: str, compute):
+        key = (literal, role)
+        try:
+            out = self.table[key]
+        except KeyError:
+            self.misses += 1
+            out = self.table[key] = compute()
+            self.fresh.append(key)
+            if len(self.table) > self.maxsize:
+                self.table.popitem(last=False)
+            return out
+        self.hits += 1
+        self.table.move_to_end(key)
+        return out
+
+    def stats(self) -> str:
+        seen = self.hits + self.misses
+        return "colour cache: %d hits, %d misses (%.1f%% hit rate), %d entries" % (
+            self.hits, self.misses, 100.0 * self.hits / seen if seen else 0.0, len(self.table))
+
+    def drain(self) -> tuple:
+        """(rows computed, hits, misses) since the last drain, and reset
+        them. Plain lists and ints, so a worker can return it."""
+        rows = [[literal, role, self.table[(literal, role)]]
+                for literal, role in self.fresh if (literal, role) in self.table]
+        out = (rows, self.hits, self.misses)
+        self.fresh, self.hits, self.misses = [], 0, 0
+        return out
+
+    def merge(self, drained: tuple) -> None:
+        """Fold another process's drain() into this cache."""
+        rows, hits, misses = drained
+        for literal, role, out in rows:
+            self.table[(literal, role)] = out
+            if len(self.table) > self.maxsize:
+                self.table.popitem(last=False)
+        self.hits += hits
+        self.misses += misses
+
+    def load(self, path: str = COLOUR_MAP) -> None:
+        """Warm the cache from a saved table. A missing, unreadable or
+        out-of-date file is an empty cache, never an error."""
+        try:
+            with io.open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") != _mapping_version():
+                return
+            for literal, role, out in data.get("map") or []:
+                self.table[(literal, role)] = out
+        except (OSError, ValueError, TypeError, AttributeError):
+            return
+
+    def save(self, path: str = COLOUR_MAP) -> None:
+        rows = sorted([literal, role, out] for (literal, role), out in self.table.items())
+        # One row per line, so a diff of the table reads as a diff of the mapping.
+        data = ('{"version": %s, "map": [\n%s\n]}\n'
+                % (json.dumps(_mapping_version()), ",\n".join(json.dumps(r) for r in rows)))
+        write_output(path, data)
+
+
+COLOURS = ColourCache()
+
+
 def rewrite_value(value: str, role: str) -> str:
     fn = ROLE_MAP[role]
 
+    def map_hex(tok):
+        parsed = parse_hex(tok)
+        return fn(*parsed) if parsed else None
+
+    def map_func(kind, body):
+        parsed = parse_func(kind, body)
+        return fn(*parsed) if parsed else None
+
     def repl_hex(m):
-        parsed = parse_hex(m.group(0))
-        if not parsed:
-            return m.group(0)
-        out = fn(*parsed)
-        return out if out else m.group(0)
+        tok = m.group(0)
+        out = COLOURS.lookup(tok.lower(), role, lambda: map_hex(tok))
+        return out if out else tok
 
     def repl_func(m):
-        parsed = parse_func(m.group(1), m.group(2))
-        if not parsed:
-            return m.group(0)
-        out = fn(*parsed)
+        kind, body = m.group(1), m.group(2)
+        key = "%s(%s)" % (kind.lower(), " ".join(body.split()))
+        out = COLOURS.lookup(key, role, lambda: map_func(kind, body))
         return out if out else m.group(0)
 
     value = HEX_RE.sub(repl_hex, value)
@@ -362,53 +472,73 @@ def rewrite_value(value: str, role: str) -> str:
     return value
 
 
-DECL_RE = re.compile(r"([-A-Za-z][-A-Za-z0-9_]*)(\s*:\s*)([^;{}]+)")
-
-
-COMMENT = re.compile(r"/\*.*?\*/", re.S)
+def _rewrite_runs(tokens, fn) -> str:
+    """Apply `fn` to the plain text of a value, leaving comments, strings and
+    url(...) exactly as written: a hex in a comment or a data: URI is not a
+    colour this page paints."""
+    plain = css_tree.text(tokens)
+    if "/*" not in plain and '"' not in plain and "'" not in plain and "url(" not in plain.lower():
+        return fn(plain)
+    out, run = [], []
+    for t in tokens:
+        if css_tree.is_opaque(t):
+            if run:
+                out.append(fn("".join(run)))
+                run = []
+            out.append(t)
+        else:
+            run.append(t)
+    if run:
+        out.append(fn("".join(run)))
+    return "".join(out)
+
+
+def _rewrite_decls(decls, clip_text: bool = False) -> tuple[str, int]:
+    hits = 0
+    out = []
+    for d in decls:
+        if d.prop is None or not d.value:
+            out.append(d.source())
+            continue
+        val = css_tree.bare(d.value)
+        # Not a colour, but it decides the UA's ink for form controls,
+        # scrollbars and autofill. Left on `dark` under a light page it produces
+        # a white-on-white text input that no rule of ours ever touched.
+        if d.prop.lower() == "color-scheme" and "dark" in val.lower():
+            hits += 1
+            new = _rewrite_runs(d.value, lambda v: v.lower().replace("dark", "light"))
+        else:
+            role = role_for(d.prop, val, clip_text)
+            if not role:
+                out.append(d.source())
+                continue
+            # `!important`, var() fallbacks and gradient geometry all survive
+            # because only the colour literals inside the value are substituted.
+            old = css_tree.text(d.value)
+            new = _rewrite_runs(d.value, lambda v: rewrite_value(v, role))
+            if new != old:
+                hits += 1
+        out.append(d.head + d.prop + d.sep + new + d.end)
+    return "".join(out), hits
 
 
 def rewrite_declarations(css: str, clip_text: bool = False) -> tuple[str, int]:
-    hits = [0]
+    """Rewrite a declaration list: a rule body or a style="" attribute.
 
-    # Comments come out first. Prose contains colons, and the declaration regex
-    # is happy to read "page grey: near-black base ... */ --ed-bg: #070910" as a
-    # single declaration named `grey` -- silently swallowing the real token
-    # behind it, which is what left the Game File pages on a #070910 ground.
-    stash: list[str] = []
+    Comments are opaque tokens (see css_tree), so prose like "page grey:
+    near-black base" can never be read as a declaration named `grey` and
+    swallow the real token behind it -- which is what once left the Game File
+    pages on a #070910 ground."""
+    return _rewrite_decls(css_tree.declarations(css_tree.tokenize(css)), clip_text)
 
-    def hide(m):
-        stash.append(m.group(0))
-        return f"\x01C{len(stash) - 1}\x01"
 
-    css = COMMENT.sub(hide, css)
+def clips_text(decls) -> bool:
+    """True if the rule sets background-clip:text, i.e. its background is the
+    lettering, not a surface."""
+    return any(d.prop and d.prop.lower() in ("background-clip", "-webkit-background-clip")
+               and css_tree.bare(d.value).strip().lower().startswith("text")
+               for d in decls)
 
-    def repl(m):
-        prop, sep, val = m.group(1), m.group(2), m.group(3)
-        # Not a colour, but it decides the UA's ink for form controls,
-        # scrollbars and autofill. Left on `dark` under a light page it produces
-        # a white-on-white text input that no rule of ours ever touched.
-        if prop.strip().lower() == "color-scheme" and "dark" in val.lower():
-            hits[0] += 1
-            return prop + sep + val.lower().replace("dark", "light")
-        role = role_for(prop, val, clip_text)
-        if not role:
-            return m.group(0)
-        # `!important`, var() fallbacks and gradient geometry all survive
-        # because only the colour literals inside the value are substituted.
-        new = rewrite_value(val, role)
-        if new != val:
-            hits[0] += 1
-        return prop + sep + new
-
-    out = DECL_RE.sub(repl, css)
-    for i, c in enumerate(stash):
-        out = out.replace(f"\x01C{i}\x01", c)
-    return out, hits[0]
-
-
-CLIP_TEXT = re.compile(r"(?:-webkit-)?background-clip\s*:\s*text", re.I)
-INNER_RULE = re.compile(r"([^{}]*)\{([^{}]*)\}")
 
 # Selectors that live inside a band which STAYS navy (see section 3 of
 # static/css/tmr-light-base.css). Their colours are already correct for a dark
@@ -431,64 +561,51 @@ def rewrite_css(css: str) -> tuple[str, int]:
     (that depends on a sibling `background-clip`), and whether the rule targets
     something inside a band that stays dark.
 
-    Only the innermost braces are matched, which is exactly where declarations
-    live -- @media wrappers pass through untouched.
+    Only leaf blocks are rewritten, which is exactly where declarations live --
+    @media wrappers pass through untouched. The sheet is tokenized and walked
+    once (css_tree); comments are opaque, so a comment above a rule is never
+    read as part of its selector, and one that merely MENTIONS `.hero` cannot
+    take the rule for a dark band.
     """
-    total = [0]
-
-    # Same reason as in rewrite_declarations, one level up: a comment above a
-    # rule would otherwise be read as part of its selector, and a comment that
-    # merely MENTIONS `.hero` would take the rule for a dark band.
-    stash: list[str] = []
-
-    def hide(m):
-        stash.append(m.group(0))
-        return f"\x01C{len(stash) - 1}\x01"
-
-    css = COMMENT.sub(hide, css)
-
-    def rule(m):
-        sel, body = m.group(1), m.group(2)
+    total = 0
+    out: list[str] = []
+    stack = [iter(css_tree.parse(css))]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        if isinstance(node, str):
+            out.append(node)
+            continue
+        if isinstance(node, css_tree.Raw):
+            out.append(css_tree.text(node.tokens))
+            continue
+        sel = css_tree.text(node.prelude)
+        if node.items is not None:
+            out.append(sel + "{")
+            stack.append(iter(list(node.items) + (["}"] if node.closed else [])))
+            continue
+        body = css_tree.text(node.body)
         dark, light = [], []
-        for one in split_selector(sel):
-            (dark if DARK_SCOPE.search(one) else light).append(one)
-        if not light:
-            return m.group(0)
-        clip = bool(CLIP_TEXT.search(body))
-        out, n = rewrite_declarations(body, clip_text=clip)
-        total[0] += n
+        for one in css_tree.split_selector(node.prelude):
+            (dark if DARK_SCOPE.search(css_tree.bare(one)) else light).append(css_tree.text(one))
+        if not light or not node.closed:
+            out.append(sel + "{" + body + ("}" if node.closed else ""))
+            continue
+        decls = css_tree.declarations(node.body)
+        new, n = _rewrite_decls(decls, clip_text=clips_text(decls))
+        total += n
         if not dark:
-            return sel + "{" + out + "}"
+            out.append(sel + "{" + new + "}")
+            continue
         # A MIXED rule. `.premium-hero p, .feature-row .feature-name { color:#97a8bc }`
         # is one declaration serving a navy band and a white card at once; keeping
         # it whole means one of the two ends up unreadable. Split it in place.
         lead = sel[:len(sel) - len(sel.lstrip())]
-        return (lead + ",".join(dark) + "{" + body + "}\n"
-                + lead + ",".join(light) + "{" + out + "}")
-
-    out = INNER_RULE.sub(rule, css)
-    for i, c in enumerate(stash):
-        out = out.replace(f"\x01C{i}\x01", c)
-    return out, total[0]
-
-
-def split_selector(sel: str) -> list[str]:
-    """Split a selector list on top-level commas only."""
-    parts, depth, buf = [], 0, []
-    for ch in sel:
-        if ch in "([":
-            depth += 1
-        elif ch in ")]":
-            depth -= 1
-        if ch == "," and depth == 0:
-            parts.append("".join(buf).strip())
-            buf = []
-        else:
-            buf.append(ch)
-    tail = "".join(buf).strip()
-    if tail:
-        parts.append(tail)
-    return [p for p in parts if p]
+        out.append(lead + ",".join(dark) + "{" + body + "}\n"
+                   + lead + ",".join(light) + "{" + new + "}")
+    return "".join(out), total
 
 
 STYLE_BLOCK = re.compile(r"(?is)(<style[^>]*>)(.*?)(</style>)")
@@ -501,13 +618,8 @@ def transform_html(html: str) -> tuple[str, int]:
 
     # Protect <script> bodies: they can contain style strings we must not touch
     # through the attribute pass.
-    scripts: list[str] = []
-
-    def stash(m):
-        scripts.append(m.group(0))
-        return f"\x00SCRIPT{len(scripts) - 1}\x00"
-
-    html = SCRIPT_BLOCK.sub(stash, html)
+    scripts = Stash("SCRIPT")
+    html = SCRIPT_BLOCK.sub(scripts, html)
 
     def do_style(m):
         nonlocal total
@@ -525,9 +637,7 @@ def transform_html(html: str) -> tuple[str, int]:
 
     html = STYLE_ATTR.sub(do_attr, html)
 
-    for i, s in enumerate(scripts):
-        html = html.replace(f"\x00SCRIPT{i}\x00", s)
-    return html, total
+    return scripts.restore(html), total
 
 
 def transform_css_file(css: str) -> tuple[str, int]:
@@ -557,6 +667,17 @@ def transform_js_css(src: str, rel: str) -> tuple[str, int]:
     return src[:i] + body + src[j:], n
 
 
+def transform_file(rel: str, src: str) -> tuple[str, int]:
+    """Transform one file's text by what it is: a JS-built stylesheet, a
+    stylesheet, or a page."""
+    key = rel.replace(os.sep, "/")
+    if key in JS_CSS_BLOCKS:
+        return transform_js_css(src, key)
+    if key.endswith(".css"):
+        return transform_css_file(src)
+    return transform_html(src)
+
+
 # --------------------------------------------------------------------------
 def main():
     ap = argparse.ArgumentParser()
@@ -564,21 +685,19 @@ def main():
     ap.add_argument("--apply", action="store_true")
     args = ap.parse_args()
 
+    COLOURS.load()
     for rel in args.files:
         path = os.path.join(ROOT, rel.replace("/", os.sep))
         with io.open(path, "r", encoding="utf-8", newline="") as fh:
             src = fh.read()
-        key = rel.replace(os.sep, "/")
-        if key in JS_CSS_BLOCKS:
-            out, n = transform_js_css(src, key)
-        elif path.endswith(".css"):
-            out, n = transform_css_file(src)
-        else:
-            out, n = transform_html(src)
+        out, n = transform_file(rel, src)
         if args.apply and out != src:
             with io.open(path, "w", encoding="utf-8", newline="") as fh:
                 fh.write(out)
         print(f"{n:5d} declarations  {rel}")
+    print(COLOURS.stats())
+    if args.apply:
+        COLOURS.save()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+output_writer.py - the one way a generator here puts a file on disk.
+
+WRITE_IF_CHANGED_20261019. Every generator in scripts/ used to open its output
+with "w" and write it unconditionally, on a 30-minute cron. Three problems with
+that, all of which this module exists to close:
+
+  1. A bake that changed nothing still rewrote every file it owns. Git sees no
+     diff, but the mtimes move, every downstream step that looks at the tree
+     (version_static_refs, the asset hashers, the Pages deploy) has to re-read
+     all of it, and two cron jobs writing the same file is a race even when
+     they would both write the same bytes.
+  2. open(path, "w") truncates first. A run killed between the truncate and the
+     last write - a CI timeout, an OOM, Ctrl-C - leaves a half-written page
+     live, or an empty one.
+  3. C: on the Windows build box intermittently writes files as all-NULL bytes
+     (see build_matchup_articles.write). version_static_refs.py and the trivia
+     and matchup builders each grew their own re-read-and-compare after the
+     write to catch it, three copies of the same check.
+
+write_output() compares the SHA-256 of the new bytes with the file already on
+disk and does nothing when they match. Otherwise it writes a temp file in the
+same directory, reads that back and checks it against the same digest, and only
+then os.replace()s it over the target. The replace is atomic, so a reader sees
+the old file or the new one and never a torn one, and a bad write is caught
+before it can replace anything.
+
+Line endings: `preserve_newlines=True` keeps whatever the existing file uses
+(CRLF wins if most of its lines are CRLF), which is what
+build_matchup_articles.write() has always done - this repo has mixed endings
+and core.autocrlf=false, so rewriting a CRLF file as LF turns a one-line change
+into a whole-file diff. A NEW file gets LF. Without it, text is written exactly
+as given.
+
+    import output_writer
+    output_writer.write_output(path, text)          # True if the file changed
+    print(output_writer.summary())                  # "wrote 3, unchanged 57"
+
+A page too big to build as one string goes through StreamingOutput instead:
+chunks stream into the temp file as they are rendered, and commit() applies the
+same skip / verify / replace rules once the last one is in. Nothing is visible
+at `path` until commit(); discard() drops the temp file.
+
+    out = output_writer.StreamingOutput(path)
+    for row in rows:
+        out.write(render(row))
+    out.commit()                                    # True if the file changed
+"""
+import hashlib
+import os
+import tempfile
+
+STATS = {"written": 0, "unchanged": 0}
+
+
+def _crlf(existing):
+    crlf = existing.count(b"\r\n")
+    return crlf > existing.count(b"\n") - crlf
+
+
+def write_output(path, data, preserve_newlines=False):
+    """Write `data` (str or bytes) to `path` only if the bytes differ.
+
+    Returns True when the file was (re)written, False when it already held
+    exactly these bytes. Raises RuntimeError if the written bytes do not read
+    back identical; the target is left untouched in that case."""
+    existing = None
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            existing = f.read()
+
+    if isinstance(data, str):
+        if preserve_newlines and existing is not None and _crlf(existing):
+            data = data.replace("\n", "\r\n")
+        data = data.encode("utf-8")
+
+    digest = hashlib.sha256(data).digest()
+    if existing is not None and hashlib.sha256(existing).digest() == digest:
+        STATS["unchanged"] += 1
+        return False
+
+    fd, tmp = _mkstemp(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _install(tmp, path, digest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return True
+
+
+def _mkstemp(path):
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    return tempfile.mkstemp(dir=folder, prefix="." + os.path.basename(path) + ".",
+                            suffix=".tmp")
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.digest()
+
+
+def _install(tmp, path, digest):
+    """Verify `tmp` holds exactly `digest`, then move it over `path`."""
+    if _file_digest(tmp) != digest:
+        raise RuntimeError(f"{path} did not read back as written "
+                           "(NULL bytes or a short write) - refusing to replace it")
+    # mkstemp creates 0600; a published page has to stay world-readable.
+    os.chmod(tmp, (os.stat(path).st_mode & 0o777) if os.path.exists(path) else 0o644)
+    os.replace(tmp, path)
+    STATS["written"] += 1
+
+
+class StreamingOutput:
+    """write_output() for a document written a chunk at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self._hash = hashlib.sha256()
+        fd, self._tmp = _mkstemp(path)
+        self._f = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._hash.update(data)
+        self._f.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        """Put the streamed bytes at `path` unless it already holds them.
+        Returns True when the file changed."""
+        try:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            digest = self._hash.digest()
+            if os.path.exists(self.path) and _file_digest(self.path) == digest:
+                os.remove(self._tmp)
+                STATS["unchanged"] += 1
+                return False
+            _install(self._tmp, self.path, digest)
+            return True
+        except BaseException:
+            self.discard()
+            raise
+
+    def discard(self):
+        if not self._f.closed:
+            self._f.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+
+def summary():
+    return "wrote %d, unchanged %d" % (STATS["written"], STATS["unchanged"])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+placeholders.py - hide spans of a document behind tokens, then put them all
+back in one pass.
+
+PLACEHOLDERS_20261019. Two generators stash text a later pass must not touch
+and restore it afterwards: light_theme_transform.transform_html() parks every
+<script> behind \\x00SCRIPT{i}\\x00 so the style-attribute pass cannot reach
+into JS strings, and build_forum_threads.render_content() parks finished
+<img>/<a> markup behind \\x00SLOT{i}\\x00 while it splits paragraphs. (The CSS
+side had a third, \\x01C{i}\\x01 for comments, until css_tree made comments
+opaque tokens.) Both restored with
+
+    for i, s in enumerate(items):
+        doc = doc.replace(f"\\x00TAG{i}\\x00", s)
+
+which walks the whole document once per stashed item and copies it each time
+something matches: quadratic in the page for a page with hundreds of inline
+scripts or a post full of links. Stash.restore() finds every token with one
+regex scan and builds the result once.
+
+It is also stricter than the loop: text it puts back is never scanned again, so
+a restored span that happens to contain a token (a user's post quoting
+\\x00SLOT1\\x00) comes out verbatim instead of being expanded, and a token with
+no stashed item behind it is left as it is.
+
+    stash = Stash("SCRIPT")
+    html = SCRIPT_BLOCK.sub(stash, html)   # a Stash is a re.sub replacement
+    ...
+    html = stash.restore(html)
+
+scripts/bench_placeholders.py times it against the loop.
+"""
+import re
+
+
+class Stash:
+    """Numbered placeholders \\x00<tag><i>\\x00 for one kind of span."""
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.items = []
+        self._token = re.compile("\x00" + re.escape(tag) + r"(\d+)\x00")
+
+    def put(self, text):
+        """Stash `text`; returns the token to leave in its place."""
+        self.items.append(text)
+        return "\x00%s%d\x00" % (self.tag, len(self.items) - 1)
+
+    def __call__(self, m):
+        """re.sub replacement: stash the whole match."""
+        return self.put(m.group(0))
+
+    def restore(self, doc):
+        """`doc` with every token replaced by its text, in a single scan."""
+        if not self.items:
+            return doc
+        items = self.items
+
+        def back(m):
+            i = int(m.group(1))
+            return items[i] if i < len(items) else m.group(0)
+
+        return self._token.sub(back, doc)
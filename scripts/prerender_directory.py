@@ -15,8 +15,24 @@ Add --dry-run to print the eligible set + sample row without writing files.
 
 Idempotent: re-running replaces content between <!--MK:key--> markers, so a
 30-min cron/GitHub Action can call it repeatedly without drift.
+
+Stage budgets (STAGE_BUDGETS_20261019): the run is split into the stages
+collect -> handicappers -> leaderboards -> homepage -> write, each timed with
+its own wall-clock budget in seconds (BUDGETS below). Every page is rendered
+in memory first and nothing is written until the last bake stage has passed,
+so a stage that blows its budget aborts with the last good bake still live -
+the same fail-closed outcome as an empty leaderboard preview. The write stage
+is the exception: by its end the bake is on disk, so running over its budget
+is reported as a warning in the run report, never as an abort. Override with
+    --budget homepage=300 --budget collect=0      (0 = no budget)
+or PRERENDER_BUDGETS="homepage=300,collect=0" in the environment. Each run
+prints a JSON report (per-stage seconds, API requests, bytes in, bytes out);
+--report PATH or PRERENDER_REPORT=PATH also writes it to a file.
 """
-import json, os, sys, re, html, math, time, datetime, urllib.request, urllib.parse
+import argparse, contextlib, hashlib, json, os, shutil, sys, re, html, math, time, datetime, urllib.request, urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from output_writer import StreamingOutput, summary, write_output  # noqa: E402
 
 API  = "https://trustmyrecord-api.onrender.com/api"
 SITE = "https://trustmyrecord.com"
@@ -24,11 +40,62 @@ ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 HANDI = os.path.join(ROOT, "handicappers", "index.html")
 LEAD  = os.path.join(ROOT, "leaderboards", "index.html")
 HOME  = os.path.join(ROOT, "index.html")
+SHARDS = os.path.join(ROOT, "static", "data", "leaderboard")
+HANDI_PAGES = os.path.join(ROOT, "handicappers", "page")
 
 INTERNAL_DENYLIST = {"admin", "test", "tmr", "system", "support", "demo"}
 ADMIN_ALLOWLIST   = {"BetLegend"}
 DEFAULT_AVATAR    = "https://trustmyrecord.com/static/media/TMR-avatar-256.jpg"
 
+# Per-stage wall-clock budgets in seconds. The workflow job has a 10-minute
+# timeout and the Playwright snapshot, verifier, profile and forum steps share
+# it, so this script gets roughly half. collect is one request per member and
+# homepage up to HOME_HL_CANDIDATES + 1, which is where the time goes.
+BUDGETS = {"collect": 240, "handicappers": 30, "leaderboards": 60, "homepage": 150, "write": 30}
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+REPORT = {"status": "running", "stages": {}}
+_STAGE = {"rec": None, "deadline": None}
+
+@contextlib.contextmanager
+def stage(name, fail_closed=True):
+    """Time one stage and count the API traffic made inside it. Raises
+    BudgetExceeded when the stage ran past BUDGETS[name]; with fail_closed
+    False (a stage that has already written) the overrun is only a warning."""
+    budget = BUDGETS.get(name) or None
+    rec = REPORT["stages"][name] = {"seconds": 0.0, "budget": budget, "requests": 0,
+                                     "bytes_in": 0, "bytes_out": 0}
+    t0 = time.monotonic()
+    _STAGE.update(rec=rec, deadline=t0 + budget if budget else None)
+    try:
+        yield rec
+    finally:
+        rec["seconds"] = round(time.monotonic() - t0, 3)
+        _STAGE.update(rec=None, deadline=None)
+    if budget and rec["seconds"] > budget:
+        msg = f"stage '{name}' took {rec['seconds']:.1f}s, budget {budget}s"
+        if fail_closed:
+            raise BudgetExceeded(msg)
+        rec["over_budget"] = True
+        REPORT.setdefault("warnings", []).append(msg)
+        print(f"WARN: {msg} (files already written)")
+
+def parse_budgets(spec):
+    """'homepage=300,collect=0' -> {"homepage": 300.0, "collect": 0.0}"""
+    out = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, secs = part.partition("=")
+        if name not in BUDGETS:
+            raise SystemExit(f"ABORT: unknown stage '{name}' in budget '{part}' "
+                             f"(stages: {', '.join(BUDGETS)})")
+        try:
+            out[name] = float(secs)
+        except ValueError:
+            raise SystemExit(f"ABORT: budget '{part}' is not <stage>=<seconds>")
+    return out
+
 def clean_avatar(url):
     """Never bake giant inline data: URIs into the static HTML (one user's
     avatar is 160KB+). Fall back to the shared default static avatar."""
@@ -41,14 +108,30 @@ def get(url, attempts=3):
     # The Render free tier throws occasional transient 500s; without a retry a
     # single hiccup aborts the whole bake run and the pages stay stale until
     # the next cron tick. Retry briefly before giving up.
+    # Inside a timed stage, a request never starts after the stage's deadline
+    # and never waits past it. Callers that swallow errors (a member's detail
+    # row, a capper's highlight picks) fall back quickly once time is up, and
+    # stage() still aborts the run at its exit check.
     last = None
+    rec, deadline = _STAGE["rec"], _STAGE["deadline"]
     for i in range(attempts):
         if i:
             time.sleep(2 * i)
+        timeout = 45
+        if deadline is not None:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise BudgetExceeded(f"stage budget spent before GET {url}")
+            timeout = min(timeout, left)
         try:
             req = urllib.request.Request(url, headers={"Accept": "application/json"})
-            with urllib.request.urlopen(req, timeout=45) as r:
-                return json.load(r)
+            if rec is not None:
+                rec["requests"] += 1
+            with urllib.request.urlopen(req, timeout=timeout) as r:
+                body = r.read()
+            if rec is not None:
+                rec["bytes_in"] += len(body)
+            return json.loads(body)
         except Exception as err:
             last = err
     raise last
@@ -319,17 +402,96 @@ def handi_tier_header(tier, count):
         f'<p>{e(copy)}</p></div>'
     )
 
+# DIRECTORY_PAGES_20261019: /handicappers/ used to bake every eligible member
+# into one document, which is fine at 35 members and a multi-megabyte first
+# paint at a few thousand. The page itself now carries at most HANDI_FIRST_PAGE
+# rows per tier, each cut-off tier ending in a link to the rest. Everything past
+# those rows goes, in the same grouped order, onto /handicappers/page/N/ (N >= 2,
+# HANDI_PAGE_SIZE rows each): the same document with its rows swapped, its own
+# canonical, and a pager linking every page, so the whole directory stays one
+# crawl hop from the page a crawler already indexes. Overflow pages are
+# streamed to temp files a row at a time and only put in place by the write
+# stage, the same all-or-nothing rule as every other page in this bake. A run
+# that needs fewer pages than the last one removes the extras.
+HANDI_FIRST_PAGE = 60
+HANDI_PAGE_SIZE = 200
+
+def handi_page_url(n):
+    return "/handicappers/" if n == 1 else f"/handicappers/page/{n}/"
+
+def handi_pager(n, last):
+    links = "".join(
+        f'<span aria-current="page">{i}</span>' if i == n else f'<a href="{handi_page_url(i)}">{i}</a>'
+        for i in range(1, last + 1))
+    return f'<nav class="hm-pager" aria-label="Directory pages">{links}</nav>'
+
+def handi_page_head(t, n):
+    """The main page's document, re-pointed at /handicappers/page/n/."""
+    url = SITE + handi_page_url(n)
+    t = t.replace('<link rel="canonical" href="https://trustmyrecord.com/handicappers/">',
+                  f'<link rel="canonical" href="{url}">', 1)
+    t = t.replace('<meta property="og:url" content="https://trustmyrecord.com/handicappers/">',
+                  f'<meta property="og:url" content="{url}">', 1)
+    return re.sub(r"(<title>)(.*?)( \| TrustMyRecord</title>)",
+                  lambda m: f"{m.group(1)}{m.group(2)} - Page {n}{m.group(3)}", t, count=1, flags=re.S)
+
+def stream_handi_pages(t, tiers, now):
+    """Stream the overflow rows onto /handicappers/page/N/. Returns the
+    uncommitted StreamingOutputs, in page order."""
+    overflow = [(tier, r) for tier in TIER_ORDER for r in tiers[tier][HANDI_FIRST_PAGE:]]
+    if not overflow:
+        return []
+    last = 1 + math.ceil(len(overflow) / HANDI_PAGE_SIZE)
+    pre, rest = t.split("<!--MK:hmRows-->", 1)
+    post = rest.split("<!--/MK:hmRows-->", 1)[1]
+    outs = []
+    try:
+        for n in range(2, last + 1):
+            out = StreamingOutput(os.path.join(HANDI_PAGES, str(n), "index.html"))
+            outs.append(out)
+            out.write(handi_page_head(pre, n) + "<!--MK:hmRows-->")
+            shown = None
+            for tier, r in overflow[(n - 2) * HANDI_PAGE_SIZE:(n - 1) * HANDI_PAGE_SIZE]:
+                if tier != shown:
+                    out.write(handi_tier_header(tier, len(tiers[tier])))
+                    shown = tier
+                out.write(handi_row(r, now))
+            out.write(handi_pager(n, last) + "<!--/MK:hmRows-->" + post)
+    except BaseException:
+        for out in outs:
+            out.discard()
+        raise
+    return outs
+
+def prune_handi_pages(last):
+    """Remove /handicappers/page/N/ for every N past the last page baked."""
+    if not os.path.isdir(HANDI_PAGES):
+        return
+    for name in os.listdir(HANDI_PAGES):
+        if name.isdigit() and int(name) > last:
+            shutil.rmtree(os.path.join(HANDI_PAGES, name))
+
 def bake_handicappers(rows, now):
     with open(HANDI, encoding="utf-8") as f:
         t = f.read()
-    # Default static view = grouped "All Pick Makers": tier header + its rows.
-    body_parts = []
+    # Default static view = grouped "All Pick Makers": tier header + its rows,
+    # bucketed in one pass so each tier keeps the collect() ranking.
+    tiers = {tier: [] for tier in TIER_ORDER}
+    for r in rows:
+        tiers[tier_of(r)].append(r)
+    body_parts, seen = [], 0
     for tier in TIER_ORDER:
-        group = [r for r in rows if tier_of(r) == tier]
+        group = tiers[tier]
         if not group:
             continue
         body_parts.append(handi_tier_header(tier, len(group)))
-        body_parts.extend(handi_row(r, now) for r in group)
+        body_parts.extend(handi_row(r, now) for r in group[:HANDI_FIRST_PAGE])
+        if len(group) > HANDI_FIRST_PAGE:
+            page = 2 + seen // HANDI_PAGE_SIZE
+            body_parts.append(
+                f'<a class="hm-more" href="{handi_page_url(page)}">'
+                f'See all {len(group)} {e(TIER_META[tier][0])}</a>')
+            seen += len(group) - HANDI_FIRST_PAGE
     body = "".join(body_parts)
     # Static default view is grouped, so mark #hmRows to suppress global rank/medal
     # chips (the client JS toggles this class too). Idempotent.
@@ -351,12 +513,11 @@ def bake_handicappers(rows, now):
             rf'(<strong id="{hid}")[^>]*(>).*?(</strong>)',
             '\\1 class="hm-stat-loading" aria-busy="true"\\2…\\3',
             t, count=1, flags=re.S)
-    with open(HANDI, "w", encoding="utf-8", newline="\n") as f:
-        f.write(t)
-    return len(rows), total_graded, active_week
+    return t, len(rows), total_graded, active_week, stream_handi_pages(t, tiers, now)
 
 def collect_leaderboard_view():
-    """The EXACT row set the /leaderboards/ page renders after hydration.
+    """The EXACT row set the /leaderboards/ page renders after hydration, plus
+    the 5-pick sample the page's sort views are cut from (see shard_files).
     Previously this page baked all `collect()` members (every verified user
     with >0 picks), so the crawler/first paint showed ~35 rows that visibly
     collapsed to the qualified handful when loadHandicappers() applied the
@@ -366,7 +527,7 @@ def collect_leaderboard_view():
     d = get(f"{API}/users/leaderboard?sortBy=net_units&limit=100")
     entries = d.get("leaderboard", []) if isinstance(d, dict) else []
     total_eligible = d.get("total_eligible_handicappers") if isinstance(d, dict) else None
-    rows = []
+    rows, sample = [], []
     for u in entries:
         r = {
             "username": u.get("username") or "",
@@ -382,6 +543,8 @@ def collect_leaderboard_view():
             "current_streak": int(num(u.get("current_streak"))),
             "last_pick_at": u.get("last_pick_at") or "",
         }
+        if r["username"] and r["total_picks"] >= 5:
+            sample.append(r)
         # loadHandicappers() visibility rule + default sampleFilter ('5')
         if r["username"] and r["total_picks"] >= 5 and r["net_units"] > 0:
             rows.append(r)
@@ -390,12 +553,72 @@ def collect_leaderboard_view():
         total_eligible = int(total_eligible)
     except (TypeError, ValueError):
         total_eligible = None
-    return rows, total_eligible
+    return rows, total_eligible, sample
+
+# ---------- static leaderboard shards ----------
+# LEADERBOARD_SHARDS_20261019: /users/leaderboard is the heaviest read on the
+# 512MB Render API - this script calls it twice per bake and every /leaderboards/
+# visit calls it again on hydrate. Each bake also publishes the default views as
+# static JSON under static/data/leaderboard/, one file per sortFilter option the
+# page offers for a 5-pick sample, named by content hash so the CDN (which
+# caches by path and ignores ?v=) can never serve a stale one. The hashed names
+# are baked into leaderboards/index.html as <script id="lbShards"> so a reader
+# finds the current set from the page it already has, with no unhashed pointer
+# file for the CDN to cache.
+#
+# Shards carry the API's own field names (the shape normalizeEntry() reads) and
+# no timestamp, so an unchanged board keeps its URL across bakes.
+SHARD_SORTS = {   # sortFilter value -> key; mirrors applyHandicapperFilters()
+    "units": lambda r: r["net_units"],
+    "roi": lambda r: r["roi"],
+    "winRate": lambda r: (r["win_rate"] if r["win_rate"]
+                          else 100.0 * r["wins"] / max(r["wins"] + r["losses"], 1)),
+}
+SHARD_FIELDS = ("username", "display_name", "avatar_url", "wins", "losses", "pushes",
+                "total_picks", "net_units", "roi", "win_rate", "current_streak")
+
+def shard_files(sample, total_eligible):
+    """[(path, bytes)] for every sort view, and {sort: public URL}."""
+    files, urls = [], {}
+    for sort, key in SHARD_SORTS.items():
+        ranked = sorted(sample, key=key, reverse=True)   # stable, like Array.sort
+        body = json.dumps({
+            "sort": sort,
+            "min_picks": 5,
+            "total_eligible_handicappers": total_eligible,
+            "leaderboard": [{k: r[k] for k in SHARD_FIELDS} for r in ranked],
+        }, separators=(",", ":"), sort_keys=True).encode("utf-8")
+        name = f"{sort}.{hashlib.sha256(body).hexdigest()[:12]}.json"
+        files.append((os.path.join(SHARDS, name), body))
+        urls[sort] = f"/static/data/leaderboard/{name}"
+    return files, urls
+
+def prune_shards(keep):
+    """Drop shards that neither this bake nor the previous one references. The
+    previous set stays one cycle: a /leaderboards/ page cached before this bake
+    still names it."""
+    if not os.path.isdir(SHARDS):
+        return 0
+    keep = {os.path.basename(u) for u in keep}
+    gone = 0
+    for name in os.listdir(SHARDS):
+        if name.endswith(".json") and name not in keep:
+            os.remove(os.path.join(SHARDS, name))
+            gone += 1
+    return gone
 
 def bake_leaderboards():
-    rows, total_eligible = collect_leaderboard_view()
+    rows, total_eligible, sample = collect_leaderboard_view()
     with open(LEAD, encoding="utf-8") as f:
         t = f.read()
+    prev = re.search(r'<script type="application/json" id="lbShards">(.*?)</script>', t, re.S)
+    prev_urls = list(json.loads(prev.group(1)).values()) if prev else []
+    shards, urls = shard_files(sample, total_eligible)
+    t = set_marker(
+        t, "lbShards",
+        f'<script type="application/json" id="lbShards">{json.dumps(urls, sort_keys=True)}</script>',
+        r'(</head>)', '@@BLOCK@@\n\\g<1>',
+    )
     body = "".join(lead_row(r, i) for i, r in enumerate(rows))
     t = set_marker(
         t, "lbBody", body,
@@ -425,9 +648,7 @@ def bake_leaderboards():
                    r'\g<1>…\g<2>', t, count=1, flags=re.S)
     for qs_id in ("qsTrivia", "qsPolls", "qsOnline"):
         t = re.sub(rf'(<b id="{qs_id}">).*?(</b>)', r'\g<1>…\g<2>', t, count=1, flags=re.S)
-    with open(LEAD, "w", encoding="utf-8", newline="\n") as f:
-        f.write(t)
-    return len(rows)
+    return t, len(rows), shards, list(urls.values()) + prev_urls
 
 # ---------- homepage "Verified leaderboard preview" ----------
 # Uses the SAME production source + eligibility as the full /leaderboards/ page:
@@ -718,7 +939,7 @@ def bake_homepage(rows, now):
     if '<p class="tmrhx-updated">' not in t and "<!--MK:homeLbPreview-->" not in t:
         print("homepage: v2 layout detected (no tmrhx anchors) - "
               "live regions are baked by scripts/prerender_home_snapshot.cjs, skipping here")
-        return 0
+        return None, 0
     lb = collect_home_leaderboard()  # raises (fail-closed) on API error / empty set
     new_preview = home_preview_rows(lb)
     new_hl = home_highlights(rows, now)
@@ -746,29 +967,95 @@ def bake_homepage(rows, now):
                    r'(<p class="tmrhx-updated">)(</p>)', r'\g<1>@@BLOCK@@\g<2>')
     t = set_marker(t, "homeHighlights", new_hl,
                    r'(<ul class="tmrhx-hl">)(<li>)', r'\g<1>@@BLOCK@@')   # unused fallback
-    with open(HOME, "w", encoding="utf-8", newline="\n") as f:
-        f.write(t)
-    return len(lb[:5])
+    return t, len(lb[:5])
+
+def emit_report(path):
+    out = json.dumps(REPORT, sort_keys=True)
+    print(f"run report: {out}")
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(REPORT, indent=2, sort_keys=True) + "\n")
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--budget", action="append", default=[], metavar="STAGE=SECONDS")
+    ap.add_argument("--report", default=os.environ.get("PRERENDER_REPORT"))
+    args = ap.parse_args()
+    BUDGETS.update(parse_budgets(os.environ.get("PRERENDER_BUDGETS")))
+    BUDGETS.update(parse_budgets(",".join(args.budget)))
+
+    started = time.monotonic()
+    REPORT["started_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    try:
+        run(args)
+        REPORT["status"] = "ok"
+    except BudgetExceeded as err:
+        REPORT["status"] = "aborted"
+        REPORT["error"] = str(err)
+        raise SystemExit(f"ABORT: {err} - nothing written, last good bake stays live")
+    except BaseException as err:
+        REPORT["status"] = "failed"
+        REPORT["error"] = f"{type(err).__name__}: {err}"
+        raise
+    finally:
+        REPORT["seconds"] = round(time.monotonic() - started, 3)
+        emit_report(args.report)
+
+def run(args):
     now = datetime.datetime.now(datetime.timezone.utc)
-    rows = collect()
+    with stage("collect"):
+        rows = collect()
     if not rows:
         print("no eligible members - aborting (will not blank pages)")
         sys.exit(1)
-    if "--dry-run" in sys.argv:
+    if args.dry_run:
         print(f"eligible members: {len(rows)}")
         for r in rows[:8]:
             print(f"  {r['username']:>20}  {rec(r):>9}  {units_u(r['net_units']):>9}  ROI {r['roi']:.2f}%  {r['total_picks']} picks  streak {streak(r['current_streak'])}")
         print("\nSAMPLE handicappers row:\n", handi_row(rows[0], now)[:400])
         print("\nSAMPLE leaderboard row:\n", lead_row(rows[0], 0)[:400])
         return
-    n1, tp, act = bake_handicappers(rows, now)
-    n2 = bake_leaderboards()
-    n3 = bake_homepage(rows, now)
-    print(f"handicappers: baked {n1} rows, {tp} total picks, {act} active")
-    print(f"leaderboards: baked {n2} rows")
+    # Render all three pages before writing any of them: a stage that fails or
+    # runs over budget must not leave /handicappers/ freshly baked next to a
+    # stale /leaderboards/.
+    pages, streams = [], []
+    try:
+        with stage("handicappers") as st:
+            t, n1, tp, act, streams = bake_handicappers(rows, now)
+            pages.append((HANDI, t))
+            st["bytes_out"] = len(t.encode("utf-8")) + sum(s.size for s in streams)
+        with stage("leaderboards") as st:
+            t, n2, shards, keep = bake_leaderboards()
+            # Shards go first: the page that names them must never land before them.
+            pages.extend(shards)
+            pages.append((LEAD, t))
+            st["bytes_out"] = len(t.encode("utf-8")) + sum(len(b) for _, b in shards)
+        with stage("homepage") as st:
+            t, n3 = bake_homepage(rows, now)
+            if t is not None:
+                pages.append((HOME, t))
+                st["bytes_out"] = len(t.encode("utf-8"))
+        # The write stage commits as it goes, so an overrun here cannot
+        # leave the last good bake live: warn instead of aborting.
+        with stage("write", fail_closed=False) as st:
+            # Overflow pages land before /handicappers/ links to them.
+            for s in streams:
+                if s.commit():
+                    st["bytes_out"] += s.size
+            prune_handi_pages(1 + len(streams))
+            for path, t in pages:
+                if write_output(path, t):
+                    st["bytes_out"] += len(t if isinstance(t, bytes) else t.encode("utf-8"))
+            pruned = prune_shards(keep)
+    finally:
+        for s in streams:   # temp files of a run that never reached commit()
+            s.discard()
+    print(f"handicappers: baked {n1} rows, {tp} total picks, {act} active, "
+          f"{len(streams)} overflow pages")
+    print(f"leaderboards: baked {n2} rows, {len(shards)} JSON shards ({pruned} stale removed)")
     print(f"homepage: baked {n3} preview rows + highlights")
+    print(f"files: {summary()}")
 
 if __name__ == "__main__":
     main()
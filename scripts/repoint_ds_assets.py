@@ -18,10 +18,15 @@ still be referenced the old way somewhere, as `<name>.js?v=<stamp>`. Those refs
 collapsed onto the hashed filename too -- in HTML and in the JS loaders that build
 script URLs at runtime -- so one asset never ships under two different URLs.
 """
+import hashlib
 import json
 import os
 import pathlib
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_hash import HASHES  # noqa: E402
 
 ROOT = pathlib.Path(__file__).resolve().parent.parent
 MANIFEST = json.loads((ROOT / "static" / "ds-assets.json").read_text(encoding="utf-8"))
@@ -35,18 +40,110 @@ QUERY_REPOINT = {"tmr-profile-hydrate.js"}
 # Files that build script URLs in JavaScript rather than in markup.
 JS_LOADERS = ("static/js/tmr-ds-nav.js", "static/js/tmr-sitewide.js")
 
-RULES = []
-for src, url in MANIFEST.items():
-    p = pathlib.Path(src)
-    stem, ext = p.stem, p.suffix
-    sub = "css" if ext == ".css" else "js"
-    # any previous hash for this asset
-    RULES.append((re.compile(
-        rf"/static/{sub}/{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}".encode()), url.encode()))
-    if p.name in QUERY_REPOINT:
-        # the unhashed name, with or without a ?v= stamp
-        RULES.append((re.compile(
-            rf"/static/{sub}/{re.escape(stem)}{re.escape(ext)}(\?v=[A-Za-z0-9._-]+)?".encode()), url.encode()))
+
+def rules(manifest):
+    """(pattern, source, url) for every manifest entry: any previous hash of the
+    asset, plus the unhashed name for QUERY_REPOINT sources."""
+    out = []
+    for src, url in manifest.items():
+        p = pathlib.Path(src)
+        stem, ext = p.stem, p.suffix
+        sub = "css" if ext == ".css" else "js"
+        # any previous hash for this asset
+        out.append((re.compile(
+            rf"/static/{sub}/{re.escape(stem)}\.[0-9a-f]{{12}}{re.escape(ext)}".encode()), src, url.encode()))
+        if p.name in QUERY_REPOINT:
+            # the unhashed name, with or without a ?v= stamp
+            out.append((re.compile(
+                rf"/static/{sub}/{re.escape(stem)}{re.escape(ext)}(?:\?v=[A-Za-z0-9._-]+)?".encode()), src, url.encode()))
+    return out
+
+
+# Any /static/ asset URL: <dir>, <stem>, an optional .<hash>, <ext>, an optional
+# ?v= stamp. The stem is lazy so a hash segment is split off rather than eaten.
+ASSET_URL = re.compile(
+    rb"/static/(css|js)/([A-Za-z0-9._-]+?)(\.[0-9a-f]{12})?\.(css|js)(\?v=[A-Za-z0-9._-]+)?")
+
+
+class Table:
+    """The rules as ONE scan: ASSET_URL finds every asset URL, and a dispatch
+    table keyed on (dir, stem, ext, hashed?) says which manifest entry, if
+    any, it belongs to.
+
+    ONE_SCAN_20261019. repoint() used to run each rule as its own pat.sub over
+    the whole file: rules x bytes per page, and the rule list grows by one or
+    two with every asset promoted into the manifest. Compiling the rules into a
+    single alternation is no cure - re cannot prefix-search a many-branch
+    alternation, so it tries every branch at every byte and runs ~25x slower
+    than the loop. One pattern with a literal "/static/" prefix and a dict
+    lookup per match keeps the scan at one pass whatever the rule count.
+
+    Same result as rules(): a hashed URL maps to its entry and keeps any ?v=
+    after it (the hashed pattern never matched one); an unhashed URL maps only
+    for QUERY_REPOINT sources and takes its ?v= with it. A match never spans
+    a "/", so skipping one that maps to nothing cannot hide another. Manifest
+    stems contain no ".css"/".js", which the lazy stem relies on."""
+
+    def __init__(self, manifest):
+        self.dispatch = {}
+        for src, url in manifest.items():
+            p = pathlib.Path(src)
+            stem, ext = p.stem.encode(), p.suffix[1:].encode()
+            sub = b"css" if ext == b"css" else b"js"
+            self.dispatch[(sub, stem, ext, True)] = (src, url.encode())
+            if p.name in QUERY_REPOINT:
+                self.dispatch[(sub, stem, ext, False)] = (src, url.encode())
+
+    def version(self, urls=True):
+        """Key for anything derived from a page's bytes through this table:
+        ASSET_URL plus every dispatch entry. With urls=False the entries'
+        target URLs are left out, for answers (like finditer's) that depend
+        only on WHICH assets are hashed."""
+        rows = sorted(b"%s/%s.%s %d %s" % (sub, stem, ext, hashed, url if urls else b"")
+                      for (sub, stem, ext, hashed), (_, url) in self.dispatch.items())
+        return hashlib.sha256(b"\n".join([ASSET_URL.pattern] + rows)).hexdigest()[:16]
+
+    def _entry(self, m):
+        return self.dispatch.get((m.group(1), m.group(2), m.group(4), m.group(3) is not None))
+
+    def finditer(self, data):
+        """(source, the bytes a repoint replaces) for every reference in `data`."""
+        for m in ASSET_URL.finditer(data):
+            entry = self._entry(m)
+            if entry is not None:
+                end = m.start(5) if m.group(3) is not None and m.group(5) else m.end()
+                yield entry[0], data[m.start():end]
+
+    def sub(self, data, urls=None):
+        """`data` with every reference repointed: at the manifest url, or, given
+        `urls` {source: url}, at that url, leaving sources not in it alone."""
+        def to(m):
+            entry = self._entry(m)
+            if entry is None:
+                return m.group(0)
+            src, url = entry
+            if urls is not None:
+                if src not in urls:
+                    return m.group(0)
+                url = urls[src].encode()
+            if m.group(3) is not None and m.group(5):
+                return url + m.group(5)
+            return url
+        return ASSET_URL.sub(to, data)
+
+
+RULES = rules(MANIFEST)
+TABLE = Table(MANIFEST)
+
+# Whether a page needs repointing depends only on its bytes and TABLE, so the
+# answer is kept in the asset hash cache under a key derived from TABLE: a run
+# after a manifest change re-reads every page, a run with nothing new re-reads
+# only the pages edited since.
+RULES_VERSION = TABLE.version()
+
+
+def repoint(raw, table=TABLE):
+    return table.sub(raw)
 
 
 def targets():
@@ -70,14 +167,15 @@ def targets():
 def main():
     changed = []
     for page in targets():
-        raw = page.read_bytes()
-        new = raw
-        for pat, url in RULES:
-            new = pat.sub(url, new)
+        if not HASHES.memo(page, "repoint", RULES_VERSION, lambda raw: repoint(raw) != raw):
+            continue
+        raw = HASHES.read(page)
+        new = repoint(raw)
         if new != raw:
             page.write_bytes(new)
             changed.append(str(page.relative_to(ROOT)).replace("\\", "/"))
 
+    HASHES.save()
     for c in changed:
         print("repointed " + c)
     print(f"{len(changed)} file(s) updated")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+sitemap_sections.py - the one reader/writer of sitemap.xml.
+
+SITEMAP_MODEL_20261019. Three generators own a block of the sitemap each:
+
+    build_matchup_articles.py   <!-- BEGIN_MATCHUP_URLS -->
+    build_profile_pages.py      <!-- BEGIN_PROFILE_URLS -->
+    build_forum_threads.py      <!-- BEGIN_THREAD_URLS -->, <!-- BEGIN_FORUM_CAT_URLS -->
+
+Each of them used to regex-strip its own block out of the raw XML and append a
+fresh one before </urlset>. Whichever generator ran last therefore moved its
+block to the bottom, so the block ORDER changed from one cron tick to the next
+and every tick produced a diff even when not a single URL had changed. The
+forum builder also rewrote the whole file twice per run, once per block.
+
+This module parses sitemap.xml into named sections once, lets a generator
+replace its section by key, and emits the whole file again in a fixed order:
+
+    CORE        the hand-maintained URLs above the first marker block. Never
+                touched by a generator; round-trips exactly as written.
+    MATCHUP, PROFILE, THREAD, FORUM_CAT
+                in that order, then any other key in the order it first
+                appeared.
+
+Same sections in, same bytes out. The markers stay in the file, so a human
+reading sitemap.xml still sees which generator owns which URLs.
+
+SPLITTING. The sitemap protocol caps one file at 50,000 URLs and 50MB
+uncompressed. Past either limit, sitemap.xml becomes a <sitemapindex> and each
+section is written to its own child file (sitemap-<section>.xml, chunked if a
+single section is itself over the limit). Loading reads an index back into the
+same sections, so no generator has to know which shape is on disk. Child files
+that a later save no longer needs are removed, because an index entry is the
+only thing that makes a child reachable and a stale shard is just clutter.
+
+Usage, from a generator:
+
+    sm = sitemap_sections.Sitemap()
+    if not sm.exists:
+        print("sitemap.xml not found, skipping"); return
+    sm.set_section("PROFILE", [sitemap_sections.entry(url, lastmod, "daily", "0.6")])
+    sm.save()
+
+`loc` is written verbatim. Every generator here builds its URLs from slugs and
+usernames that are already XML-safe, and the parsed CORE entries are already
+escaped text, so escaping again would double-encode them.
+"""
+import os
+import re
+
+from output_writer import write_output
+
+SITE = "https://trustmyrecord.com"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITEMAP = os.path.join(ROOT, "sitemap.xml")
+
+MAX_URLS = 50000
+MAX_BYTES = 50 * 1024 * 1024
+
+CORE = "CORE"
+ORDER = (CORE, "MATCHUP", "PROFILE", "THREAD", "FORUM_CAT")
+
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+FIELDS = ("loc", "lastmod", "changefreq", "priority")
+
+_TOKEN = re.compile(r"<!-- (BEGIN|END)_([A-Z0-9_]+)_URLS -->|<url>(.*?)</url>", re.S)
+_FIELD = re.compile(r"<(loc|lastmod|changefreq|priority)>\s*(.*?)\s*</\1>", re.S)
+_CHILD = re.compile(r"<sitemap>\s*<loc>\s*([^<]+?)\s*</loc>", re.S)
+
+
+def entry(loc, lastmod="", changefreq="", priority=""):
+    """One <url>. A plain tuple, in FIELDS order; an empty field is omitted."""
+    return (loc, (lastmod or "")[:10], changefreq or "", priority or "")
+
+
+def url_xml(e):
+    return "  <url>%s</url>" % "".join(
+        "<%s>%s</%s>" % (name, value, name) for name, value in zip(FIELDS, e) if value)
+
+
+def _child_name(key, part):
+    name = "sitemap-%s" % key.lower().replace("_", "-")
+    return name + ("-%d.xml" % part if part > 1 else ".xml")
+
+
+class Sitemap:
+    """sitemap.xml as an ordered mapping of section key -> [entry, ...]."""
+
+    def __init__(self, path=SITEMAP):
+        self.path = path
+        self.sections = {}
+        self.children = []          # child files the loaded index pointed at
+        self.exists = os.path.exists(path)
+        if self.exists:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            if "<sitemapindex" in text:
+                for loc in _CHILD.findall(text):
+                    child = self._local(loc)
+                    self.children.append(child)
+                    if os.path.exists(child):
+                        with open(child, encoding="utf-8") as f:
+                            self._parse(f.read())
+            else:
+                self._parse(text)
+
+    def _local(self, loc):
+        """A child's public URL -> its file next to sitemap.xml."""
+        return os.path.join(os.path.dirname(self.path), loc.rsplit("/", 1)[-1])
+
+    def _parse(self, text):
+        current = CORE
+        for m in _TOKEN.finditer(text):
+            if m.group(1) == "BEGIN":
+                current = m.group(2)
+                self.sections.setdefault(current, [])
+            elif m.group(1) == "END":
+                current = CORE
+            else:
+                fields = dict(_FIELD.findall(m.group(3)))
+                if fields.get("loc"):
+                    self.sections.setdefault(current, []).append(
+                        tuple(fields.get(name, "") for name in FIELDS))
+
+    # ------------------------------------------------------------- editing
+
+    def set_section(self, key, entries):
+        """Replace one generator's block. Position is decided by ORDER, never by
+        which generator happened to run last."""
+        if key == CORE:
+            raise ValueError("the CORE section is hand-maintained; no generator writes it")
+        self.sections[key] = list(entries)
+
+    def keys(self):
+        known = [k for k in ORDER if k in self.sections]
+        return known + [k for k in self.sections if k not in ORDER]
+
+    def count(self):
+        return sum(len(v) for v in self.sections.values())
+
+    # ------------------------------------------------------------- output
+
+    def _urlset(self, keys):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+                 '<urlset xmlns="%s">' % XMLNS]
+        for key in keys:
+            if key != CORE:
+                lines.append("  <!-- BEGIN_%s_URLS -->" % key)
+            lines.extend(url_xml(e) for e in self.sections[key])
+            if key != CORE:
+                lines.append("  <!-- END_%s_URLS -->" % key)
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def files(self):
+        """Every file this sitemap needs, as [(path, text)], in write order.
+
+        Children first and the index last, so a reader never sees an index
+        that names a child which is not on disk yet."""
+        single = self._urlset(self.keys())
+        if self.count() <= MAX_URLS and len(single.encode("utf-8")) <= MAX_BYTES:
+            return [(self.path, single)]
+
+        out, index = [], []
+        base = os.path.dirname(self.path)
+        for key in self.keys():
+            chunks, chunk, size = [], [], 0
+            for e in self.sections[key]:
+                line = len(url_xml(e).encode("utf-8")) + 1
+                # Headroom for the XML prolog and the markers.
+                if chunk and (len(chunk) >= MAX_URLS or size + line > MAX_BYTES - 4096):
+                    chunks.append(chunk)
+                    chunk, size = [], 0
+                chunk.append(e)
+                size += line
+            chunks.append(chunk)
+            for part, rows in enumerate(chunks, 1):
+                name = _child_name(key, part)
+                shard = Sitemap.__new__(Sitemap)
+                shard.sections = {key: rows}
+                out.append((os.path.join(base, name), shard._urlset([key])))
+                lastmod = max((e[1] for e in rows if e[1]), default="")
+                index.append("  <sitemap><loc>%s/%s</loc>%s</sitemap>" % (
+                    SITE, name, "<lastmod>%s</lastmod>" % lastmod if lastmod else ""))
+        out.append((self.path, "\n".join(
+            ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<sitemapindex xmlns="%s">' % XMLNS] + index + ["</sitemapindex>"]) + "\n"))
+        return out
+
+    def save(self, writer=write_output):
+        """Write every file, then drop child shards the new layout no longer
+        names. `writer(path, text)` lets a generator keep its own write rules
+        (build_matchup_articles.write preserves line endings); the default
+        skips a file whose bytes did not change. Returns the paths."""
+        files = self.files()
+        for path, text in files:
+            writer(path, text)
+        written = {os.path.abspath(p) for p, _ in files}
+        for child in self.children:
+            if os.path.abspath(child) not in written and os.path.exists(child):
+                os.remove(child)
+        return [p for p, _ in files]
@@ -18,6 +18,13 @@ content-hashed immutable files (name contains a 12-hex segment) as both
 targets (their filename already versions them) and sources (they are frozen
 deploy snapshots), plus .git/node_modules/workers/artifacts.
 
+One walk and at most one read per file: the references between sources form a graph,
+rewritten leaves first, so a loader script is stamped after everything it loads
+and the HTML after the loaders. A reference cycle between assets cannot have
+stable tags; its internal refs are left as they are and the cycle is reported.
+Digests and each file's references are remembered in the asset hash cache
+(scripts/asset_hash.py), so a run with nothing edited is a stat sweep.
+
 Byte-level rewriting: only the matched reference substring changes, so CRLF/LF
 line endings and everything else are preserved verbatim.
 
@@ -30,10 +37,17 @@ import os
 import re
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from asset_hash import HASHES  # noqa: E402
+from output_writer import write_output  # noqa: E402
+
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SKIP_DIRS = {".git", "node_modules", "workers", "artifacts", ".github"}
 HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.(?:js|css)$")
 REF = re.compile(rb"(/static/(?:js|css)/[A-Za-z0-9._-]+\.(?:js|css))(\?v=[A-Za-z0-9]*)?")
+# Keys the references remembered per file in the hash cache: editing REF or
+# found() must invalidate them.
+REF_VERSION = "1:" + REF.pattern.decode()
 
 def is_hashed(path_str):
     return bool(HASHED_NAME.search(path_str))
@@ -52,64 +66,146 @@ def sources():
                 out.append(rel)
     return out
 
+def found(rel, data):
+    """[target rel, its ?v= query or ""] for every reference in `data` that
+    could be pinned: hashed names and self-references excluded."""
+    out = []
+    for m in REF.finditer(data):
+        target = m.group(1).decode()
+        if is_hashed(target) or target.lstrip("/") == rel:
+            continue
+        out.append([target.lstrip("/"), (m.group(2) or b"").decode()])
+    return out
+
+
+def scan(rels):
+    """The references of every source, and the graph {rel: set of target
+    rels} with missing targets left out. A source unchanged since the last run
+    is not even opened: its references come from the hash cache."""
+    known = set(rels)
+    found_in, refs, missing = {}, {}, set()
+    for rel in rels:
+        found_in[rel] = HASHES.memo(rel, "static-refs", REF_VERSION,
+                                    lambda data, rel=rel: found(rel, data))
+    for rel, pairs in found_in.items():
+        out = set()
+        for target_rel, _ in pairs:
+            if target_rel not in known and not os.path.isfile(os.path.join(ROOT, target_rel)):
+                missing.add(target_rel)
+                continue
+            out.add(target_rel)
+        refs[rel] = out
+    return found_in, refs, missing
+
+
+def components(refs):
+    """Strongly connected components of the graph, leaves first (Tarjan,
+    iterative: a loader chain is shallow today but nothing bounds it)."""
+    index, low, on_stack, stack, out = {}, {}, set(), [], []
+    for root in refs:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(refs.get(root, ()))))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, edges = work[-1]
+            for nxt in edges:
+                if nxt not in index:
+                    index[nxt] = low[nxt] = len(index)
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(sorted(refs.get(nxt, ())))))
+                    break
+                if nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    comp = []
+                    while True:
+                        n = stack.pop()
+                        on_stack.discard(n)
+                        comp.append(n)
+                        if n == node:
+                            break
+                    out.append(sorted(comp))
+    return out
+
+
 def run(check_only):
-    changed, missing = [], set()
-    # Loader JS files reference other assets, so rewriting their internals
-    # changes their own hash; iterate to a fixpoint (leaf tags stabilize
-    # first, then the loaders, then the HTML - a few passes at most).
-    for _ in range(6):
-        wrote = False
-        tag_cache = {}
-        def tag_for(rel):
-            if rel not in tag_cache:
-                p = os.path.join(ROOT, rel)
-                if not os.path.isfile(p):
-                    tag_cache[rel] = None
-                else:
-                    with open(p, "rb") as f:
-                        tag_cache[rel] = hashlib.sha256(f.read()).hexdigest()[:12]
-            return tag_cache[rel]
-
-        for rel in sources():
-            p = os.path.join(ROOT, rel)
-            with open(p, "rb") as f:
-                raw = f.read()
-            def sub(m, self_rel=rel):
+    # STATIC_REF_GRAPH_20261019. Loader JS files reference other assets, so
+    # rewriting their internals changes their own hash. This used to re-walk
+    # the tree and re-read every source up to six times until nothing moved.
+    # Instead: one walk, at most one read per file (none for a file the hash
+    # cache has seen unchanged), and the reference graph between them.
+    # Components come out leaves first, so by the time a file is rewritten
+    # every asset it references already has its final bytes and tag - each
+    # file is hashed once and written once.
+    #
+    # A reference cycle (a.js loads b.js loads a.js) has no stable tags: each
+    # rewrite changes the other's hash. Refs between members of a cycle are
+    # left as they are, the same rule as a self-reference, and reported; refs
+    # from the cycle to anything else, and into it from outside, still pin.
+    found_in, refs, missing = scan(sources())
+    final, tags, cycles, changed = {}, {}, [], []
+
+    def tag_for(rel):
+        if rel not in tags:
+            if rel in final:
+                tags[rel] = hashlib.sha256(final[rel]).hexdigest()[:12]
+            else:
+                tags[rel] = HASHES.tag(rel)
+        return tags[rel]
+
+    for comp in components(refs):
+        inside = set(comp) if len(comp) > 1 else set()
+        if inside:
+            cycles.append(comp)
+        for rel in comp:
+            if rel not in found_in:
+                continue                               # target that is not a source
+            want = {t: "?v=" + tag_for(t) for t in refs[rel] if t not in inside}
+            if all(q == want[t] for t, q in found_in[rel] if t in want):
+                continue                               # already current: not read
+            def sub(m, pin=want):
                 target = m.group(1).decode()          # "/static/js/foo.js"
-                if is_hashed(target):
-                    return m.group(0)                  # immutable by filename
-                target_rel = target.lstrip("/")
-                if target_rel == self_rel.replace("\\", "/"):
-                    return m.group(0)                  # self-reference: unstable
-                h = tag_for(target_rel)
-                if h is None:
-                    missing.add(target_rel)
-                    return m.group(0)                  # dead ref: leave visible
-                return (target + "?v=" + h).encode()
-            new = REF.sub(sub, raw)
-            if new != raw:
-                wrote = True
-                changed.append(rel)
-                if not check_only:
-                    with open(p, "wb") as f:
-                        f.write(new)
-                    with open(p, "rb") as f:
-                        if f.read() != new:
-                            sys.exit("WRITE VERIFY FAILED: " + rel)
-        if not wrote or check_only:
-            break
+                q = pin.get(target.lstrip("/"))
+                if q is None:
+                    return m.group(0)                  # hashed, self, dead, or cyclic
+                return (target + q).encode()
+            final[rel] = REF.sub(sub, HASHES.read(rel))
+            changed.append(rel)
+
+    changed.sort()
+    if not check_only:
+        for rel in changed:
+            # Atomic replace, verified against the new bytes' hash before it
+            # lands (the C: NULL-byte hazard).
+            try:
+                write_output(os.path.join(ROOT, rel), final[rel])
+            except RuntimeError as err:
+                sys.exit("WRITE VERIFY FAILED: %s (%s)" % (rel, err))
+    HASHES.save()
 
     for m in sorted(missing):
         print("WARN: referenced file missing on disk, ref left as-is: " + m)
-    uniq = sorted(set(changed))
+    for comp in cycles:
+        print("WARN: reference cycle, refs between these left as-is: " + ", ".join(comp))
+    print(HASHES.stats())
     if check_only:
-        if uniq:
-            print("STALE refs in %d files - run: python scripts/version_static_refs.py" % len(uniq))
+        if changed:
+            print("STALE refs in %d files - run: python scripts/version_static_refs.py"
+                  % len(changed))
             sys.exit(1)
         print("all static refs are content-current")
     else:
-        print("rewrote refs in %d files" % len(uniq))
-        for u in uniq:
+        print("rewrote refs in %d files" % len(changed))
+        for u in changed:
             print("  " + u)
 
 if __name__ == "__main__":
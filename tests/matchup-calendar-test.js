@@ -114,7 +114,10 @@ const tmp = fs.mkdtempSync(path.join(os.tmpdir(), 'tmr-calendar-'));
 for (const rel of ['matchups', 'matchups/mlb', 'matchup-of-the-day', 'scripts']) {
   fs.mkdirSync(path.join(tmp, rel), { recursive: true });
 }
+// The generator's sibling imports (sitemap_sections, output_writer) come along
+// with it, or the bake dies on ModuleNotFoundError inside the temp tree.
 for (const rel of ['scripts/build_matchup_articles.py', 'scripts/build_matchup_graphics.py',
+                   'scripts/sitemap_sections.py', 'scripts/output_writer.py',
                    'matchups/index.html', 'matchups/mlb/index.html',
                    'matchup-of-the-day/index.html']) {
   fs.copyFileSync(path.join(ROOT, rel), path.join(tmp, rel));
@@ -51,6 +51,10 @@ fs.copyFileSync(path.join(ROOT, 'scripts', 'build_matchup_articles.py'),
 // on ModuleNotFoundError inside the temp tree.
 fs.copyFileSync(path.join(ROOT, 'scripts', 'build_matchup_graphics.py'),
                 path.join(tmp, 'scripts', 'build_matchup_graphics.py'));
+// Same for the helpers both scripts import at top level.
+for (const name of ['sitemap_sections.py', 'output_writer.py']) {
+  fs.copyFileSync(path.join(ROOT, 'scripts', name), path.join(tmp, 'scripts', name));
+}
 fs.copyFileSync(path.join(ROOT, 'matchups', 'index.html'),
                 path.join(tmp, 'matchups', 'index.html'));
 fs.copyFileSync(path.join(ROOT, 'matchups', 'mlb', 'index.html'),